@@ -0,0 +1,340 @@
+# Frame-time benchmark for the Spaceship Game
+#
+# Runs scripted scenarios through the simulation and renderer in an offscreen
+# OpenGL context and reports per-frame timings (p50/p95/p99/worst).
+#
+#   python benchmark.py --output results.json
+#   python benchmark.py --baseline results.json
+#   python benchmark.py --scenario laser_spam --record laser_spam.json
+#   python benchmark.py --script laser_spam.json
+#   python benchmark.py --script session.cmd      (aufgezeichnet mit space_ship.py --record)
+#   python benchmark.py --session session.bin --speed 4   (aufgezeichnet mit space_ship.py --record-session)
+
+import os
+import sys
+
+# Offscreen-Rendering über EGL muss vor dem ersten Import von OpenGL gewählt werden
+if "--window" not in sys.argv:
+    os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+
+import argparse
+import json
+import logging
+import math
+import platform as system_info
+import random
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+import space_ship as game
+
+DISPLAY = (1200, 900)
+FRAME_DT = 1 / 60
+
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def steer_towards(world, target, max_turn=3.0):
+    # Ziel in Schiffsachsen: Gier zur Seite, Nick nach oben/unten (beides relativ zum Schiff)
+    direction = np.asarray(target) - world.movement
+    distance = np.linalg.norm(direction)
+    forward, side, up = (world.axes @ direction).tolist()
+    yaw = math.degrees(math.atan2(side, forward))
+    pitch = math.degrees(math.atan2(-up, math.hypot(forward, side)))
+    return float(np.clip(yaw, -max_turn, max_turn)), float(np.clip(pitch, -max_turn, max_turn)), distance
+
+
+def idle_sun_flyby(world):
+    world.movement[:] = (0, 3, -30)
+
+    def commands(frame):
+        # Nur gelegentlicher Schub: das Schiff treibt langsam an der Sonne vorbei
+        return game.ShipCommand(thrust=1 if frame % 8 == 0 else 0)
+
+    return commands
+
+
+def planet_tour(world):
+    planets = [planet for planet in world.solar_system.planets if planet.name != "Sun"]
+    target = [0]
+
+    def commands(frame):
+        if target[0] >= len(planets):
+            target[0] = 0
+        planet = planets[target[0]]
+        # Knapp über dem Planeten vorbeifliegen, nicht hinein
+        waypoint = planet.position + (0, planet.diameter + 2.5, 0)
+        yaw, pitch, distance = steer_towards(world, waypoint)
+        if distance < 4:
+            target[0] += 1
+        return game.ShipCommand(thrust=1, yaw=yaw, pitch=pitch)
+
+    return commands
+
+
+def laser_spam(world):
+    world.movement[:] = (0, 0, -60)
+
+    def commands(frame):
+        return game.ShipCommand(yaw=0.25 * math.sin(frame / 60), fire=4)
+
+    return commands
+
+
+def asteroid_belt(world):
+    # 100k Körper im Gürtel; das Schiff fliegt knapp darüber hinweg und schießt hinein
+    game.create_asteroid_belt(world.solar_system, 100000)
+    world.movement[:] = (0, 1.5, -52)
+
+    def commands(frame):
+        return game.ShipCommand(thrust=1 if frame % 4 == 0 else 0, pitch=0.02, fire=frame % 2)
+
+    return commands
+
+
+SCENARIOS = {
+    "idle_sun_flyby": idle_sun_flyby,
+    "planet_tour": planet_tour,
+    "laser_spam": laser_spam,
+    "asteroid_belt": asteroid_belt,
+}
+
+
+def load_script(path):
+    if path.endswith(".cmd"):
+        # Im Spiel mit --record aufgezeichnete Befehle
+        commands = game.CommandRecorder.load(path)
+        setup = {}
+    else:
+        with open(path) as f:
+            script = json.load(f)
+        commands = [game.ShipCommand(*entry) for entry in script["commands"]]
+        setup = script.get("setup", {})
+
+    def scenario(world):
+        if "movement" in setup:
+            world.movement[:] = setup["movement"]
+        if "orientation" in setup:
+            world.orientation = setup["orientation"]
+        elif "yaw" in setup:
+            # Ältere Skripte mit Gier/Nick
+            world.ships.set_euler(0, setup["yaw"], setup.get("pitch", 0.0), 0.0)
+        return lambda frame: commands[frame % len(commands)]
+
+    return scenario
+
+
+def save_script(path, setup, commands):
+    script = {
+        "version": 1,
+        "setup": setup,
+        "commands": [[c.thrust, c.strafe, c.yaw, c.pitch, c.fire, c.roll] for c in commands],
+    }
+    with open(path, "w") as f:
+        json.dump(script, f)
+
+
+def run_scenario(name, scenario, frames, warmup, seed, num_stars, window=False, record=None, use_shaders=False, quality=0,
+                 gravity=game.GravityField.STRENGTH):
+    seed_everything(seed)
+    # Ohne progressives Laden: gemessen werden sollen die Frames, nicht das Nachladen der Texturen
+    renderer = game.Renderer(DISPLAY, num_stars, use_shaders=use_shaders, progressive=False)
+    renderer.set_quality(game.QualityGovernor.TIERS[quality])
+    solar_system = game.create_solar_system(renderer.texture_cache)
+    world = game.World(solar_system, gravity=gravity)
+    commands = scenario(world)
+    setup = {"movement": world.movement.tolist(), "orientation": world.orientation.tolist()}
+    simulation = game.Simulation(world)
+
+    recorded = []
+    frame_times = np.zeros(frames)
+    game.profiler.frames = deque(maxlen=frames)
+    game.profiler.end_frame()
+    for frame in range(warmup + frames):
+        command = commands(frame)
+        if record is not None:
+            recorded.append(game.ShipCommand(command.thrust, command.strafe, command.yaw, command.pitch, command.fire, command.roll))
+
+        start = time.perf_counter()
+        alpha = simulation.advance(FRAME_DT, command)
+        renderer.draw(world, *simulation.interpolated(alpha))
+        glFinish()
+        if window:
+            pygame.display.flip()
+            pygame.event.pump()
+        elapsed = time.perf_counter() - start
+
+        game.profiler.end_frame()
+        if frame >= warmup:
+            frame_times[frame - warmup] = elapsed
+
+    renderer.release()
+    if record is not None:
+        save_script(record, setup, recorded)
+    return frame_stats(frame_times, world)
+
+
+def run_session(path, speed, num_stars, window=False, use_shaders=False, quality=0):
+    # Aufgezeichnete Sitzung ohne Simulation abspielen; gemessen werden Suchen im Aufzeichnungsformat und Rendern
+    player = game.SessionPlayer(path)
+    player.speed = speed
+    setup = player.header["setup"]
+    renderer = game.Renderer(DISPLAY, num_stars, use_shaders=use_shaders, progressive=False)
+    renderer.set_quality(game.QualityGovernor.TIERS[quality])
+    solar_system = game.create_solar_system(renderer.texture_cache, setup.get("asteroids", 0), setup.get("satellites", 0),
+                                            np.random.RandomState(setup.get("seed", 0)))
+    world = game.World(solar_system, gravity=setup.get("gravity", 0.0), friction=setup.get("friction", 0.9))
+    player.seek(world, player.first_tick)
+
+    frame_times = []
+    game.profiler.frames = deque(maxlen=int(len(player) / speed) + 1)
+    game.profiler.end_frame()
+    while not player.finished:
+        start = time.perf_counter()
+        alpha = player.advance(world, FRAME_DT)
+        renderer.draw(world, *player.interpolated(alpha))
+        glFinish()
+        if window:
+            pygame.display.flip()
+            pygame.event.pump()
+        frame_times.append(time.perf_counter() - start)
+        game.profiler.end_frame()
+
+    renderer.release()
+    return frame_stats(np.array(frame_times), world)
+
+
+def frame_stats(frame_times, world):
+    frames = len(frame_times)
+    frame_ms = frame_times * 1000
+    return {
+        "frames": frames,
+        "mean_ms": float(frame_ms.mean()),
+        "p50_ms": float(np.percentile(frame_ms, 50)),
+        "p95_ms": float(np.percentile(frame_ms, 95)),
+        "p99_ms": float(np.percentile(frame_ms, 99)),
+        "worst_ms": float(frame_ms.max()),
+        "ticks": world.tick,
+        "life_points": world.life_points,
+        "lasers_in_flight": len(world.lasers),
+        "scopes_ms": game.profiler.scope_totals(),
+        "counters": dict(game.profiler.frames[-1][3]) if game.profiler.frames else {},
+    }
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            ratio = result[metric] / max(reference[metric], 1e-9)
+            flag = "REGRESSION" if ratio > 1 + threshold else ""
+            print(f"{name:16s} {metric:7s} {reference[metric]:9.2f} -> {result[metric]:9.2f} ms ({ratio - 1:+.1%}) {flag}")
+            if flag:
+                regressions.append((name, metric, ratio))
+    return regressions
+
+
+def print_results(results):
+    print(f"{'scenario':16s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'worst':>8s} {'mean':>8s}")
+    for name, result in results["scenarios"].items():
+        print(f"{name:16s} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f} "
+              f"{result['worst_ms']:8.2f} {result['mean_ms']:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spaceship Game frame-time benchmark")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Szenario (mehrfach möglich, Standard: alle)")
+    parser.add_argument("--script", help="Aufgezeichnetes Eingabeskript (JSON) abspielen")
+    parser.add_argument("--session", help="Aufgezeichnete Sitzung (space_ship.py --record-session) abspielen")
+    parser.add_argument("--speed", type=float, default=1.0, help="Wiedergabegeschwindigkeit für --session")
+    parser.add_argument("--record", help="Eingaben des (einzigen) Szenarios als Skript speichern")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--stars", type=int, default=1000)
+    parser.add_argument("--output", help="Ergebnisse als JSON speichern")
+    parser.add_argument("--baseline", help="Mit früheren Ergebnissen (JSON) vergleichen")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Erlaubte Verschlechterung, z.B. 0.10 für 10%%")
+    parser.add_argument("--window", action="store_true", help="In einem sichtbaren Fenster statt offscreen rendern")
+    parser.add_argument("--renderer", choices=("fixed", "shader"), default="fixed", help="Render-Pfad")
+    parser.add_argument("--quality", type=int, default=0, choices=range(len(game.QualityGovernor.TIERS)),
+                        help="Feste Qualitätsstufe (0 = hoch), z.B. um die Stufen untereinander zu vergleichen")
+    parser.add_argument("--gravity", type=float, default=game.GravityField.STRENGTH, help="Stärke der Anziehung (0: aus)")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.session and (args.script or args.scenario or args.record):
+        parser.error("--session cannot be combined with --script, --scenario or --record")
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    if args.session:
+        scenarios = {}
+    elif args.script:
+        scenarios = {os.path.splitext(os.path.basename(args.script))[0]: load_script(args.script)}
+    else:
+        scenarios = {name: SCENARIOS[name] for name in (args.scenario or SCENARIOS)}
+    if args.record and len(scenarios) != 1:
+        parser.error("--record needs exactly one scenario")
+
+    sun_position = (0, 0, 0)
+    if args.window:
+        game.init_opengl(DISPLAY, sun_position)
+    else:
+        pygame.init()
+        game.init_offscreen_opengl(DISPLAY, sun_position)
+
+    results = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": system_info.python_version(),
+            "platform": system_info.platform(),
+            "gl_renderer": glGetString(GL_RENDERER).decode(),
+            "gl_version": glGetString(GL_VERSION).decode(),
+            "display": DISPLAY,
+            "seed": args.seed,
+            "stars": args.stars,
+            "renderer": args.renderer,
+            "quality": game.QualityGovernor.TIERS[args.quality]["name"],
+            "gravity": args.gravity,
+        },
+        "scenarios": {},
+    }
+
+    if args.session:
+        name = os.path.splitext(os.path.basename(args.session))[0]
+        results["scenarios"] = {name: run_session(args.session, args.speed, args.stars, window=args.window,
+                                                  use_shaders=args.renderer == "shader", quality=args.quality)}
+
+    for name, scenario in scenarios.items():
+        results["scenarios"][name] = run_scenario(name, scenario, args.frames, args.warmup, args.seed, args.stars,
+                                                  window=args.window, record=args.record,
+                                                  use_shaders=args.renderer == "shader", quality=args.quality,
+                                                  gravity=args.gravity)
+
+    pygame.quit()
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
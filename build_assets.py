@@ -0,0 +1,56 @@
+# Asset-Build für das Spaceship Game
+#
+# Liest jede STL-Datei der ModelRegistry einmal ein und schreibt ein Modell-Asset mit verschweißtem, indiziertem
+# Mesh und vereinfachten LOD-Stufen (Kantenkollaps) nach .cache/models. Das Spiel lädt diese Dateien per memmap;
+# fehlt eine, baut es sie beim ersten Zugriff selbst.
+#
+#   python build_assets.py
+#   python build_assets.py ship --ratios 0.5 0.2 --force
+#   python build_assets.py --source station=models/station.stl
+
+import argparse
+import logging
+import os
+import time
+
+import space_ship as game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spaceship Game asset build")
+    parser.add_argument("names", nargs="*", help="Modellnamen (Standard: alle)")
+    parser.add_argument("--source", action="append", default=[], metavar="NAME=PATH", help="Zusätzliches STL-Modell")
+    parser.add_argument("--output", default=".cache/models", help="Zielverzeichnis")
+    parser.add_argument("--ratios", type=float, nargs="+", default=list(game.ModelAsset.RATIOS),
+                        help="Dreiecksanteil je LOD-Stufe nach dem Original")
+    parser.add_argument("--force", action="store_true", help="Auch aktuelle Assets neu bauen")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    sources = {}
+    for entry in args.source:
+        name, separator, path = entry.partition("=")
+        if not separator:
+            parser.error(f"--source expects NAME=PATH, got {entry}")
+        sources[name] = path
+    registry = game.ModelRegistry(sources, cache_dir=args.output)
+    names = args.names or sorted(registry.sources)
+    unknown = [name for name in names if name not in registry.sources]
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(unknown)}")
+
+    print(f"{'model':12s} {'triangles':>28s} {'error':>28s} {'size':>9s} {'time':>7s}")
+    for name in names:
+        start = time.perf_counter()
+        asset = registry.asset(name, rebuild=args.force, ratios=args.ratios)
+        elapsed = time.perf_counter() - start
+        lods = asset.header["lods"]
+        triangles = " / ".join(str(lod["triangles"]) for lod in lods)
+        errors = " / ".join(f"{lod['error']:.4f}" for lod in lods)
+        size = os.path.getsize(registry.asset_path(name)) / 1024
+        print(f"{name:12s} {triangles:>28s} {errors:>28s} {size:7.1f}kB {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# Lasttest für den Mehrspieler-Server
+#
+# Startet viele Bots ohne Anzeige in einer asyncio-Schleife. Jeder Bot schickt 60 Eingaben pro Sekunde (fliegt
+# wechselnde Ziele im inneren System an und schießt gelegentlich) und dekodiert alle Snapshots. Ausgegeben werden
+# Tick- und Snapshotzeit des Servers und die Bandbreite je Client.
+#
+#   python load_test.py --spawn-server --bots 200
+#   python load_test.py --port 7777 --bots 500 --duration 60
+#   python load_test.py --spawn-server --bots 300 --server-args="--asteroids 100000"
+
+import argparse
+import asyncio
+import logging
+import math
+import shlex
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import space_ship as game
+
+
+def steer(own, target, max_turn=3.0):
+    # Wie benchmark.steer_towards: Ziel in den Achsen des Schiffs, die Orientierung kommt als Gier/Nick/Roll
+    direction = target - np.asarray(own[0:3])
+    distance = np.linalg.norm(direction)
+    axes = np.array(game.Quaternion.axes(*game.Quaternion.from_euler(*own[6:9])))
+    forward, side, up = (axes @ direction).tolist()
+    yaw = math.degrees(math.atan2(side, forward))
+    pitch = math.degrees(math.atan2(-up, math.hypot(forward, side)))
+    return float(np.clip(yaw, -max_turn, max_turn)), float(np.clip(pitch, -max_turn, max_turn)), distance
+
+
+async def connect_bots(host, port, count, timeout):
+    clients = []
+    deadline = time.monotonic() + timeout
+    while len(clients) < count:
+        client = game.NetworkClient()
+        try:
+            await client.connect(host, port)
+        except OSError:
+            # Server startet noch (baut das Sonnensystem)
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+            continue
+        clients.append(client)
+    return clients
+
+
+async def run_bots(host, port, count, duration, rate, connect_timeout, rng):
+    clients = await connect_bots(host, port, count, connect_timeout)
+    receivers = [asyncio.create_task(client.receive()) for client in clients]
+    targets = rng.uniform(-60, 60, (count, 3)) * (1, 0.1, 1)
+
+    # Ein gemeinsamer Takt für alle Bots statt einer Schleife je Bot
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    received = [client.bytes_received for client in clients]
+    snapshots = [client.snapshots_received for client in clients]
+    tick = 0
+    while loop.time() - start < duration:
+        tick += 1
+        for i, client in enumerate(clients):
+            yaw = pitch = 0.0
+            if client.snapshots:
+                yaw, pitch, distance = steer(client.snapshots[-1][2], targets[i])
+                if distance < 5:
+                    targets[i] = rng.uniform(-60, 60, 3) * (1, 0.1, 1)
+            client.send_input(tick, game.ShipCommand(thrust=1 if tick % 3 else 0, yaw=yaw, pitch=pitch,
+                                                     fire=int(rng.random_sample() < 0.02)))
+        await asyncio.sleep(max(0.0, start + tick / rate - loop.time()))
+    elapsed = loop.time() - start
+
+    status = await clients[0].request_status()
+    bandwidth = np.array([client.bytes_received - before for client, before in zip(clients, received)]) / elapsed
+    snapshot_rate = np.array([client.snapshots_received - before for client, before in zip(clients, snapshots)]) / elapsed
+    for receiver in receivers:
+        receiver.cancel()
+    for client in clients:
+        client.close()
+    return status, bandwidth, snapshot_rate, tick / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spaceship Game multiplayer load test")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--bots", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0, help="Sekunden")
+    parser.add_argument("--input-rate", type=float, default=60, help="Eingaben pro Sekunde und Bot")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--spawn-server", action="store_true", help="server.py als eigenen Prozess starten")
+    parser.add_argument("--server-args", default="", help="Zusätzliche Argumente für server.py")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server = None
+    if args.spawn_server:
+        server = subprocess.Popen([sys.executable, "server.py", "--host", args.host, "--port", str(args.port),
+                                   "--seed", str(args.seed), "--report", "0", *shlex.split(args.server_args)])
+    try:
+        status, bandwidth, snapshot_rate, input_rate = asyncio.run(run_bots(
+            args.host, args.port, args.bots, args.duration, args.input_rate, 60 if server else 5,
+            np.random.RandomState(args.seed)))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"bots              {status['clients']:10d}")
+    print(f"inputs/s per bot  {input_rate:10.1f}")
+    print(f"server tick       {status['tick_ms_p50']:10.2f} ms p50 {status['tick_ms_p99']:8.2f} ms p99")
+    print(f"snapshot encode   {status['snapshot_ms_p50']:10.2f} ms p50 {status['snapshot_ms_p99']:8.2f} ms p99")
+    print(f"bandwidth/client  {bandwidth.mean() / 1024:10.2f} kB/s mean {np.percentile(bandwidth, 95) / 1024:6.2f} kB/s p95 "
+          f"{bandwidth.max() / 1024:6.2f} kB/s max")
+    print(f"snapshots/client  {snapshot_rate.mean():10.1f} /s")
+    print(f"skipped snapshots {status['skipped_snapshots']:10d}")
+    print(f"lasers in flight  {status['lasers']:10d}, ships destroyed {status['destroyed']}")
+
+
+if __name__ == "__main__":
+    main()
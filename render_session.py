@@ -0,0 +1,100 @@
+# Rendert eine aufgezeichnete Sitzung ohne Fenster als PNG-Folge oder Rohvideo
+#
+# Offscreen über EGL und ohne Wartezeit zwischen den Frames, also schneller als Echtzeit, solange Rendern und
+# Kodieren mithalten. Die Kodierung läuft in eigenen Prozessen (FrameCapture); es wird kein Frame verworfen.
+#
+#   python render_session.py flug.bin --output frames
+#   python render_session.py flug.bin --output video --format raw --fps 30 --start 10 --stop 40
+#   ffmpeg -f rawvideo -pix_fmt rgba -s 1200x900 -r 30 -i video/video.rgba flug.mp4
+
+import os
+
+# Offscreen-Rendering über EGL muss vor dem ersten Import von OpenGL gewählt werden
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+
+import argparse
+import logging
+import time
+
+import numpy as np
+import pygame
+
+import space_ship as game
+
+
+def render_session(player, output, image_format="png", fps=60, start=None, stop=None, display=(1200, 900), num_stars=1000,
+                   use_shaders=False, quality=0, workers=None):
+    setup = player.header["setup"]
+    renderer = game.Renderer(display, num_stars, use_shaders=use_shaders, progressive=False)
+    renderer.set_quality(game.QualityGovernor.TIERS[quality])
+    solar_system = game.create_solar_system(renderer.texture_cache, setup.get("asteroids", 0), setup.get("satellites", 0),
+                                            np.random.RandomState(setup.get("seed", 0)))
+    world = game.World(solar_system, gravity=setup.get("gravity", 0.0), friction=setup.get("friction", 0.9))
+
+    first = player.first_tick if start is None else player.first_tick + round(start / player.timestep)
+    last = player.last_tick if stop is None else min(player.first_tick + round(stop / player.timestep), player.last_tick)
+    player.seek(world, first)
+    alpha = 0.0
+
+    capture = game.FrameCapture(display, output, image_format, workers=workers, throttle=True, fps=fps)
+    started = time.perf_counter()
+    frames = 0
+    try:
+        while True:
+            renderer.draw(world, *player.interpolated(alpha))
+            capture.capture()
+            frames += 1
+            if player.position >= last:
+                break
+            alpha = player.advance(world, 1 / fps)
+    finally:
+        capture.close()
+        renderer.release()
+
+    elapsed = time.perf_counter() - started
+    return {"frames": frames, "seconds": elapsed, "fps": frames / elapsed, "real_time_factor": frames / fps / elapsed,
+            "dropped": capture.dropped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a recorded Spaceship Game session offscreen")
+    parser.add_argument("session", help="Sitzungsdatei (space_ship.py --record-session)")
+    parser.add_argument("--output", required=True, help="Zielverzeichnis für frame_NNNNNN.png bzw. video.rgba")
+    parser.add_argument("--format", choices=("png", "raw"), default="png", help="PNG-Folge oder Rohvideo (RGBA)")
+    parser.add_argument("--fps", type=float, default=60, help="Bilder pro Sekunde Sitzungszeit")
+    parser.add_argument("--speed", type=float, default=1.0, help="Wiedergabegeschwindigkeit, z.B. 4 für einen Zeitraffer")
+    parser.add_argument("--start", type=float, help="Beginn in Sekunden ab Aufnahmestart")
+    parser.add_argument("--stop", type=float, help="Ende in Sekunden ab Aufnahmestart")
+    parser.add_argument("--size", default="1200x900", help="Auflösung BREITExHÖHE")
+    parser.add_argument("--stars", type=int, default=1000)
+    parser.add_argument("--renderer", choices=("fixed", "shader"), default="fixed", help="Render-Pfad")
+    parser.add_argument("--quality", type=int, default=0, choices=range(len(game.QualityGovernor.TIERS)),
+                        help="Qualitätsstufe (0 = hoch)")
+    parser.add_argument("--workers", type=int, help="Kodier-Prozesse für PNG (Standard: bis zu 4)")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    try:
+        width, height = (int(value) for value in args.size.lower().split("x"))
+    except ValueError:
+        parser.error(f"--size expects WIDTHxHEIGHT, got {args.size}")
+    if args.fps <= 0 or args.speed <= 0:
+        parser.error("--fps and --speed must be positive")
+    try:
+        player = game.SessionPlayer(args.session)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot replay {args.session}: {e}")
+    player.speed = args.speed
+
+    pygame.init()
+    game.init_offscreen_opengl((width, height), (0, 0, 0))
+    result = render_session(player, args.output, args.format, args.fps, args.start, args.stop, (width, height),
+                            args.stars, args.renderer == "shader", args.quality, args.workers)
+    pygame.quit()
+    print(f"{result['frames']} frames in {result['seconds']:.1f} s: {result['fps']:.1f} fps, "
+          f"{result['real_time_factor']:.2f}x real time")
+
+
+if __name__ == "__main__":
+    main()
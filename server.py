@@ -0,0 +1,68 @@
+# Mehrspieler-Server für das Spaceship Game
+#
+# Simuliert Sonnensystem, Schiffe und Laser autoritativ mit fester Tickrate (asyncio, TCP). Clients schicken ihre
+# Eingaben und bekommen delta-komprimierte Snapshots der Schiffe und Laser in ihrer Nähe.
+#
+#   python server.py
+#   python server.py --port 7777 --asteroids 100000 --snapshot-rate 30
+#   python space_ship.py --connect 127.0.0.1:7777
+#   python load_test.py --bots 200
+
+import argparse
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+import space_ship as game
+
+
+async def report(server, interval):
+    while True:
+        await asyncio.sleep(interval)
+        status = server.status()
+        logging.info(f"tick {status['tick']}: {status['clients']} clients, {status['lasers']} lasers, "
+                     f"tick {status['tick_ms_p50']:.2f}/{status['tick_ms_p99']:.2f} ms (p50/p99), "
+                     f"snapshots {status['snapshot_ms_p50']:.2f}/{status['snapshot_ms_p99']:.2f} ms, "
+                     f"{status['bytes_per_client_s'] / 1024:.1f} kB/s per client")
+
+
+async def serve(server, host, port, report_interval):
+    if report_interval > 0:
+        asyncio.get_running_loop().create_task(report(server, report_interval))
+    await server.serve(host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spaceship Game multiplayer server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--asteroids", type=int, default=0, help="Anzahl der Körper im Asteroidengürtel")
+    parser.add_argument("--satellites", type=int, default=0, help="Anzahl der Satelliten um die Erde")
+    parser.add_argument("--seed", type=int, help="Seed für das Sonnensystem (Standard: zufällig)")
+    parser.add_argument("--tick-rate", type=float, default=60, help="Simulationsschritte pro Sekunde")
+    parser.add_argument("--snapshot-rate", type=float, default=20, help="Snapshots pro Sekunde und Client")
+    parser.add_argument("--interest-radius", type=float, default=30.0, help="Nur Schiffe und Laser in diesem Umkreis senden")
+    parser.add_argument("--max-ships", type=int, default=1024)
+    parser.add_argument("--gravity", type=float, default=game.GravityField.STRENGTH, help="Stärke der Anziehung (0: aus)")
+    parser.add_argument("--friction", type=float, default=0.9, help="Erhaltene Geschwindigkeit je Tick (1.0: ohne Reibung)")
+    parser.add_argument("--report", type=float, default=5.0, help="Sekunden zwischen Statusmeldungen (0: aus)")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else int(time.time()) % 2 ** 31
+    setup = {"seed": seed, "asteroids": args.asteroids, "satellites": args.satellites, "gravity": args.gravity,
+             "friction": args.friction}
+    solar_system = game.create_solar_system(None, args.asteroids, args.satellites, np.random.RandomState(seed))
+    arena = game.Arena(solar_system, capacity=args.max_ships, gravity=args.gravity, friction=args.friction)
+    snapshot_every = max(1, round(args.tick_rate / args.snapshot_rate))
+    server = game.GameServer(arena, setup, timestep=1 / args.tick_rate, snapshot_every=snapshot_every,
+                             interest_radius=args.interest_radius)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.report))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,236 +4,4630 @@ import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
+from OpenGL.GL import shaders
 from stl import mesh
 import numpy as np
 import tkinter as tk
 import threading
+import queue
+import multiprocessing
+import zlib
+import asyncio
 import os.path
 import logging
 import math
+import hashlib
+import heapq
+import struct
+import json
+import ctypes
+import argparse
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from OpenGL.error import GLError, NullFunctionError
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class Anomaly:
-    def __init__(self):
-        self.background_texture = None
+class ProfileScope:
+    __slots__ = ("profiler", "name", "start")
 
-    def add_background(self):
-        try:
-            self.background_texture = pygame.image.load("textures/background/milky_way.png")
-        except pygame.error as e:
-            logging.error(f"Error loading background texture: {e}")
-            return
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
 
-        logging.info(f"Background texture loaded: {self.background_texture.get_size()}")
+    def __enter__(self):
+        self.profiler.depth += 1
+        self.start = time.perf_counter_ns()
+        return self
 
-        quad = gluNewQuadric()
-        gluQuadricNormals(quad, GLU_SMOOTH)
-        gluQuadricTexture(quad, GL_TRUE)
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.profiler.depth -= 1
+        self.profiler.events.append((self.name, self.start, end, self.profiler.depth))
 
-        glEnable(GL_TEXTURE_2D)
-        texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+class NullScope:
+    def __enter__(self):
+        return self
 
-        texture_data = pygame.image.tostring(self.background_texture, "RGB", 1)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, self.background_texture.get_width(), self.background_texture.get_height(), 0, GL_RGB, GL_UNSIGNED_BYTE, texture_data)
+    def __exit__(self, *exc):
+        pass
 
-        glColor3f(1.0, 1.0, 1.0)
-        glPushMatrix()
-        glRotatef(90, 1, 0, 0)
-        gluSphere(quad, 800, 500, 500)
-        glPopMatrix()
-        glDisable(GL_TEXTURE_2D)
+class FrameProfiler:
+    COUNTERS = ("draw_calls", "texture_uploads", "quadric_allocations", "gl_allocations", "gl_frees")
+
+    def __init__(self, history=300, enabled=True):
+        self.enabled = enabled
+        self.frames = deque(maxlen=history)  # Ringpuffer der letzten Frames
+        self.scopes = {}
+        self.null_scope = NullScope()
+        self.events = []
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.depth = 0
+        self.frame_start = time.perf_counter_ns()
+        self.origin = self.frame_start
+
+    def scope(self, name):
+        if not self.enabled:
+            return self.null_scope
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = ProfileScope(self, name)
+        return scope
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def end_frame(self):
+        now = time.perf_counter_ns()
+        if self.enabled:
+            self.frames.append((self.frame_start, now, self.events, self.counters))
+        self.events = []
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.frame_start = now
+
+    def scope_totals(self, frames=None):
+        # Durchschnittliche Zeit pro Frame in ms für jeden äußeren Bereich
+        frames = list(self.frames)[-frames:] if frames else list(self.frames)
+        totals = {}
+        for _, _, events, _ in frames:
+            for name, start, end, depth in events:
+                if depth == 0:
+                    totals[name] = totals.get(name, 0) + end - start
+        count = max(len(frames), 1)
+        return {name: total / count / 1e6 for name, total in totals.items()}
+
+    def frame_times_ms(self):
+        return np.array([(end - start) / 1e6 for start, end, _, _ in self.frames])
+
+    def export_chrome_trace(self, path):
+        trace_events = []
+        for frame_start, frame_end, events, counters in self.frames:
+            trace_events.append({"name": "frame", "ph": "X", "pid": 0, "tid": 0,
+                                 "ts": (frame_start - self.origin) / 1000, "dur": (frame_end - frame_start) / 1000})
+            for name, start, end, depth in events:
+                trace_events.append({"name": name, "ph": "X", "pid": 0, "tid": 0,
+                                     "ts": (start - self.origin) / 1000, "dur": (end - start) / 1000})
+            trace_events.append({"name": "counters", "ph": "C", "pid": 0, "tid": 0,
+                                 "ts": (frame_start - self.origin) / 1000, "args": dict(counters)})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+        logging.info(f"Trace exported: {path} ({len(self.frames)} frames)")
+
+profiler = FrameProfiler()
+
+class GpuResources:
+    # Buchführung über alle GL-Objekte: Art, Herkunft, Größe und Zahl der Besitzer. Gelöscht wird erst, wenn der
+    # letzte Besitzer release() aufruft; was beim Beenden noch lebt, meldet check_leaks(). Anlegen und Löschen
+    # landen als gl_allocations/gl_frees im Profiler, also im Trace und im Overlay pro Frame.
+    DELETERS = {
+        "texture": lambda name: glDeleteTextures([name]),
+        "buffer": lambda name: glDeleteBuffers(1, [name]),
+        "vertex_array": lambda name: glDeleteVertexArrays(1, [name]),
+        "framebuffer": lambda name: glDeleteFramebuffers(1, [name]),
+        "renderbuffer": lambda name: glDeleteRenderbuffers(1, [name]),
+        "list": lambda name: glDeleteLists(name, 1),
+        "program": lambda name: glDeleteProgram(name),
+        "quadric": lambda quadric: gluDeleteQuadric(quadric),
+    }
 
-        self.draw_nebula()
+    def __init__(self):
+        self.handles = {}  # (Art, GL-Name) -> [Bezeichnung, Bytes, Besitzer, Objekt]
+
+    @staticmethod
+    def key(kind, name):
+        # GLU-Quadriken sind Zeiger ohne Hash, sie werden über ihre Identität geführt
+        return kind, id(name) if kind == "quadric" else name
+
+    def track(self, kind, name, label, size=0):
+        # Übernimmt ein frisch erzeugtes Objekt mit einem Besitzer; gibt den Namen zurück, damit es um glGen* passt
+        if kind not in self.DELETERS:
+            raise ValueError(f"Unknown GL resource kind: {kind}")
+        self.handles[self.key(kind, name)] = [label, size, 1, name]
+        profiler.count("gl_allocations")
+        return name
+
+    def resize(self, kind, name, size):
+        # Neuer Speicherbedarf, z.B. nach glTexImage2D mit anderer Größe
+        self.handles[self.key(kind, name)][1] = size
+
+    def acquire(self, kind, name):
+        self.handles[self.key(kind, name)][2] += 1
+        return name
+
+    def release(self, kind, name):
+        # True, wenn das Objekt gelöscht wurde
+        key = self.key(kind, name)
+        handle = self.handles.get(key)
+        if handle is None:
+            logging.warning(f"Releasing unknown GL {kind} {name}")
+            return False
+        handle[2] -= 1
+        if handle[2] > 0:
+            return False
+        del self.handles[key]
+        self.DELETERS[kind](name)
+        profiler.count("gl_frees")
+        return True
+
+    def bytes(self, kind=None):
+        return sum(handle[1] for (handle_kind, _), handle in self.handles.items() if kind in (None, handle_kind))
+
+    def report(self):
+        # Art -> (Anzahl, Bytes) aller lebenden Objekte
+        totals = {}
+        for (kind, _), handle in self.handles.items():
+            count, total = totals.get(kind, (0, 0))
+            totals[kind] = (count + 1, total + handle[1])
+        return totals
+
+    def check_leaks(self):
+        # Beim Beenden, nachdem alle Besitzer freigegeben haben: Übriges nach Bezeichnung zusammengefasst melden
+        leaks = {}
+        for (kind, _), (label, size, _, _) in self.handles.items():
+            count, total = leaks.get((kind, label), (0, 0))
+            leaks[kind, label] = (count + 1, total + size)
+        for (kind, label), (count, total) in sorted(leaks.items()):
+            logging.warning(f"GL leak: {count} {kind}(s) from {label}, {total / 2 ** 20:.1f} MB")
+        return leaks
+
+gpu_resources = GpuResources()
+
+class ProfilerOverlay:
+    COLORS = ((0.9, 0.3, 0.3), (0.3, 0.9, 0.3), (0.3, 0.5, 1.0), (0.9, 0.9, 0.3), (0.9, 0.4, 0.9),
+              (0.3, 0.9, 0.9), (1.0, 0.6, 0.2), (0.7, 0.7, 0.7))
+
+    def __init__(self, profiler, width=300, height=100, budget_ms=16.6):
+        self.profiler = profiler
+        self.width = width
+        self.height = height
+        self.budget_ms = budget_ms
+        self.visible = False
+        self.colors = {}
+        self.text_texture = None
+        self.text_size = (0, 0)
+        self.text_updated = 0.0
+        self.font = None
+
+    def color(self, name):
+        if name not in self.colors:
+            self.colors[name] = self.COLORS[len(self.colors) % len(self.COLORS)]
+        return self.colors[name]
+
+    def update_text(self):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 18)
+
+        frames = self.profiler.frame_times_ms()
+        counters = self.profiler.frames[-1][3] if self.profiler.frames else {}
+        lines = [f"frame {frames.mean() if len(frames) else 0:.2f} ms (max {frames.max() if len(frames) else 0:.2f})",
+                 "  ".join(f"{name} {value}" for name, value in counters.items())]
+        lines.append("  ".join(f"{kind} {count} ({total / 2 ** 20:.1f} MB)" for kind, (count, total) in gpu_resources.report().items()))
+        lines += [f"{name}: {ms:.2f} ms" for name, ms in sorted(self.profiler.scope_totals(60).items(), key=lambda item: -item[1])]
+
+        surfaces = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(surface.get_width() for surface in surfaces)
+        height = sum(surface.get_height() for surface in surfaces)
+        text = pygame.Surface((width, height), pygame.SRCALPHA)
+        y = 0
+        for surface in surfaces:
+            text.blit(surface, (0, y))
+            y += surface.get_height()
+
+        if self.text_texture is None:
+            self.text_texture = gpu_resources.track("texture", glGenTextures(1), "ProfilerOverlay")
+        glBindTexture(GL_TEXTURE_2D, self.text_texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, pygame.image.tostring(text, "RGBA", True))
+        glBindTexture(GL_TEXTURE_2D, 0)
+        gpu_resources.resize("texture", self.text_texture, width * height * 4)
+        self.text_size = (width, height)
+
+    def draw(self, display):
+        if not self.visible or not self.profiler.frames:
+            return
 
-    def draw_nebula(self):
-        num_particles = 100
-        particle_size = 0.57
+        now = time.perf_counter()
+        if now - self.text_updated > 0.5:
+            self.update_text()
+            self.text_updated = now
 
+        glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT)
+        glDisable(GL_LIGHTING)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_TEXTURE_2D)
         glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glPointSize(particle_size)
-
-        glBegin(GL_POINTS)
-        glColor4f(1.0, 1.0, 1.0, 0.5)
-        for _ in range(num_particles):
-            x = np.random.uniform(-100, 100)
-            y = np.random.uniform(-100, 100)
-            z = np.random.uniform(-100, 100)
-            glVertex3f(x, y, z)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, display[0], 0, display[1], -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+
+        # Gestapelte Balken: ein Balken pro Frame, ein Abschnitt pro Bereich
+        frames = list(self.profiler.frames)[-self.width:]
+        scale = self.height / (2 * self.budget_ms)
+        vertices = []
+        colors = []
+        for x, (_, _, events, _) in enumerate(frames):
+            y = 0.0
+            for name, start, end, depth in events:
+                if depth:
+                    continue
+                top = y + (end - start) / 1e6 * scale
+                vertices += [(10 + x, 10 + y), (11 + x, 10 + y), (11 + x, 10 + top), (10 + x, 10 + top)]
+                colors += [self.color(name)] * 4
+                y = top
+
+        glColor4f(0.0, 0.0, 0.0, 0.5)
+        glRectf(8, 8, 12 + self.width, 12 + self.height)
+        if vertices:
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glEnableClientState(GL_COLOR_ARRAY)
+            glVertexPointer(2, GL_FLOAT, 0, np.array(vertices, dtype=np.float32))
+            glColorPointer(3, GL_FLOAT, 0, np.array(colors, dtype=np.float32))
+            glDrawArrays(GL_QUADS, 0, len(vertices))
+            glDisableClientState(GL_COLOR_ARRAY)
+            glDisableClientState(GL_VERTEX_ARRAY)
+
+        budget_y = 10 + self.budget_ms * scale
+        glColor3f(1.0, 1.0, 1.0)
+        glBegin(GL_LINES)
+        glVertex2f(10, budget_y)
+        glVertex2f(10 + self.width, budget_y)
         glEnd()
 
-        glDisable(GL_BLEND)
+        if self.text_texture is not None:
+            width, height = self.text_size
+            top = 20 + self.height + height
+            glEnable(GL_TEXTURE_2D)
+            glBindTexture(GL_TEXTURE_2D, self.text_texture)
+            glBegin(GL_QUADS)
+            glTexCoord2f(0, 0)
+            glVertex2f(10, top - height)
+            glTexCoord2f(1, 0)
+            glVertex2f(10 + width, top - height)
+            glTexCoord2f(1, 1)
+            glVertex2f(10 + width, top)
+            glTexCoord2f(0, 1)
+            glVertex2f(10, top)
+            glEnd()
+            glBindTexture(GL_TEXTURE_2D, 0)
 
-    @staticmethod
-    def draw_stars(stars):
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopAttrib()
+
+    def release(self):
+        if self.text_texture is not None:
+            gpu_resources.release("texture", self.text_texture)
+            self.text_texture = None
+
+class QualityGovernor:
+    # Stufenleiter von teuer nach billig; zuerst die Regler, die man kaum sieht. lod_bias < 1 wählt gröbere Meshes,
+    # star_fraction zeichnet nur einen Teil der Sterne und Nebelpartikel, texture_size begrenzt die gesampelte
+    # Mip-Stufe, render_scale rendert in einen kleineren Framebuffer und skaliert ihn hoch
+    TIERS = (
+        {"name": "hoch", "lod_bias": 1.0, "star_fraction": 1.0, "laser_width": 2.0, "laser_limit": None,
+         "texture_size": None, "render_scale": 1.0},
+        {"name": "mittel", "lod_bias": 0.7, "star_fraction": 0.6, "laser_width": 2.0, "laser_limit": 4096,
+         "texture_size": 1024, "render_scale": 1.0},
+        {"name": "niedrig", "lod_bias": 0.5, "star_fraction": 0.35, "laser_width": 1.0, "laser_limit": 2048,
+         "texture_size": 512, "render_scale": 0.75},
+        {"name": "minimal", "lod_bias": 0.35, "star_fraction": 0.2, "laser_width": 1.0, "laser_limit": 1024,
+         "texture_size": 256, "render_scale": 0.5},
+    )
+
+    def __init__(self, target_ms=16.6, tiers=TIERS, tier=0, window=60, downgrade_ratio=1.2, upgrade_ratio=1.05,
+                 hold=2.0, max_hold=120.0, probation=10.0, memory=60.0):
+        self.target_ms = target_ms
+        self.tiers = tiers
+        self.tier = tier
+        self.samples = deque(maxlen=window)
+        # Hysterese: runter erst deutlich über dem Budget, hoch schon knapp darüber (mit VSync misst man nie weniger
+        # als ein Frame-Intervall); das eigentliche Pendeln verhindert die wachsende Wartezeit vor dem Hochstufen
+        self.downgrade_ratio = downgrade_ratio
+        self.upgrade_ratio = upgrade_ratio
+        self.hold = hold  # Sekunden nach jedem Wechsel ohne Entscheidung
+        self.max_hold = max_hold
+        self.probation = probation  # fällt eine hochgestufte Stufe so schnell wieder, war der Versuch zu früh
+        self.upgrade_holds = [hold] * len(tiers)  # Wartezeit je Stufe, bevor von ihr aus hochgestuft wird
+        # Zuletzt gemessene Last je Stufe: nicht jede Stufe ist auf jeder Maschine billiger (Hochskalieren kostet
+        # mit Software-Rasterizer mehr, als die kleinere Auflösung spart)
+        self.memory = memory
+        self.loads = {}
+        self.changed = None
+        self.upgraded = None
+        self.good_since = None
+
+    @property
+    def settings(self):
+        return self.tiers[self.tier]
+
+    def describe(self):
+        return f"{self.tier + 1}/{len(self.tiers)} {self.settings['name']}"
+
+    def measured(self, tier, now):
+        load, measured = self.loads.get(tier, (None, None))
+        return load if load is not None and now - measured < self.memory else None
+
+    def load_ms(self):
+        # 90. Perzentil statt Mittelwert: einzelne Ruckler zählen, ein einzelner Ausreißer nicht
+        return float(np.percentile(self.samples, 90)) if self.samples else 0.0
+
+    def update(self, frame_ms, now=None):
+        # Einmal pro Frame; True, wenn sich die Stufe geändert hat
+        now = time.perf_counter() if now is None else now
+        if self.changed is None:
+            self.changed = now
+        self.samples.append(frame_ms)
+        if len(self.samples) < self.samples.maxlen or now - self.changed < self.hold:
+            return False
+
+        load = self.load_ms()
+        self.loads[self.tier] = (load, now)
+        better = self.measured(self.tier - 1, now) if self.tier > 0 else None
+        if better is not None and better < load * 0.9:
+            # Die bessere Stufe war sogar schneller: zurück, kein Versuch im Sinne der Wartezeit
+            self.upgraded = None
+            return self.change(self.tier - 1, now, load)
+
+        if load > self.target_ms * self.downgrade_ratio:
+            self.good_since = None
+            cheaper = self.measured(self.tier + 1, now) if self.tier + 1 < len(self.tiers) else None
+            if self.tier + 1 >= len(self.tiers) or (cheaper is not None and cheaper >= load):
+                return False
+            if self.upgraded is not None and now - self.upgraded < self.probation:
+                # Die bessere Stufe hat nicht gehalten: beim nächsten Mal doppelt so lange warten
+                self.upgrade_holds[self.tier + 1] = min(self.upgrade_holds[self.tier + 1] * 2, self.max_hold)
+            self.upgraded = None
+            return self.change(self.tier + 1, now, load)
+
+        if load > self.target_ms * self.upgrade_ratio or self.tier == 0:
+            self.good_since = None
+            return False
+        if self.good_since is None:
+            self.good_since = now
+        if now - self.good_since < self.upgrade_holds[self.tier]:
+            return False
+        self.upgraded = now
+        return self.change(self.tier - 1, now, load)
+
+    def change(self, tier, now, load):
+        logging.info(f"Quality {self.settings['name']} -> {self.tiers[tier]['name']} (p90 {load:.1f} ms, target {self.target_ms:.1f} ms)")
+        self.tier = tier
+        self.changed = now
+        self.good_since = None
+        self.samples.clear()
+        return True
+
+class LoadingScreen:
+    # Erscheint sofort nach dem Öffnen des Fensters, solange Sonnensystem und Schiff im Hintergrund entstehen
+    def __init__(self, display, width=400, height=10):
+        self.display = display
+        self.width = width
+        self.height = height
+        self.font = None
+        self.text = None
+        self.text_texture = None
+        self.text_size = (0, 0)
+
+    def update_text(self, text):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 24)
+        surface = self.font.render(text, True, (220, 220, 220))
+        if self.text_texture is None:
+            self.text_texture = gpu_resources.track("texture", glGenTextures(1), "LoadingScreen")
+        glBindTexture(GL_TEXTURE_2D, self.text_texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, surface.get_width(), surface.get_height(), 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                     pygame.image.tostring(surface, "RGBA", True))
+        glBindTexture(GL_TEXTURE_2D, 0)
+        gpu_resources.resize("texture", self.text_texture, surface.get_width() * surface.get_height() * 4)
+        self.text_size = surface.get_size()
+        self.text = text
+
+    def draw(self, progress, text):
+        if text != self.text:
+            self.update_text(text)
+
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT)
         glDisable(GL_LIGHTING)
-        glBegin(GL_POINTS)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, self.display[0], 0, self.display[1], -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+
+        # Fortschrittsbalken in der Bildmitte, Text darüber
+        x = (self.display[0] - self.width) / 2
+        y = (self.display[1] - self.height) / 2
+        glColor3f(0.4, 0.4, 0.4)
+        glRectf(x - 2, y - 2, x + self.width + 2, y + self.height + 2)
+        glColor3f(0.0, 0.0, 0.0)
+        glRectf(x, y, x + self.width, y + self.height)
+        glColor3f(0.85, 0.85, 0.85)
+        glRectf(x, y, x + self.width * min(max(progress, 0.0), 1.0), y + self.height)
+
+        width, height = self.text_size
+        left = (self.display[0] - width) / 2
+        bottom = y + self.height + 12
         glColor3f(1.0, 1.0, 1.0)
-        for star in stars:
-            glVertex3f(*star)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.text_texture)
+        glBegin(GL_QUADS)
+        glTexCoord2f(0, 0)
+        glVertex2f(left, bottom)
+        glTexCoord2f(1, 0)
+        glVertex2f(left + width, bottom)
+        glTexCoord2f(1, 1)
+        glVertex2f(left + width, bottom + height)
+        glTexCoord2f(0, 1)
+        glVertex2f(left, bottom + height)
         glEnd()
-        glEnable(GL_LIGHTING)
-
-class Spaceship:
-    def __init__(self):
-        self.position = np.zeros(3)
-        self.velocity = np.zeros(3)
-        self.acceleration = np.zeros(3)
-        self.rotation = np.zeros(3)
-        self.angular_velocity = np.zeros(3)
-        self.max_speed = 0.5
-        self.acceleration_rate = 0.05
-        self.rotation_rate = 0.4
+        glBindTexture(GL_TEXTURE_2D, 0)
 
-    def update(self, dt):
-        self.velocity += self.acceleration * dt
-        self.velocity *= 0.99  # Add friction to limit speed
-        self.position += self.velocity * dt
-        self.angular_velocity *= 0.95  # Add friction for rotation
-
-        self.rotation += self.angular_velocity * dt
-        self.rotation = np.clip(self.rotation, -np.pi / 4, np.pi / 4)
-
-    def apply_thrust(self, thrust_vector):
-        self.acceleration = thrust_vector * self.acceleration_rate
-
-    def rotate(self, dx, dy, clockwise=False, counterclockwise=False):
-        self.angular_velocity[0] += dy * self.rotation_rate
-        self.angular_velocity[1] += dx * self.rotation_rate
-
-        if clockwise:
-            self.angular_velocity[2] += self.rotation_rate
-        if counterclockwise:
-            self.angular_velocity[2] -= self.rotation_rate
-
-        self.rotation[0] += dy * self.rotation_rate
-        self.rotation[1] += dx * self.rotation_rate
-        self.rotation[0] = np.clip(self.rotation[0], -np.pi / 4, np.pi / 4)
-
-    def move_forward(self):
-        thrust_vector = np.array([
-            -np.sin(self.rotation[1]) * np.cos(self.rotation[0]),
-            np.sin(self.rotation[0]),
-            -np.cos(self.rotation[1]) * np.cos(self.rotation[0])
-        ])
-        self.apply_thrust(thrust_vector)
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopAttrib()
 
-    def move_backward(self):
-        thrust_vector = np.array([
-            np.sin(self.rotation[1]) * np.cos(self.rotation[0]),
-            -np.sin(self.rotation[0]),
-            np.cos(self.rotation[1]) * np.cos(self.rotation[0])
-        ])
-        self.apply_thrust(thrust_vector)
+    def release(self):
+        if self.text_texture is not None:
+            gpu_resources.release("texture", self.text_texture)
+            self.text_texture = None
 
-    def get_camera_position(self):
-        return self.position
+class StatsChannel:
+    def __init__(self):
+        # deque.append/pop sind in CPython atomar: der Render-Thread wartet nie auf Tk
+        self.latest = deque(maxlen=1)
+        self.closed = False
 
-    def get_camera_target(self):
-        x = self.position[0] - np.sin(self.rotation[1]) * np.cos(self.rotation[0])
-        y = self.position[1] + np.sin(self.rotation[0])
-        z = self.position[2] - np.cos(self.rotation[1]) * np.cos(self.rotation[0])
-        return np.array([x, y, z])
+    def publish(self, snapshot):
+        self.latest.append(snapshot)
 
-class Planet:
-    def __init__(self, name, diameter, distance, texture_path, orbital_speed, start_angle, rotation_speed):
-        self.name = name
-        self.diameter = diameter
-        self.distance = distance
-        self.texture_path = texture_path
-        self.orbital_speed = orbital_speed
-        self.angle = start_angle
-        self.rotation_speed = rotation_speed
-        self.rotation_angle = 0
-        self.position = np.array([distance * np.cos(start_angle), 0, distance * np.sin(start_angle)])
-        self.texture_id = self.load_texture()
-
-    def update_position(self, dt):
-        self.angle += self.orbital_speed * dt
-        self.rotation_angle += self.rotation_speed * dt
-        angle_rad = np.radians(self.angle)
-        self.position = np.array([self.distance * np.cos(angle_rad), 0, self.distance * np.sin(angle_rad)])
-
-    def load_texture(self):
+    def take(self):
         try:
-            texture_surface = pygame.image.load(self.texture_path)
-        except pygame.error as e:
-            logging.error(f"Error loading texture: {e}")
+            return self.latest.pop()
+        except IndexError:
             return None
 
-        texture_surface = self.scale_texture(texture_surface, 2048)
-        texture_data = pygame.image.tostring(texture_surface, 'RGBA', 1)
-        width, height = texture_surface.get_rect().size
+    def close(self):
+        self.closed = True
+
+class StatsWindow:
+    FIELDS = (
+        ("distance", "Entfernung zur Sonne:", "{:.2f} km"),
+        ("speed", "Geschwindigkeit:", "{:.2f} km/s"),
+        ("life_points", "Schutzschild:", "{}"),
+        ("structure_points", "Raumschiff-Struktur:", "{}"),
+        ("collided_planets", "Kollidierte Planeten:", "{}"),
+        ("fps", "FPS:", "{:.0f}"),
+        ("frame_ms", "Frame-Zeit:", "{:.1f} ms"),
+        ("bodies", "Himmelskörper:", "{}"),
+        ("quality", "Qualitätsstufe:", "{}"),
+    )
+
+    def __init__(self, root, channel, rate=10):
+        self.root = root
+        self.channel = channel
+        self.interval = max(int(1000 / rate), 1)
+        self.variables = {}
+        self.texts = {}
+
+        for row, (key, label, _) in enumerate(self.FIELDS):
+            self.variables[key] = tk.StringVar()
+            tk.Label(root, text=label).grid(row=row, column=0, sticky="w")
+            tk.Label(root, textvariable=self.variables[key]).grid(row=row, column=1, sticky="w")
+
+    def start(self):
+        self.root.after(self.interval, self.poll)
+
+    def poll(self):
+        # Läuft im Tk-Thread; Zwischenstände wurden bereits im Kanal zusammengefasst
+        snapshot = self.channel.take()
+        if snapshot is not None:
+            for key, _, text_format in self.FIELDS:
+                if key not in snapshot:
+                    continue
+                text = text_format.format(snapshot[key])
+                if self.texts.get(key) != text:
+                    self.texts[key] = text
+                    self.variables[key].set(text)
+
+        if self.channel.closed:
+            self.root.destroy()
+            return
+        self.root.after(self.interval, self.poll)
 
-        logging.info(f"Loading texture: {self.texture_path}")
-        logging.info(f"Texture size: {width}x{height}")
+class Anomaly:
+    def __init__(self, texture_path="textures/background/milky_way.png", radius=800, slices=96, stacks=96):
+        self.texture_path = texture_path
+        self.radius = radius
+        self.slices = slices
+        self.stacks = stacks
+        self.background_texture = None
+        self.display_list = None
+        self.nebula = None
 
-        texture = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    def init_background(self):
+        # Geometrie wird nur einmal erzeugt, danach wird nur noch die Display-Liste aufgerufen
+        quad = gpu_resources.track("quadric", gluNewQuadric(), "Anomaly")
+        profiler.count("quadric_allocations")
+        gluQuadricNormals(quad, GLU_SMOOTH)
+        gluQuadricTexture(quad, GL_TRUE)
+
+        self.display_list = gpu_resources.track("list", glGenLists(1), "Anomaly")
+        glNewList(self.display_list, GL_COMPILE)
+        glPushMatrix()
+        glRotatef(90, 1, 0, 0)
+        gluSphere(quad, self.radius, self.slices, self.stacks)
+        glPopMatrix()
+        glEndList()
+        gpu_resources.release("quadric", quad)
+
+    def add_background(self, texture_cache, nebula_fraction=1.0):
+        # Die Textur kommt aus dem TextureCache; bis sie dekodiert ist, bleibt der Hintergrund schwarz
+        self.background_texture = texture_cache.request(self.texture_path)
+        if self.background_texture is not None:
+            if self.display_list is None:
+                self.init_background()
+
+            glEnable(GL_TEXTURE_2D)
+            glBindTexture(GL_TEXTURE_2D, self.background_texture)
+            glColor3f(1.0, 1.0, 1.0)
+            glCallList(self.display_list)
+            profiler.count("draw_calls")
+            glBindTexture(GL_TEXTURE_2D, 0)
+            glDisable(GL_TEXTURE_2D)
+
+        self.draw_nebula(nebula_fraction)
+
+    def release(self):
+        if self.display_list is not None:
+            gpu_resources.release("list", self.display_list)
+            self.display_list = None
+        self.background_texture = None  # gehört dem TextureCache
+        if self.nebula is not None:
+            self.nebula.release()
+            self.nebula = None
+
+    def draw_nebula(self, fraction=1.0):
+        if self.nebula is None:
+            self.nebula = create_nebula()
+        self.nebula.draw(fraction)
+
+    @staticmethod
+    def draw_stars(stars, fraction=1.0):
+        stars.draw(fraction)
+
+class ParticleField:
+    def __init__(self, positions, colors, sizes):
+        # Punkte nach Größe sortieren, damit jede Größe ein zusammenhängender Bereich im Puffer ist
+        order = np.argsort(sizes, kind="stable")
+        sizes = np.asarray(sizes, dtype=np.float32)[order]
+
+        # Größe pro Punkt nur für den Shader-Pfad, Fixed-Function zeichnet bucketweise mit glPointSize
+        vertices = np.empty(len(order), dtype=[("position", np.float32, 3), ("color", np.uint8, 4), ("size", np.float32)])
+        vertices["position"] = positions[order]
+        vertices["color"] = colors[order]
+        vertices["size"] = sizes
+        self.count = len(vertices)
+
+        bucket_sizes, starts, counts = np.unique(sizes, return_index=True, return_counts=True)
+        self.buckets = list(zip(bucket_sizes.tolist(), starts.tolist(), counts.tolist()))
+
+        self.vertex_buffer = gpu_resources.track("buffer", glGenBuffers(1), type(self).__name__, vertices.nbytes)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    stride = 20
+
+    def ranges(self, fraction=1.0):
+        # Die Punkte liegen zufällig verteilt: der Anfang jedes Größenbereichs ist eine gleichmäßige Stichprobe
+        return [(size, start, math.ceil(count * fraction)) for size, start, count in self.buckets]
+
+    def draw(self, fraction=1.0):
+        stride = self.stride
+        glPushAttrib(GL_ENABLE_BIT | GL_POINT_BIT)
+        glDisable(GL_LIGHTING)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+        glColorPointer(4, GL_UNSIGNED_BYTE, stride, ctypes.c_void_p(12))
+        for size, start, count in self.ranges(fraction):
+            glPointSize(size)
+            glDrawArrays(GL_POINTS, start, count)
+        profiler.count("draw_calls", len(self.buckets))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glPopAttrib()
+
+    def release(self):
+        gpu_resources.release("buffer", self.vertex_buffer)
+
+class SpatialGrid:
+    CELL_BITS = 21
+
+    def __init__(self, cell_size=4.0):
+        self.cell_size = cell_size
+        self.centers = np.zeros((0, 3))
+        self.radii = np.zeros(0)
+        self.lower = np.zeros((0, 3), dtype=np.int64)
+        self.upper = np.zeros((0, 3), dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.intp)
+        self.rebuilds = 0
+
+    def cell_ranges(self, centers, radii):
+        lower = np.floor((centers - radii[:, np.newaxis]) / self.cell_size).astype(np.int64)
+        upper = np.floor((centers + radii[:, np.newaxis]) / self.cell_size).astype(np.int64)
+        return lower, upper
+
+    @classmethod
+    def cell_keys(cls, cells):
+        mask = (1 << cls.CELL_BITS) - 1
+        return ((cells[:, 0] & mask) << (2 * cls.CELL_BITS)) | ((cells[:, 1] & mask) << cls.CELL_BITS) | (cells[:, 2] & mask)
+
+    @staticmethod
+    def expand(lower, upper):
+        # Jede Kugel in alle Zellen eintragen, die ihre Bounding Box überlappt
+        span = upper - lower + 1
+        counts = span.prod(axis=1)
+        owners = np.repeat(np.arange(len(lower)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        span_yz = span[owners, 1] * span[owners, 2]
+        offsets = np.stack([local // span_yz, local % span_yz // span[owners, 2], local % span[owners, 2]], axis=1)
+        return owners, lower[owners] + offsets
+
+    def update(self, centers, radii):
+        lower, upper = self.cell_ranges(centers, radii)
+        self.centers = centers
+        self.radii = radii
+
+        if len(lower) != len(self.lower):
+            self.rebuild(lower, upper)
+            return
+
+        # Spaltenweise verknüpft statt any(axis=1): bei 100k Körpern ein Mehrfaches schneller
+        moved = (lower != self.lower) | (upper != self.upper)
+        changed = np.flatnonzero(moved[:, 0] | moved[:, 1] | moved[:, 2])
+        self.lower, self.upper = lower, upper
+        if len(changed) == 0:
+            return
+        if len(changed) > len(lower) // 4:
+            self.rebuild(lower, upper)
+            return
+
+        # Nur Kugeln neu einsortieren, die ihre Zellen gewechselt haben
+        keep = ~np.isin(self.ids, changed)
+        keys, ids = self.keys[keep], self.ids[keep]
+        owners, cells = self.expand(lower[changed], upper[changed])
+        new_keys = self.cell_keys(cells)
+        new_ids = changed[owners]
+        order = np.argsort(new_keys, kind="stable")
+        positions = np.searchsorted(keys, new_keys[order])
+        self.keys = np.insert(keys, positions, new_keys[order])
+        self.ids = np.insert(ids, positions, new_ids[order])
+
+    def rebuild(self, lower, upper):
+        self.lower, self.upper = lower, upper
+        owners, cells = self.expand(lower, upper)
+        keys = self.cell_keys(cells)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.ids = owners[order]
+        self.rebuilds += 1
+
+    def candidates(self, centers, radii):
+        lower, upper = self.cell_ranges(centers, radii)
+        owners, cells = self.expand(lower, upper)
+        keys = self.cell_keys(cells)
+        left = np.searchsorted(self.keys, keys, side="left")
+        counts = np.searchsorted(self.keys, keys, side="right") - left
+
+        queries = np.repeat(owners, counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        objects = self.ids[np.repeat(left, counts) + local]
+
+        # Eine Kugel kann in mehreren Zellen liegen: doppelte Paare entfernen
+        pairs = np.unique(queries * max(len(self.centers), 1) + objects)
+        return pairs // max(len(self.centers), 1), pairs % max(len(self.centers), 1)
+
+    def query_spheres(self, centers, radii):
+        centers = np.atleast_2d(centers)
+        radii = np.broadcast_to(np.asarray(radii, dtype=float), (len(centers),))
+        if len(self.keys) == 0 or len(centers) == 0:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+        queries, objects = self.candidates(centers, radii)
+        offsets = self.centers[objects] - centers[queries]
+        limit = self.radii[objects] + radii[queries]
+        inside = np.einsum("ij,ij->i", offsets, offsets) < limit ** 2
+        return queries[inside], objects[inside]
+
+    def query_segments(self, origins, directions, lengths):
+        origins = np.atleast_2d(origins)
+        lengths = np.broadcast_to(np.asarray(lengths, dtype=float), (len(origins),))
+        if len(self.keys) == 0 or len(origins) == 0:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty, np.zeros(0)
+
+        # Breitphase über die Hüllkugel jedes Segments, danach exakter Segment-Kugel-Test
+        queries, objects = self.candidates(origins + directions * (lengths / 2)[:, np.newaxis], lengths / 2)
+        offsets = self.centers[objects] - origins[queries]
+        t = np.clip(np.einsum("ij,ij->i", offsets, directions[queries]), 0.0, lengths[queries])
+        closest = offsets - directions[queries] * t[:, np.newaxis]
+        inside = np.einsum("ij,ij->i", closest, closest) <= self.radii[objects] ** 2
+        return queries[inside], objects[inside], t[inside]
+
+class LaserPool:
+    def __init__(self, capacity=8192, speed=1.0, lifetime=5.0, length=0.2):
+        self.capacity = capacity
+        self.speed = speed
+        self.lifetime = lifetime
+        self.length = length
+        self.positions = np.zeros((capacity, 3))
+        self.previous_positions = np.zeros((capacity, 3))
+        self.directions = np.zeros((capacity, 3))
+        self.age = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.line_vertices = np.zeros((capacity, 2, 3), dtype=np.float32)
+
+    def __len__(self):
+        return self.capacity - len(self.free_slots)
+
+    def fire(self, position, direction):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            # Pool voll: ältesten Strahl überschreiben
+            slot = int(np.argmax(self.age))
+        self.positions[slot] = position
+        self.previous_positions[slot] = position
+        self.directions[slot] = direction
+        self.age[slot] = 0.0
+        self.alive[slot] = True
+        return slot
+
+    def kill(self, slots):
+        slots = slots[self.alive[slots]]
+        self.alive[slots] = False
+        self.free_slots.extend(slots.tolist())
+
+    def update(self, dt, world=None, gravity=None):
+        self.move(dt, gravity)
+        hit_slots, hit_bodies = self.sweep(world, self.speed * dt)
+        self.expire(hit_slots)
+        return hit_slots, hit_bodies
+
+    def move(self, dt, gravity=None):
+        # Alle Strahlen gemeinsam bewegen; tote Einträge werden mitgerechnet, damit keine Indizierung nötig ist.
+        # gravity (GravityField) lenkt die lebenden Strahlen ab, ihre Geschwindigkeit bleibt dabei gleich
+        self.previous_positions[:] = self.positions
+        if gravity is not None:
+            slots = np.flatnonzero(self.alive)
+            if len(slots):
+                directions = self.directions[slots] + gravity.body_acceleration(self.positions[slots]) * (dt / self.speed)
+                self.directions[slots] = directions / np.maximum(np.linalg.norm(directions, axis=1, keepdims=True), 1e-12)
+        self.positions += self.directions * (self.speed * dt)
+        self.age += dt
 
+    @staticmethod
+    def extrapolate(origins, directions, accelerations, speed, elapsed):
+        # Bahn ab einem Basiszustand unter einer dort gemessenen, als konstant angenommenen Beschleunigung; wie in
+        # move lenkt nur der Anteil quer zur Flugrichtung ab. Für Clients, die Laser des Servers fortschreiben
+        elapsed = np.asarray(elapsed, dtype=float)[:, np.newaxis]
+        bending = accelerations - directions * np.einsum("ij,ij->i", accelerations, directions)[:, np.newaxis]
+        positions = origins + directions * (speed * elapsed) + bending * (0.5 * elapsed ** 2)
+        directions = directions + bending * (elapsed / speed)
+        return positions, directions / np.maximum(np.linalg.norm(directions, axis=1, keepdims=True), 1e-12)
+
+    def expire(self, hit_slots):
+        # Reihenfolge bestimmt die der freien Slots; die Wiedergabe (SessionPlayer) ruft das genauso auf
+        self.kill(hit_slots)
+        self.kill(np.flatnonzero(self.alive & (self.age > self.lifetime)))
+
+    def sweep(self, world, step):
+        empty = np.zeros(0, dtype=np.intp)
+        if world is None or not self.alive.any() or step <= 0:
+            return empty, empty
+
+        slots = np.flatnonzero(self.alive)
+        rows, bodies, t = world.query_segments(self.previous_positions[slots], self.directions[slots], step)
+        if len(rows) == 0:
+            return empty, empty
+
+        # Bei mehreren getroffenen Kugeln zählt die erste entlang des Strahls
+        order = np.lexsort((t, rows))
+        rows, bodies = rows[order], bodies[order]
+        first = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        return slots[rows[first]], bodies[first]
+
+    def draw(self, width=2.0, limit=None):
+        # limit: höchstens so viele Strahlen zeichnen (Qualitätsstufe), simuliert werden weiterhin alle
+        slots = np.flatnonzero(self.alive)[:limit]
+        if len(slots) == 0:
+            return
+
+        count = len(slots)
+        vertices = self.line_vertices[:count]
+        vertices[:, 0] = self.positions[slots]
+        vertices[:, 1] = self.positions[slots] - self.directions[slots] * self.length
+
+        glPushAttrib(GL_ENABLE_BIT | GL_LINE_BIT | GL_CURRENT_BIT)
+        glDisable(GL_LIGHTING)  # Lichter deaktivieren, um Laserstrahlen klarer zu sehen
+        glDisable(GL_TEXTURE_2D)
+        glColor3f(1.0, 0.0, 0.0)  # Red color for laser
+        glLineWidth(width)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, vertices)
+        glDrawArrays(GL_LINES, 0, count * 2)
+        profiler.count("draw_calls")
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glPopAttrib()
+
+class TextureUpload:
+    # Lädt eine Mip-Kette (GL_TEXTURE_2D) oder mehrere gleich große (GL_TEXTURE_2D_ARRAY) schrittweise hoch: von der
+    # kleinsten Stufe aufwärts, große Stufen in Streifen. GL_TEXTURE_BASE_LEVEL folgt der feinsten fertigen Stufe,
+    # die Textur ist also ab der ersten Stufe vollständig und wird nur noch schärfer.
+    def __init__(self, target, texture, chains, preload_pixels=64 * 64):
+        self.target = target
+        self.texture = texture
+        self.chains = chains
+        self.level = len(chains[0]) - 1
+        self.layer = 0
+        self.row = 0
+        # Kleine Stufen sofort, damit die Textur gleich benutzbar ist
+        while not self.done and self.pixels() <= preload_pixels:
+            self.step(self.pixels() * 4)
+
+    @property
+    def done(self):
+        return self.level < 0
+
+    def pixels(self):
+        height, width = self.chains[0][self.level].shape[:2]
+        return width * height
+
+    def step(self, max_bytes):
+        # Lädt höchstens max_bytes (mindestens eine Zeile) der aktuellen Stufe hoch
+        pixels = self.chains[self.layer][self.level]
+        height, width = pixels.shape[:2]
+        glBindTexture(self.target, self.texture)
+        if self.layer == 0 and self.row == 0:
+            if self.target == GL_TEXTURE_2D_ARRAY:
+                glTexImage3D(self.target, self.level, GL_RGBA8, width, height, len(self.chains), 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+            else:
+                glTexImage2D(self.target, self.level, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+
+        rows = min(max(max_bytes // (width * 4), 1), height - self.row)
+        strip = np.ascontiguousarray(pixels[self.row:self.row + rows])
+        if self.target == GL_TEXTURE_2D_ARRAY:
+            glTexSubImage3D(self.target, self.level, 0, self.row, self.layer, width, rows, 1, GL_RGBA, GL_UNSIGNED_BYTE, strip)
+        else:
+            glTexSubImage2D(self.target, self.level, 0, self.row, width, rows, GL_RGBA, GL_UNSIGNED_BYTE, strip)
+        self.row += rows
+
+        if self.row == height:
+            self.row = 0
+            self.layer += 1
+            if self.layer == len(self.chains):
+                self.layer = 0
+                glTexParameteri(self.target, GL_TEXTURE_BASE_LEVEL, self.level)
+                self.level -= 1
+        glBindTexture(self.target, 0)
+        return strip.nbytes
+
+    def finish(self):
+        while not self.done:
+            self.step(1 << 30)
+
+class TextureCache:
+    VERSION = 1
+
+    def __init__(self, cache_dir=".cache/textures", max_size=2048, workers=None, progressive=True):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.progressive = progressive  # False: request() wartet auf das Dekodieren und lädt sofort alles hoch
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.index = {"version": self.VERSION, "sources": {}, "entries": {}}
+        self.index_lock = threading.Lock()
+        self.index_dirty = False
+        self.pending = {}
+        self.failed = set()
+        self.textures = {}
+        self.colors = {}
+        self.texture_sizes = {}  # GL-Textur -> (Target, größere Kantenlänge der feinsten Stufe)
+        self.resolution_cap = None  # Qualitätsstufe: feinste gesampelte Kantenlänge, None = volle Auflösung
+        self.uploads = []  # TextureUpload, abgearbeitet von pump()
+        self.budget = None  # Bytes für alle Texturen auf der GPU, darüber verdrängt evict(); None = unbegrenzt
+        self.last_used = OrderedDict()  # Digest -> Frame der letzten Anfrage, am längsten unbenutzte zuerst
+        self.digest_paths = {}  # Digest -> Pfade, deren dekodierte Stufen beim Verdrängen mit verworfen werden
+        self.frame = 0
+        self.evictions = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4)
+
+        os.makedirs(cache_dir, exist_ok=True)
         try:
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
-        except OpenGL.error.GLError as e:
-            logging.error(f"OpenGL error loading texture: {e}")
-            return None
+            with open(self.index_path) as f:
+                index = json.load(f)
+            if index.get("version") == self.VERSION:
+                self.index = index
+        except (OSError, ValueError):
+            pass
+
+    def content_hash(self, path):
+        stat = os.stat(path)
+        with self.index_lock:
+            source = self.index["sources"].get(path)
+        if source and source["mtime"] == stat.st_mtime_ns and source["size"] == stat.st_size:
+            return source["hash"]
+
+        with open(path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+
+        with self.index_lock:
+            # erst neuen Stand eintragen, sonst hält der alte Eintrag den veralteten Hash am Leben
+            self.index["sources"][path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": digest}
+            self.index_dirty = True
+            if source and source["hash"] != digest:
+                self.invalidate(source["hash"])
+        return digest
+
+    def invalidate(self, digest):
+        # Quelle hat sich geändert: alte Cache-Dateien aller Größen entfernen, falls keine andere Quelle sie noch nutzt
+        if any(source["hash"] == digest for source in self.index["sources"].values() if source):
+            return
+        prefix = f"{digest}_"
+        for key in [key for key in self.index["entries"] if key.startswith(prefix)]:
+            del self.index["entries"][key]
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith(".npy"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def prefetch(self, paths):
+        for path in paths:
+            if path not in self.pending:
+                self.pending[path] = self.executor.submit(self.load_levels, path)
+
+    def load_levels(self, path):
+        digest = self.content_hash(path)
+        key = f"{digest}_{self.max_size}"
+        cache_file = os.path.join(self.cache_dir, f"{key}.npy")
+
+        with self.index_lock:
+            sizes = self.index["entries"].get(key)
+        if sizes and os.path.exists(cache_file):
+            data = np.load(cache_file, mmap_mode="r")
+            return digest, self.split_levels(data, sizes)
+
+        texture_surface = pygame.image.load(path)
+        texture_surface = self.scale_texture(texture_surface, self.max_size)
+        width, height = texture_surface.get_rect().size
+        pixels = np.frombuffer(pygame.image.tostring(texture_surface, "RGBA", 1), dtype=np.uint8).reshape(height, width, 4)
+        levels = self.build_mipmaps(pixels)
+        sizes = [(level.shape[1], level.shape[0]) for level in levels]
 
-        glBindTexture(GL_TEXTURE_2D, 0)
-        return texture
+        tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "wb") as f:
+            np.save(f, np.concatenate([level.ravel() for level in levels]))
+        os.replace(tmp_file, cache_file)
+        with self.index_lock:
+            self.index["entries"][key] = sizes
+            self.index_dirty = True
+
+        logging.info(f"Texture decoded and cached: {path} ({width}x{height}, {len(levels)} levels)")
+        return digest, levels
+
+    @staticmethod
+    def split_levels(data, sizes):
+        levels = []
+        offset = 0
+        for width, height in sizes:
+            count = width * height * 4
+            levels.append(data[offset:offset + count].reshape(height, width, 4))
+            offset += count
+        return levels
+
+    @staticmethod
+    def build_mipmaps(pixels):
+        levels = [pixels]
+        while levels[-1].shape[0] > 1 or levels[-1].shape[1] > 1:
+            level = levels[-1].astype(np.uint16)
+            if level.shape[0] > 1:
+                level = level[:level.shape[0] // 2 * 2]
+                level = level[0::2] + level[1::2]
+            else:
+                level = level * 2
+            if level.shape[1] > 1:
+                level = level[:, :level.shape[1] // 2 * 2]
+                level = level[:, 0::2] + level[:, 1::2]
+            else:
+                level = level * 2
+            levels.append(((level + 2) // 4).astype(np.uint8))
+        return levels
 
     @staticmethod
     def scale_texture(texture_surface, max_size):
         width, height = texture_surface.get_rect().size
         if width > max_size or height > max_size:
+            if texture_surface.get_bitsize() not in (24, 32):
+                # smoothscale kann nur 24/32 Bit, z.B. die 8-Bit-Palette der Erd-Nachttextur
+                texture_surface = texture_surface.convert(32)
             scaling_factor = max_size / max(width, height)
             new_width = int(width * scaling_factor)
             new_height = int(height * scaling_factor)
             texture_surface = pygame.transform.smoothscale(texture_surface, (new_width, new_height))
         return texture_surface
 
+    def ready(self, path):
+        # Dekodieren abgeschlossen (oder fehlgeschlagen), decoded() blockiert dann nicht mehr
+        self.prefetch([path])
+        return self.pending[path].done()
+
+    def decoded(self, path):
+        # Dekodierte Mip-Stufen ohne GL-Upload, z.B. für Textur-Arrays
+        self.prefetch([path])
+        if path in self.failed:
+            return None, None
+        try:
+            digest, levels = self.pending[path].result()
+        except (pygame.error, OSError) as e:
+            logging.error(f"Error loading texture: {e}")
+            self.failed.add(path)
+            return None, None
+
+        # Mittlere Farbe aus der kleinsten Mip-Stufe, z.B. für Impostors
+        self.colors[path] = tuple(float(c) / 255 for c in levels[-1][0, 0, :3])
+        return digest, levels
+
+    def request(self, path):
+        # Nicht blockierend: None, solange die Datei noch dekodiert wird; danach die GL-Textur, die zuerst nur die
+        # kleinen Mip-Stufen enthält und über pump() bis zur vollen Auflösung wächst
+        if self.progressive and not self.ready(path):
+            return None
+        digest, levels = self.decoded(path)
+        if levels is None:
+            return None
+
+        # Identische Bilder teilen sich eine GL-Textur
+        if digest not in self.textures:
+            texture = gpu_resources.track("texture", glGenTextures(1), f"TextureCache {path}",
+                                          sum(level.nbytes for level in levels))
+            glBindTexture(GL_TEXTURE_2D, texture)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, len(levels) - 1)
+            glBindTexture(GL_TEXTURE_2D, 0)
+            self.register(GL_TEXTURE_2D, texture, max(levels[0].shape[:2]))
+            self.schedule(TextureUpload(GL_TEXTURE_2D, texture, [levels]))
+            logging.info(f"Loading texture: {path} ({levels[0].shape[1]}x{levels[0].shape[0]})")
+            self.textures[digest] = texture
+        self.digest_paths.setdefault(digest, set()).add(path)
+        self.last_used[digest] = self.frame
+        self.last_used.move_to_end(digest)
+        return self.textures[digest]
+
+    def register(self, target, texture, size):
+        # Auch Texturen, die nicht dem Cache gehören (Textur-Arrays der ShaderPipeline), folgen der Obergrenze
+        self.texture_sizes[texture] = (target, size)
+        self.limit_resolution(texture)
+
+    def set_resolution_cap(self, max_size):
+        if max_size != self.resolution_cap:
+            self.resolution_cap = max_size
+            for texture in self.texture_sizes:
+                self.limit_resolution(texture)
+
+    def limit_resolution(self, texture):
+        # GL_TEXTURE_MIN_LOD statt neu hochladen: die Mip-Kette liegt schon vollständig auf der GPU, gesampelt wird
+        # nur noch ab der Stufe mit höchstens resolution_cap Pixeln Kantenlänge. BASE_LEVEL bleibt dem
+        # progressiven Upload überlassen.
+        target, size = self.texture_sizes[texture]
+        level = 0
+        if self.resolution_cap:
+            level = max(math.ceil(math.log2(size / self.resolution_cap)), 0)
+        glBindTexture(target, texture)
+        glTexParameterf(target, GL_TEXTURE_MIN_LOD, float(level))
+        glBindTexture(target, 0)
+
+    def schedule(self, upload):
+        if self.progressive:
+            self.uploads.append(upload)
+        else:
+            upload.finish()
+            profiler.count("texture_uploads")
+
+    def pump(self, budget=0.002, chunk_bytes=256 * 1024):
+        # Einmal pro Frame auf dem GL-Thread: ausstehende Uploads stückweise, bis das Zeitbudget (Sekunden) verbraucht
+        # ist; immer zuerst die Textur mit der kleinsten nächsten Stufe, so werden alle gleichmäßig schärfer
+        deadline = time.perf_counter() + budget
+        self.frame += 1
+        self.evict()
+        while self.uploads and time.perf_counter() < deadline:
+            upload = min(self.uploads, key=TextureUpload.pixels)
+            try:
+                upload.step(chunk_bytes)
+            except GLError as e:
+                logging.error(f"OpenGL error loading texture: {e}")
+                glBindTexture(upload.target, 0)
+                upload.level = -1
+            if upload.done:
+                self.uploads.remove(upload)
+                profiler.count("texture_uploads")
+
+        # Index erst schreiben, wenn alle angestoßenen Dekodierungen durch sind
+        if self.index_dirty and all(future.done() for future in self.pending.values()):
+            self.save_index()
+
+    def evict(self):
+        # Über dem Budget die am längsten nicht angefragten Texturen löschen; was im letzten Frame gezeichnet wurde,
+        # bleibt. Die dekodierten Stufen werden mit verworfen: request() lädt sie neu aus dem .npy-Cache (mmap).
+        # Textur-Arrays der ShaderPipeline zählen zum Budget, werden aber nicht verdrängt.
+        if self.budget is None:
+            return
+        total = gpu_resources.bytes("texture")
+        while total > self.budget and self.last_used:
+            digest, frame = next(iter(self.last_used.items()))
+            if frame >= self.frame - 1:
+                break
+            del self.last_used[digest]
+            texture = self.textures.pop(digest)
+            total -= gpu_resources.handles["texture", texture][1]
+            del self.texture_sizes[texture]
+            self.uploads = [upload for upload in self.uploads if upload.texture != texture]
+            for path in self.digest_paths.pop(digest, ()):
+                self.pending.pop(path, None)
+            gpu_resources.release("texture", texture)
+            self.evictions += 1
+            profiler.count("texture_evictions")
+
+    def save_index(self):
+        with self.index_lock:
+            index = json.dumps(self.index)
+            self.index_dirty = False
+        tmp_file = f"{self.index_path}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(index)
+        os.replace(tmp_file, self.index_path)
+
+    def release(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for texture in self.textures.values():
+            gpu_resources.release("texture", texture)
+        self.textures.clear()
+        self.last_used.clear()
+        self.digest_paths.clear()
+        self.texture_sizes.clear()
+        self.pending.clear()
+        self.uploads.clear()
+
+class MeshSimplifier:
+    # Kantenkollaps mit Fehlerquadriken (Garland/Heckbert): jede Ecke trägt die Summe der Ebenen ihrer Dreiecke,
+    # kollabiert wird immer die Kante mit dem kleinsten Abstandsfehler. Mehrfaches simplify() baut eine LOD-Kette.
+    def __init__(self, positions, triangles, boundary_weight=10.0):
+        self.positions = np.array(positions, dtype=np.float64)
+        self.triangles = np.array(triangles, dtype=np.int64).reshape(-1, 3)
+        count = len(self.positions)
+        self.face_alive = np.ones(len(self.triangles), dtype=bool)
+        self.vertex_alive = np.ones(count, dtype=bool)
+        self.version = np.zeros(count, dtype=np.int64)
+        self.face_count = len(self.triangles)
+        self.error = 0.0  # größter bisher akzeptierter Kollapsfehler (quadratisch)
+
+        self.vertex_faces = [set() for _ in range(count)]
+        for face, corners in enumerate(self.triangles.tolist()):
+            for vertex in corners:
+                self.vertex_faces[vertex].add(face)
+
+        a, b, c = (self.positions[self.triangles[:, k]] for k in range(3))
+        normals = np.cross(b - a, c - a)
+        normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        self.quadrics = np.zeros((count, 4, 4))
+        self.add_planes(self.triangles, normals, a)
+
+        # Randkanten (nur an einem Dreieck) über eine senkrechte Ebene festhalten, sonst schrumpfen offene Ränder
+        edges = np.sort(self.triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        unique_edges, inverse, counts = np.unique(edges, axis=0, return_inverse=True, return_counts=True)
+        boundary = counts[inverse.ravel()] == 1
+        if boundary.any():
+            edge = edges[boundary]
+            start, end = self.positions[edge[:, 0]], self.positions[edge[:, 1]]
+            planes = np.cross(end - start, normals[np.flatnonzero(boundary) // 3])
+            planes /= np.maximum(np.linalg.norm(planes, axis=1, keepdims=True), 1e-12)
+            self.add_planes(edge, planes, start, boundary_weight)
+
+        self.heap = []
+        for i, j in unique_edges.tolist():
+            self.push(i, j)
+
+    def add_planes(self, corners, normals, points, weight=1.0):
+        planes = np.concatenate([normals, -np.einsum("ij,ij->i", normals, points)[:, np.newaxis]], axis=1)
+        products = weight * planes[:, :, np.newaxis] * planes[:, np.newaxis, :]
+        for k in range(corners.shape[1]):
+            np.add.at(self.quadrics, corners[:, k], products)
+
+    def collapse_target(self, i, j):
+        # Optimaler Punkt aus Q·v = 0, sonst der beste aus Endpunkten und Mitte
+        quadric = self.quadrics[i] + self.quadrics[j]
+        candidates = [self.positions[i], self.positions[j], (self.positions[i] + self.positions[j]) / 2]
+        system = quadric.copy()
+        system[3] = (0, 0, 0, 1)
+        if abs(np.linalg.det(system)) > 1e-10:
+            candidates.append(np.linalg.solve(system, (0, 0, 0, 1))[:3])
+        costs = [max(float(np.append(v, 1) @ quadric @ np.append(v, 1)), 0.0) for v in candidates]
+        best = int(np.argmin(costs))
+        return costs[best], candidates[best]
+
+    def push(self, i, j):
+        cost, target = self.collapse_target(i, j)
+        heapq.heappush(self.heap, (cost, i, j, int(self.version[i]), int(self.version[j]), tuple(target.tolist())))
+
+    def collapse(self, i, j, target):
+        faces_i, faces_j = self.vertex_faces[i], self.vertex_faces[j]
+        shared = faces_i & faces_j
+        # Kein verbleibendes Dreieck darf umklappen oder zu einer Linie werden
+        for face in (faces_i | faces_j) - shared:
+            corners = self.triangles[face]
+            before = self.positions[corners]
+            after = before.copy()
+            after[(corners == i) | (corners == j)] = target
+            normal_before = np.cross(before[1] - before[0], before[2] - before[0])
+            normal_after = np.cross(after[1] - after[0], after[2] - after[0])
+            if normal_before @ normal_after <= 0.05 * np.linalg.norm(normal_before) * np.linalg.norm(normal_after):
+                return False
+
+        for face in shared:
+            self.face_alive[face] = False
+            self.face_count -= 1
+            for vertex in self.triangles[face].tolist():
+                self.vertex_faces[vertex].discard(face)
+        for face in self.vertex_faces[j]:
+            corners = self.triangles[face]
+            corners[corners == j] = i
+            self.vertex_faces[i].add(face)
+        self.vertex_faces[j] = set()
+        self.vertex_alive[j] = False
+        self.positions[i] = target
+        self.quadrics[i] += self.quadrics[j]
+        self.version[i] += 1
+        self.version[j] += 1
+
+        neighbours = {vertex for face in self.vertex_faces[i] for vertex in self.triangles[face].tolist()}
+        for vertex in neighbours - {i}:
+            self.push(i, vertex)
+        return True
+
+    def simplify(self, target_triangles):
+        # Kollabiert, bis höchstens target_triangles übrig sind; liefert (Positionen, Dreiecke, Fehler)
+        while self.face_count > target_triangles and self.heap:
+            cost, i, j, version_i, version_j, target = heapq.heappop(self.heap)
+            if not (self.vertex_alive[i] and self.vertex_alive[j]):
+                continue
+            if self.version[i] != version_i or self.version[j] != version_j:
+                continue
+            if self.collapse(i, j, np.array(target)):
+                self.error = max(self.error, cost)
+        return self.mesh() + (math.sqrt(self.error),)
+
+    def mesh(self):
+        used, triangles = np.unique(self.triangles[self.face_alive], return_inverse=True)
+        return self.positions[used], triangles.reshape(-1, 3)
+
+class ModelAsset:
+    # Vorverarbeitetes Modell: ein Header (JSON) und die Vertex-/Indexpuffer aller LOD-Stufen, 16-Byte-ausgerichtet,
+    # damit die Puffer direkt aus einer memmap an OpenGL gehen können
+    MAGIC = b"SSMODEL1"
+    ALIGNMENT = 16
+    RATIOS = (0.5, 0.25, 0.1)
+
+    def __init__(self, header, data):
+        self.header = header
+        self.data = data  # uint8-Array (memmap beim Laden)
+
+    @property
+    def name(self):
+        return self.header["name"]
+
+    @property
+    def lod_count(self):
+        return len(self.header["lods"])
+
+    def lod(self, level):
+        entry = self.header["lods"][level]
+        offset, count = entry["vertices"]
+        vertices = self.data[offset:offset + count * 32].view(np.float32).reshape(-1, 8)
+        offset, count = entry["indices"]
+        indices = self.data[offset:offset + count * 4].view(np.uint32)
+        return vertices, indices
+
+    @staticmethod
+    def source_digest(path):
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    @staticmethod
+    def weld(path):
+        # STL speichert jedes Dreieck mit eigenen Ecken: gleiche Positionen zusammenführen, entartete Dreiecke weg
+        corners = mesh.Mesh.from_file(path).vectors.reshape(-1, 3).astype(np.float64)
+        positions, triangles = np.unique(corners, axis=0, return_inverse=True)
+        triangles = triangles.reshape(-1, 3)
+        keep = ((triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2])
+                & (triangles[:, 2] != triangles[:, 0]))
+        return positions, triangles[keep]
+
+    @staticmethod
+    def flat_vertices(positions, triangles):
+        # Flächennormalen wie bisher beim Schiff, Kugelkoordinaten als UV; gleiche Ecken eines Stücks teilen sich den Vertex
+        corners = positions[triangles]
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        vertices = np.empty((len(triangles), 3, 8), dtype=np.float32)
+        vertices[..., :3] = corners
+        vertices[..., 3:6] = normals[:, np.newaxis, :]
+        vertices = vertices.reshape(-1, 8)
+        vertices[:, 6:] = ModelMesh.spherical_uv(vertices[:, :3])
+        vertices, indices = np.unique(vertices, axis=0, return_inverse=True)
+        return np.ascontiguousarray(vertices, dtype=np.float32), indices.ravel().astype(np.uint32)
+
+    @classmethod
+    def build(cls, path, name=None, ratios=RATIOS):
+        started = time.perf_counter()
+        positions, triangles = cls.weld(path)
+        # Auf Radius 1 um den Mittelpunkt normiert; Mittelpunkt und Radius stehen im Header
+        center = (positions.min(axis=0) + positions.max(axis=0)) / 2
+        radius = float(np.linalg.norm(positions - center, axis=1).max())
+        positions = (positions - center) / radius
+
+        lods = [(positions, triangles, 0.0)]
+        simplifier = MeshSimplifier(positions, triangles)
+        for ratio in ratios:
+            lods.append(simplifier.simplify(max(int(len(triangles) * ratio), 4)))
+
+        chunks = []
+        offset = 0
+        entries = []
+        for lod_positions, lod_triangles, error in lods:
+            vertices, indices = cls.flat_vertices(lod_positions, lod_triangles)
+            entry = {"triangles": len(lod_triangles), "error": error}
+            for key, array in (("vertices", vertices), ("indices", indices)):
+                entry[key] = (offset, len(array))
+                raw = array.tobytes()
+                raw += bytes(-len(raw) % cls.ALIGNMENT)
+                chunks.append(raw)
+                offset += len(raw)
+            entries.append(entry)
+
+        header = {
+            "name": name or os.path.splitext(os.path.basename(path))[0],
+            "source": path,
+            "source_sha1": cls.source_digest(path),
+            "center": center.tolist(),
+            "radius": radius,
+            "lods": entries,
+        }
+        logging.info(f"Model asset built: {path} ({' / '.join(str(e['triangles']) for e in entries)} triangles, "
+                     f"{time.perf_counter() - started:.2f}s)")
+        return cls(header, np.frombuffer(b"".join(chunks), dtype=np.uint8))
+
+    def save(self, path):
+        header = json.dumps(self.header).encode()
+        prefix = self.MAGIC + struct.pack("<I", len(header)) + header
+        prefix += bytes(-len(prefix) % self.ALIGNMENT)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_file = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(prefix)
+            f.write(self.data.tobytes())
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"Not a model asset: {path}")
+            length, = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(length))
+        offset = len(cls.MAGIC) + 4 + length
+        offset += -offset % cls.ALIGNMENT
+        return cls(header, np.memmap(path, dtype=np.uint8, mode="r", offset=offset))
+
+class ModelMesh:
+    # Indiziertes Mesh mit (x, y, z, nx, ny, nz, u, v) pro Vertex, passt in den Instanzpfad der Planeten
+    def __init__(self, vertices, indices):
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        indices = np.ascontiguousarray(indices, dtype=np.uint32)
+        self.index_count = len(indices)
+        self.triangle_count = self.index_count // 3
+        self.vertex_buffer, self.index_buffer = (int(buffer) for buffer in glGenBuffers(2))
+        gpu_resources.track("buffer", self.vertex_buffer, type(self).__name__, vertices.nbytes)
+        gpu_resources.track("buffer", self.index_buffer, type(self).__name__, indices.nbytes)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    @staticmethod
+    def spherical_uv(directions):
+        # Kugelprojektion als Ersatz, wenn das Modell keine Texturkoordinaten hat (z.B. STL)
+        directions = directions / np.maximum(np.linalg.norm(directions, axis=1, keepdims=True), 1e-9)
+        u = 0.5 + np.arctan2(directions[:, 0], directions[:, 2]) / (2 * np.pi)
+        v = np.arccos(np.clip(directions[:, 1], -1, 1)) / np.pi
+        return np.stack([u, v], axis=1)
+
+    @classmethod
+    def rock(cls, seed, subdivisions=1, roughness=0.35):
+        # Unregelmäßiger Gesteinsbrocken: verformtes Ikosaeder mit flacher Schattierung (80 Dreiecke bei einer Teilung)
+        t = (1 + 5 ** 0.5) / 2
+        points = [(-1, t, 0), (1, t, 0), (-1, -t, 0), (1, -t, 0), (0, -1, t), (0, 1, t),
+                  (0, -1, -t), (0, 1, -t), (t, 0, -1), (t, 0, 1), (-t, 0, -1), (-t, 0, 1)]
+        faces = [(0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11), (1, 5, 9), (5, 11, 4), (11, 10, 2),
+                 (10, 7, 6), (7, 1, 8), (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8), (3, 8, 9), (4, 9, 5),
+                 (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1)]
+        for _ in range(subdivisions):
+            midpoints = {}
+            subdivided = []
+            for a, b, c in faces:
+                ab, bc, ca = [midpoints.setdefault(tuple(sorted(edge)), len(points) + len(midpoints))
+                              for edge in ((a, b), (b, c), (c, a))]
+                subdivided += [(a, ab, ca), (b, bc, ab), (c, ca, bc), (ab, bc, ca)]
+            for (a, b), index in sorted(midpoints.items(), key=lambda item: item[1]):
+                points.append(tuple((np.add(points[a], points[b]) / 2).tolist()))
+            faces = subdivided
+
+        points = np.array(points)
+        points /= np.linalg.norm(points, axis=1, keepdims=True)
+        rng = np.random.RandomState(seed)
+        bumps = rng.normal(size=(4, 3))
+        radius = 1 + roughness * np.sin(points @ bumps.T * 2.5 + rng.uniform(0, 2 * np.pi, 4)).mean(axis=1)
+        points *= (radius / radius.max())[:, np.newaxis]
+
+        corners = points[np.array(faces)]
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+        vertices = np.empty((len(faces), 3, 8), dtype=np.float32)
+        vertices[..., :3] = corners
+        vertices[..., 3:6] = normals[:, np.newaxis, :]
+        vertices = vertices.reshape(-1, 8)
+        vertices[:, 6:] = cls.spherical_uv(vertices[:, :3])
+        return cls(vertices, np.arange(len(vertices)))
+
     def draw(self):
+        stride = 8 * 4
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, stride, ctypes.c_void_p(12))
+        glTexCoordPointer(2, GL_FLOAT, stride, ctypes.c_void_p(24))
+        glDrawElements(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, ctypes.c_void_p(0))
+        profiler.count("draw_calls")
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def release(self):
+        gpu_resources.release("buffer", self.vertex_buffer)
+        gpu_resources.release("buffer", self.index_buffer)
+
+class SphereMesh(ModelMesh):
+    def __init__(self, slices, stacks):
+        self.slices = slices
+        self.stacks = stacks
+
+        # Gleiche Geometrie und Texturkoordinaten wie gluSphere (Pole auf der z-Achse)
+        s = np.linspace(0.0, 1.0, slices + 1, dtype=np.float32)
+        t = np.linspace(0.0, 1.0, stacks + 1, dtype=np.float32)
+        theta = 2 * np.pi * s[np.newaxis, :]
+        phi = np.pi * t[:, np.newaxis]
+        ring = np.sin(phi)
+
+        vertices = np.empty((stacks + 1, slices + 1, 8), dtype=np.float32)
+        vertices[..., 0] = ring * np.sin(theta)
+        vertices[..., 1] = ring * np.cos(theta)
+        vertices[..., 2] = -np.cos(phi)
+        vertices[..., 3:6] = vertices[..., 0:3]
+        vertices[..., 6] = s[np.newaxis, :]
+        vertices[..., 7] = t[:, np.newaxis]
+
+        row = np.arange(stacks, dtype=np.uint32)[:, np.newaxis] * (slices + 1)
+        column = np.arange(slices, dtype=np.uint32)[np.newaxis, :]
+        a = (row + column).ravel()
+        b = a + 1
+        c = a + slices + 1
+        d = c + 1
+        indices = np.stack([a, c, b, b, c, d], axis=1).ravel()
+
+        super().__init__(vertices.reshape(-1, 8), indices)
+
+class SphereMeshCache:
+    LEVELS = ((8, 6), (16, 12), (32, 24), (64, 48))
+
+    def __init__(self, levels=LEVELS, pixels_per_segment=8):
+        self.levels = [SphereMesh(slices, stacks) for slices, stacks in levels]
+        self.pixels_per_segment = pixels_per_segment
+
+    def select(self, pixel_radius):
+        # Kleinste Stufe, deren Segmente auf dem Bildschirm höchstens pixels_per_segment lang sind
+        required_slices = 2 * np.pi * pixel_radius / self.pixels_per_segment
+        for level in self.levels:
+            if level.slices >= required_slices:
+                return level
+        return self.levels[-1]
+
+    def select_indices(self, pixel_radii):
+        # Wie select, aber für viele Körper auf einmal; liefert Indizes in levels
+        required_slices = 2 * np.pi * np.asarray(pixel_radii) / self.pixels_per_segment
+        slices = np.array([level.slices for level in self.levels])
+        return np.minimum(np.searchsorted(slices, required_slices), len(self.levels) - 1)
+
+    def release(self):
+        for level in self.levels:
+            level.release()
+        self.levels = []
+
+class Model:
+    # LOD-Kette eines Modells; errors ist der geometrische Fehler je Stufe relativ zum Radius (aufsteigend)
+    def __init__(self, name, meshes, errors, center=(0, 0, 0), radius=1.0, max_error_pixels=0.5):
+        self.name = name
+        self.meshes = meshes
+        self.errors = np.asarray(errors, dtype=np.float64)
+        self.center = np.asarray(center, dtype=np.float32)
+        self.radius = radius
+        self.max_error_pixels = max_error_pixels
+
+    def select_indices(self, pixel_radii):
+        # Gröbste Stufe, deren Fehler auf dem Bildschirm höchstens max_error_pixels groß ist
+        allowed = self.max_error_pixels / np.maximum(np.asarray(pixel_radii, dtype=np.float64), 1e-9)
+        return np.maximum(np.searchsorted(self.errors, allowed, side="right") - 1, 0)
+
+    def select(self, pixel_radius):
+        return self.meshes[int(self.select_indices([pixel_radius])[0])]
+
+    def release(self):
+        for model_mesh in self.meshes:
+            model_mesh.release()
+
+class ModelRegistry:
+    # Modelle nach Namen; die Assets baut build_assets.py vorab, fehlt eines oder ist die Quelle neuer, wird es hier gebaut
+    SOURCES = {
+        "ship": "models/superman.stl",
+        "satellite": "textures/satellites/satellite1.stl",
+    }
+
+    def __init__(self, sources=None, cache_dir=".cache/models", max_error_pixels=0.5, workers=1):
+        self.sources = dict(self.SOURCES, **(sources or {}))
+        self.cache_dir = cache_dir
+        self.max_error_pixels = max_error_pixels
+        self.models = {}
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def asset_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.model")
+
+    def asset(self, name, rebuild=False, ratios=ModelAsset.RATIOS):
+        source = self.sources[name]
+        path = self.asset_path(name)
+        if not rebuild:
+            try:
+                asset = ModelAsset.load(path)
+                if asset.header["source_sha1"] == ModelAsset.source_digest(source):
+                    return asset
+                logging.info(f"Model asset {path} is out of date")
+            except FileNotFoundError:
+                logging.info(f"Model asset {path} not built yet (see build_assets.py)")
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Model asset {path} unreadable, rebuilding: {e}")
+        ModelAsset.build(source, name, ratios).save(path)
+        return ModelAsset.load(path)
+
+    def prefetch(self, names):
+        # Assets im Hintergrund laden bzw. bauen; hochgeladen wird erst in get() auf dem GL-Thread
+        for name in names:
+            if name not in self.pending and name not in self.models:
+                self.pending[name] = self.executor.submit(self.asset, name)
+
+    def ready(self, name):
+        self.prefetch([name])
+        return name in self.models or self.pending[name].done()
+
+    def get(self, name, wait=True):
+        # Erst beim ersten Zugriff hochladen; mit wait=False None, solange das Asset noch geladen wird
+        if name not in self.models:
+            if not wait and not self.ready(name):
+                return None
+            self.prefetch([name])
+            asset = self.pending.pop(name).result()
+            meshes = [ModelMesh(*asset.lod(level)) for level in range(asset.lod_count)]
+            errors = [lod["error"] for lod in asset.header["lods"]]
+            self.models[name] = Model(name, meshes, errors, asset.header["center"], asset.header["radius"],
+                                      self.max_error_pixels)
+            logging.info(f"Model loaded: {name} ({' / '.join(str(m.triangle_count) for m in meshes)} triangles)")
+        return self.models[name]
+
+    def release(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for model in self.models.values():
+            model.release()
+        self.models = {}
+        self.pending = {}
+
+class SolarSystem:
+    FIELDS = ("angle", "rotation_angle", "distance", "orbital_speed", "rotation_speed", "inclination", "eccentricity", "diameter",
+              "mass")
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.names = []
+        self.planets = []
+        self.fields = []  # BodyField, z.B. Asteroidengürtel
+        for field in self.FIELDS:
+            setattr(self, field, np.zeros(capacity))
+        self.positions = np.zeros((capacity, 3))
+        self.parents = np.full(capacity, -1, dtype=np.intp)  # Bahn um einen anderen Körper statt um die Sonne
+
+    def reserve(self, capacity):
+        if capacity <= len(self.angle):
+            return
+        capacity = max(capacity, 2 * len(self.angle))
+        for field in self.FIELDS + ("positions",):
+            old = getattr(self, field)
+            new = np.zeros((capacity,) + old.shape[1:])
+            new[:self.count] = old[:self.count]
+            setattr(self, field, new)
+        parents = np.full(capacity, -1, dtype=np.intp)
+        parents[:self.count] = self.parents[:self.count]
+        self.parents = parents
+
+    def add_bodies(self, names, diameter, distance, orbital_speed, start_angle, rotation_speed, inclination=0.0, eccentricity=0.0, parent=-1,
+                   mass=None):
+        # Ein Elternkörper muss vorher hinzugefügt worden sein und selbst um die Sonne kreisen. Masse ohne Angabe
+        # diameter³ (Erde 1)
+        count = len(names)
+        start, end = self.count, self.count + count
+        self.reserve(end)
+        self.names.extend(names)
+        self.angle[start:end] = start_angle
+        self.rotation_angle[start:end] = 0
+        self.distance[start:end] = distance
+        self.orbital_speed[start:end] = orbital_speed
+        self.rotation_speed[start:end] = rotation_speed
+        self.inclination[start:end] = inclination
+        self.eccentricity[start:end] = eccentricity
+        self.diameter[start:end] = diameter
+        self.mass[start:end] = np.asarray(diameter) ** 3 if mass is None else mass
+        self.parents[start:end] = parent
+        self.count = end
+        self.update_positions(start, end)
+        return range(start, end)
+
+    def add_body(self, name, diameter, distance, orbital_speed, start_angle, rotation_speed, inclination=0.0, eccentricity=0.0,
+                 mass=None):
+        return self.add_bodies([name], diameter, distance, orbital_speed, start_angle, rotation_speed, inclination, eccentricity,
+                               mass=mass)[0]
+
+    def update(self, dt):
+        n = self.count
+        self.angle[:n] += self.orbital_speed[:n] * dt
+        self.rotation_angle[:n] += self.rotation_speed[:n] * dt
+        self.update_positions(0, n)
+
+    def update_positions(self, start, end):
+        self.kepler_positions(self.angle[start:end], self.distance[start:end], self.inclination[start:end],
+                              self.eccentricity[start:end], out=self.positions[start:end])
+        children = start + np.flatnonzero(self.parents[start:end] >= 0)
+        if len(children):
+            self.positions[children] += self.positions[self.parents[children]]
+
+    @staticmethod
+    def kepler_positions(angle, distance, inclination, eccentricity, out=None, iterations=5):
+        # angle ist die mittlere Anomalie in Grad; die Bahnebene wird um die x-Achse geneigt.
+        # Gerechnet wird in float32: für Positionen genau genug, und NumPy nutzt dafür SIMD-Varianten von sin/cos,
+        # die bei 100k Körpern ein Vielfaches schneller sind als in float64
+        mean_anomaly = np.radians(np.remainder(angle, 360)).astype(np.float32)
+        eccentricity = np.asarray(eccentricity, dtype=np.float32)
+        inclination = np.asarray(inclination, dtype=np.float32)
+        eccentric_anomaly = mean_anomaly.copy()
+        if np.any(eccentricity):
+            for _ in range(iterations):
+                eccentric_anomaly -= (eccentric_anomaly - eccentricity * np.sin(eccentric_anomaly) - mean_anomaly) / \
+                                     (1 - eccentricity * np.cos(eccentric_anomaly))
+
+        x = distance * (np.cos(eccentric_anomaly) - eccentricity)
+        in_plane = distance * np.sqrt(1 - eccentricity ** 2) * np.sin(eccentric_anomaly)
+
+        if out is None:
+            out = np.empty((len(mean_anomaly), 3))
+        out[:, 0] = x
+        out[:, 1] = in_plane * np.sin(inclination)
+        out[:, 2] = in_plane * np.cos(inclination)
+        return out
+
+class Planet:
+    sphere_meshes = None  # von allen Planeten geteilt, wird beim ersten Zeichnen erzeugt
+
+    # Planet ist nur noch eine Sicht auf einen Eintrag im SolarSystem
+    def __init__(self, system, index, texture_path):
+        self.system = system
+        self.index = index
+        self.texture_path = texture_path
+        self.night_texture_path = None  # nur im Shader-Pfad, wird auf der Nachtseite eingeblendet
+        self.texture_id = None
+        self.color = (0.7, 0.7, 0.7)
+
+    @property
+    def name(self):
+        return self.system.names[self.index]
+
+    @property
+    def diameter(self):
+        return self.system.diameter[self.index]
+
+    @property
+    def distance(self):
+        return self.system.distance[self.index]
+
+    @property
+    def angle(self):
+        return self.system.angle[self.index]
+
+    @property
+    def rotation_angle(self):
+        return self.system.rotation_angle[self.index]
+
+    @property
+    def position(self):
+        return self.system.positions[self.index]
+
+    def load_texture(self, texture_cache):
+        # Nicht blockierend; bis die Textur da ist, wird der Planet einfarbig gezeichnet
+        self.texture_id = texture_cache.request(self.texture_path)
+        self.color = texture_cache.colors.get(self.texture_path, self.color)
+        return self.texture_id
+
+    def draw(self, pixel_radius=None):
+        if Planet.sphere_meshes is None:
+            Planet.sphere_meshes = SphereMeshCache()
+
+        if pixel_radius is None:
+            sphere = Planet.sphere_meshes.levels[-1]
+        else:
+            sphere = Planet.sphere_meshes.select(pixel_radius)
+
+        radius = self.diameter / 2
+
         glPushMatrix()
         glTranslatef(*self.position)
         glRotatef(np.degrees(self.angle), 0, 1, 0)
         glRotatef(180, 0, 0, 1)
         glRotatef(np.degrees(self.rotation_angle), 0, 1, 0)
 
-        glEnable(GL_TEXTURE_2D)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        quad = gluNewQuadric()
-        gluQuadricNormals(quad, GLU_SMOOTH)
-        gluQuadricTexture(quad, GL_TRUE)
+        if self.texture_id is not None:
+            glEnable(GL_TEXTURE_2D)
+            glBindTexture(GL_TEXTURE_2D, self.texture_id)
+            color = (1.0, 1.0, 1.0, 1.0)
+        else:
+            color = (*self.color, 1.0)
         glRotatef(90, 1, 0, 0)
+        glScalef(radius, radius, radius)
 
-        glPushMatrix()
-        gluSphere(quad, self.diameter / 2, 32, 32)
-        glPopMatrix()
-
-        glMaterialfv(GL_FRONT, GL_AMBIENT_AND_DIFFUSE, (1.0, 1.0, 1.0, 1.0))
-        gluSphere(quad, self.diameter / 2, 32, 32)
+        glMaterialfv(GL_FRONT, GL_AMBIENT_AND_DIFFUSE, color)
+        sphere.draw()
         glDisable(GL_TEXTURE_2D)
 
         glPopMatrix()
 
+    @classmethod
+    def release_meshes(cls):
+        if cls.sphere_meshes is not None:
+            cls.sphere_meshes.release()
+            cls.sphere_meshes = None
+
+class BodyField:
+    # Viele kleine Körper (Asteroiden, Trümmer, Satelliten) als zusammenhängender Bereich im SolarSystem: Bahnen,
+    # Breitphase und Kollisionen laufen gemeinsam mit den Planeten, gezeichnet wird instanziert
+    def __init__(self, name, system, indices, models, texture_paths, variants, axes, color):
+        self.name = name
+        self.system = system
+        self.start, self.end = indices.start, indices.stop
+        self.models = models  # Modell je Variante, z.B. "rock:0" oder "model:satellite" (ModelRegistry)
+        self.texture_paths = texture_paths  # Textur je Variante
+        self.variants = variants  # Variante je Körper
+        self.axes = axes  # Drehachse je Körper
+        self.color = color  # für Impostors
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def positions(self):
+        return self.system.positions[self.start:self.end]
+
+    @property
+    def radii(self):
+        return self.system.diameter[self.start:self.end] / 2
+
+    def matrices(self, indices):
+        # Obere drei Zeilen der Modellmatrix: Drehung um die eigene Achse (Rodrigues), skaliert auf den Radius
+        bodies = self.start + indices
+        angle = np.radians(self.system.rotation_angle[bodies])[:, np.newaxis, np.newaxis]
+        axes = self.axes[indices]
+        cross = np.zeros((len(indices), 3, 3))
+        cross[:, 0, 1], cross[:, 0, 2] = -axes[:, 2], axes[:, 1]
+        cross[:, 1, 0], cross[:, 1, 2] = axes[:, 2], -axes[:, 0]
+        cross[:, 2, 0], cross[:, 2, 1] = -axes[:, 1], axes[:, 0]
+        rotation = np.cos(angle) * np.identity(3) + np.sin(angle) * cross + \
+                   (1 - np.cos(angle)) * axes[:, :, np.newaxis] * axes[:, np.newaxis, :]
+
+        rows = np.empty((len(indices), 3, 4), dtype=np.float32)
+        rows[:, :, :3] = rotation * (self.system.diameter[bodies] / 2)[:, np.newaxis, np.newaxis]
+        rows[:, :, 3] = self.system.positions[bodies]
+        return rows
+
+
+class GravityField:
+    # Anziehung aller Körper als Summe über Plummer-Potentiale (weich innerhalb des Körperradius). Planeten und
+    # kleine Felder exakt; Felder mit mehr als exact_limit Körpern werden in einem dichten Gitter zu Zellen
+    # zusammengefasst (Masse und Schwerpunkt je Zelle, weich über die halbe Zellgröße), die Kosten hängen dann von
+    # der Zahl belegter Zellen statt der Körper ab. Zellen im Umkreis von near_radius um die Zelle eines Punkts
+    # werden wie beim Öffnen eines Knotens in Barnes-Hut durch ihre Körper ersetzt. Beschleunigung in Einheiten/s².
+    STRENGTH = 45.0  # Sonne (Masse 100) hält ein Schiff mit vollem Schub ab etwa 5 Einheiten Abstand fest
+
+    def __init__(self, system, strength=STRENGTH, exact_limit=2048, cell_size=2.0, near_radius=2.0, refresh_interval=0.5,
+                 chunk=1 << 16):
+        self.system = system
+        self.strength = strength
+        self.exact_limit = exact_limit
+        self.cell_size = cell_size
+        self.near_radius = near_radius  # im Gürtel mit 100k Körpern öffnet ein Schiff so etwa 1700 Körper
+        self.refresh_interval = refresh_interval  # Felder bewegen sich langsam: Zellen nur so oft neu bilden
+        self.chunk = chunk  # Punkte x Quellen je Block, begrenzt den Speicher der Zwischenarrays
+        self.count = -1
+        self.exact = np.zeros(0, dtype=np.intp)
+        self.exact_runs = []  # exact als zusammenhängende Abschnitte (Anfang, Ende)
+        self.grid_fields = []
+        self.refreshed = None
+        self.cells = (np.zeros((0, 3)), np.zeros(0), np.zeros(0))
+        self.members = np.zeros(0, dtype=np.intp)  # Körper nach Zelle sortiert
+        self.member_bounds = np.zeros(1, dtype=np.intp)  # Zelle i: members[bounds[i]:bounds[i + 1]]
+        self.member_mu = np.zeros(0)
+        self.member_softening = np.zeros(0)
+        self.grids = []  # je Feld (Ecke, Größe, Zelle je Gitterplatz oder -1)
+        self.sources = (np.zeros((0, 3)), np.zeros(0), np.zeros(0))
+
+    def partition(self):
+        system = self.system
+        exact = np.ones(system.count, dtype=bool)
+        self.grid_fields = []
+        for field in system.fields:
+            if len(field) > self.exact_limit:
+                exact[field.start:field.end] = False
+                self.grid_fields.append(field)
+        self.exact = np.flatnonzero(exact)
+        breaks = np.flatnonzero(np.diff(self.exact) != 1) + 1
+        self.exact_runs = [(int(run[0]), int(run[-1]) + 1) for run in np.split(self.exact, breaks) if len(run)]
+        self.count = system.count
+        self.refreshed = None
+
+    def update(self, now):
+        # Einmal pro Tick nach SolarSystem.update, now ist die Weltzeit
+        system = self.system
+        if system.count != self.count:
+            self.partition()
+        if self.refreshed is None or abs(now - self.refreshed) >= self.refresh_interval:
+            self.build_cells()
+            self.refreshed = now
+
+        # Quellen in float32: die Summe rechnet NumPy damit gut doppelt so schnell, für Kräfte genau genug
+        exact = self.exact
+        cell_positions, cell_mu, cell_softening = self.cells
+        self.sources = (np.concatenate([system.positions[exact], cell_positions]).astype(np.float32),
+                        np.concatenate([system.mass[exact] * self.strength, cell_mu]).astype(np.float32),
+                        np.concatenate([(system.diameter[exact] / 2) ** 2, cell_softening]).astype(np.float32))
+
+    def build_cells(self):
+        # Dichtes Gitter über die Bounding Box jedes Feldes: Summen je Zelle über bincount, die Körperlisten für
+        # die Nahfeldkorrektur über einen argsort des Zellindex (bis 65536 Zellen als Radix-Sort über uint16)
+        positions, mu, members, bounds = [], [], [], [np.zeros(1, dtype=np.intp)]
+        self.grids = []
+        cell_count = 0
+        for field in self.grid_fields:
+            points = self.system.positions[field.start:field.end]
+            masses = self.system.mass[field.start:field.end]
+            # Minimum und Maximum spaltenweise: über axis=0 einer (N, 3)-Matrix rechnet NumPy ein Vielfaches langsamer
+            lower = np.array([points[:, axis].min() for axis in range(3)])
+            cells = ((points - lower) / self.cell_size).astype(np.intp)
+            dims = np.array([cells[:, axis].max() for axis in range(3)]) + 1
+            flat = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+            size = int(dims.prod())
+            counts = np.bincount(flat, minlength=size)
+            mass = np.bincount(flat, masses, minlength=size)
+            occupied = np.flatnonzero(counts)
+            lookup = np.full(size, -1, dtype=np.intp)
+            lookup[occupied] = cell_count + np.arange(len(occupied))
+            self.grids.append((lower, dims, lookup))
+            cell_count += len(occupied)
+            centers = np.stack([np.bincount(flat, masses * points[:, axis], minlength=size)[occupied] for axis in range(3)], axis=1)
+            positions.append(centers / np.maximum(mass[occupied, np.newaxis], 1e-300))
+            mu.append(mass[occupied] * self.strength)
+            members.append(field.start + np.argsort(flat.astype(np.uint16) if size <= 1 << 16 else flat, kind="stable"))
+            bounds.append(bounds[-1][-1] + np.cumsum(counts[occupied]))
+        if not positions:
+            positions, mu = [np.zeros((0, 3))], [np.zeros(0)]
+            members = [np.zeros(0, dtype=np.intp)]
+        mu = np.concatenate(mu)
+        self.cells = (np.concatenate(positions), mu, np.full(len(mu), (self.cell_size / 2) ** 2))
+        self.members = np.concatenate(members)
+        self.member_bounds = np.concatenate(bounds)
+        self.member_mu = self.system.mass[self.members] * self.strength
+        self.member_softening = (self.system.diameter[self.members] / 2) ** 2
+
+    def update_body_positions(self):
+        # Nur die Positionen der exakt gerechneten Körper aus ihren Umlaufwinkeln: genug für body_acceleration, etwa
+        # wenn SessionPlayer die Laser nachrechnet
+        if self.system.count != self.count:
+            self.partition()
+        for start, end in self.exact_runs:
+            self.system.update_positions(start, end)
+
+    def body_acceleration(self, points):
+        # Nur die exakt gerechneten Körper (Sonne, Planeten, Monde, kleine Felder) mit ihren aktuellen Positionen, ohne
+        # Gitterzellen: für die vielen Laser, auf die ein Gürtel kaum wirkt. Hängt nur von SolarSystem.positions ab,
+        # nicht vom Stand der Zellen, daher kann die Wiedergabe es Tick für Tick exakt nachrechnen
+        system = self.system
+        if system.count != self.count:
+            self.partition()
+        exact = self.exact
+        return self.field(np.atleast_2d(points), system.positions[exact].astype(np.float32),
+                          (system.mass[exact] * self.strength).astype(np.float32),
+                          ((system.diameter[exact] / 2) ** 2).astype(np.float32), chunk=self.chunk)
+
+    def acceleration(self, points):
+        points = np.atleast_2d(points)
+        result = self.field(points, *self.sources, chunk=self.chunk)
+        cell_positions, cell_mu, cell_softening = self.cells
+        if len(cell_mu) == 0 or self.near_radius <= 0:
+            return result
+
+        # Nahfeld: nahe Zellen abziehen und ihre Körper mit den aktuellen Positionen exakt addieren
+        system = self.system
+        rows, cells = self.near_cells(points)
+        if len(rows) == 0:
+            return result
+        result -= self.pairs(points, rows, cell_positions[cells], cell_mu[cells], cell_softening[cells])
+
+        # Alle Paare (Punkt, Körper einer nahen Zelle) in Blöcken von höchstens chunk Paaren
+        starts = self.member_bounds[cells]
+        lengths = self.member_bounds[cells + 1] - starts
+        ends = np.cumsum(lengths)
+        first = 0
+        while first < len(cells):
+            last = max(int(np.searchsorted(ends, ends[first] - lengths[first] + self.chunk, side="right")), first + 1)
+            block = slice(first, last)
+            total = int(lengths[block].sum())
+            offsets = np.repeat(starts[block] - (ends[block] - lengths[block] - (ends[first] - lengths[first])), lengths[block])
+            order = offsets + np.arange(total)
+            result += self.pairs(points, np.repeat(rows[block], lengths[block]), system.positions[self.members[order]],
+                                 self.member_mu[order], self.member_softening[order])
+            first = last
+        return result
+
+    def near_cells(self, points):
+        # Nachbarzellen über den Gitterindex statt über Abstände zu allen Zellen: Paare (Punkt, Zelle)
+        reach = int(math.ceil(self.near_radius / self.cell_size))
+        stencil = np.stack(np.meshgrid(*[np.arange(-reach, reach + 1)] * 3, indexing="ij"), axis=-1).reshape(-1, 3)
+        rows, cells = [], []
+        for lower, dims, lookup in self.grids:
+            coords = np.floor((points - lower) / self.cell_size).astype(np.intp)
+            inside = np.flatnonzero(np.all((coords >= -reach) & (coords < dims + reach), axis=1))
+            if len(inside) == 0:
+                continue
+            neighbours = coords[inside, np.newaxis, :] + stencil
+            valid = np.all((neighbours >= 0) & (neighbours < dims), axis=2)
+            flat = (neighbours[..., 0] * dims[1] + neighbours[..., 1]) * dims[2] + neighbours[..., 2]
+            found = np.where(valid, lookup[np.where(valid, flat, 0)], -1)
+            hit = found >= 0
+            rows.append(np.broadcast_to(inside[:, np.newaxis], hit.shape)[hit])
+            cells.append(found[hit])
+        if not rows:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        return np.concatenate(rows), np.concatenate(cells)
+
+    @staticmethod
+    def pairs(points, rows, positions, mu, softening):
+        # Wie field, aber je Quelle nur für einen Punkt (rows), aufsummiert je Punkt
+        offsets = positions - points[rows]
+        r2 = np.einsum("ij,ij->i", offsets, offsets) + softening
+        weights = mu / (r2 * np.sqrt(r2))
+        return np.stack([np.bincount(rows, weights * offsets[:, axis], minlength=len(points)) for axis in range(3)], axis=1)
+
+    @staticmethod
+    def field(points, positions, mu, softening, chunk=1 << 16):
+        # Summe über alle Quellen in Blöcken von Punkten, je Achse eine (Punkte, Quellen)-Matrix: die Blöcke
+        # bleiben im Cache, und es entsteht kein (Punkte, Quellen, 3)-Zwischenarray. Gerechnet wird im Typ der Quellen
+        points = np.atleast_2d(points)
+        result = np.zeros((len(points), 3))
+        if len(mu) == 0:
+            return result
+        step = max(chunk // len(mu), 1)
+        x, y, z = positions.T
+        for start in range(0, len(points), step):
+            block = points[start:start + step].astype(positions.dtype)
+            dx, dy, dz = x - block[:, 0:1], y - block[:, 1:2], z - block[:, 2:3]
+            r2 = dx * dx
+            r2 += dy * dy
+            r2 += dz * dz
+            r2 += softening
+            weights = np.sqrt(r2)
+            weights *= r2
+            np.divide(mu, weights, out=weights)
+            for axis, offsets in enumerate((dx, dy, dz)):
+                result[start:start + step, axis] = np.einsum("ij,ij->i", weights, offsets)
+        return result
+
+    def snapshot(self):
+        # Bahnelemente der exakten Körper (und ihrer Elternkörper) und die aktuellen Zellen: genug, um die Quellen
+        # zu späteren Zeitpunkten in einem anderen Prozess zu berechnen (future_positions). Die Zellen werden beim
+        # Neubilden ersetzt, nicht verändert, und brauchen deshalb keine Kopie
+        system = self.system
+        exact = self.exact
+        parents = system.parents[exact]
+        orbits = {name: getattr(system, name)[exact]
+                  for name in ("angle", "orbital_speed", "distance", "inclination", "eccentricity")}
+        parent_orbits = {name: getattr(system, name)[np.maximum(parents, 0)]
+                         for name in ("angle", "orbital_speed", "distance", "inclination", "eccentricity")}
+        return {
+            "orbits": orbits, "parent_orbits": parent_orbits, "has_parent": parents >= 0,
+            "mu": system.mass[exact] * self.strength, "softening": (system.diameter[exact] / 2) ** 2,
+            "cells": self.cells, "refreshed": self.refreshed,
+        }
+
+    @staticmethod
+    def future_positions(snapshot, times):
+        # Positionen der exakten Körper zu den Zeitpunkten times (Sekunden ab dem Schnappschuss): (Zeitpunkte, Körper, 3).
+        # Zellen bleiben, wo sie sind
+        def positions(orbits):
+            angle = orbits["angle"][np.newaxis, :] + orbits["orbital_speed"][np.newaxis, :] * times[:, np.newaxis]
+            shape = angle.shape
+            return SolarSystem.kepler_positions(
+                angle.ravel(), np.broadcast_to(orbits["distance"], shape).ravel(),
+                np.broadcast_to(orbits["inclination"], shape).ravel(),
+                np.broadcast_to(orbits["eccentricity"], shape).ravel()).reshape(shape + (3,))
+
+        exact = positions(snapshot["orbits"])
+        if snapshot["has_parent"].any():
+            exact += positions(snapshot["parent_orbits"]) * snapshot["has_parent"][np.newaxis, :, np.newaxis]
+        return exact
+
+class ShipCommand:
+    __slots__ = ("thrust", "strafe", "yaw", "pitch", "fire", "roll")
+
+    def __init__(self, thrust=0.0, strafe=0.0, yaw=0.0, pitch=0.0, fire=0, roll=0.0):
+        self.thrust = thrust  # +1 vorwärts (W), -1 rückwärts (S)
+        self.strafe = strafe  # +1 links (A), -1 rechts (D)
+        self.yaw = yaw  # Drehung in Grad um die Hochachse des Schiffs
+        self.pitch = pitch  # um die Querachse, positiv senkt die Nase
+        self.fire = fire  # Anzahl der Schüsse
+        self.roll = roll  # +1 im Uhrzeigersinn (Q), -1 dagegen (E)
+
+    def merge(self, other):
+        self.thrust = other.thrust
+        self.strafe = other.strafe
+        self.roll = other.roll
+        self.yaw += other.yaw
+        self.pitch += other.pitch
+        self.fire += other.fire
+
+    def continuing(self):
+        # Für weitere Ticks im selben Frame gelten nur die gehaltenen Tasten
+        return ShipCommand(self.thrust, self.strafe, roll=self.roll)
+
+class CommandRecorder:
+    DTYPE = np.dtype([("time_ms", "<u4"), ("thrust", "i1"), ("strafe", "i1"), ("roll", "i1"),
+                      ("fire", "<u2"), ("yaw", "<f4"), ("pitch", "<f4")])
+
+    def __init__(self, path, flush_every=600):
+        self.path = path
+        self.flush_every = flush_every
+        self.buffer = np.zeros(flush_every, dtype=self.DTYPE)
+        self.count = 0
+        self.file = open(path, "wb")
+
+    def record(self, time_ms, command):
+        self.buffer[self.count] = (time_ms, command.thrust, command.strafe, command.roll, command.fire, command.yaw, command.pitch)
+        self.count += 1
+        if self.count == self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer[:self.count].tobytes())
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    @classmethod
+    def load(cls, path):
+        records = np.fromfile(path, dtype=cls.DTYPE)
+        return [ShipCommand(int(r["thrust"]), int(r["strafe"]), float(r["yaw"]), float(r["pitch"]), int(r["fire"]), int(r["roll"]))
+                for r in records]
+
+class InputHandler:
+    DEFAULT_BINDINGS = {
+        "thrust_forward": K_w,
+        "thrust_backward": K_s,
+        "strafe_left": K_a,
+        "strafe_right": K_d,
+        "roll_clockwise": K_q,
+        "roll_counterclockwise": K_e,
+        "fire": K_SPACE,
+        "toggle_shaders": K_F2,
+        "toggle_overlay": K_F3,
+        "export_trace": K_F4,
+        "toggle_trajectory": K_F5,
+        "toggle_capture": K_F9,
+        "screenshot": K_F12,
+        "seek_backward": K_LEFT,
+        "seek_forward": K_RIGHT,
+        "replay_slower": K_DOWN,
+        "replay_faster": K_UP,
+        "quit": K_ESCAPE,
+    }
+    HELD_ACTIONS = ("thrust_forward", "thrust_backward", "strafe_left", "strafe_right", "roll_clockwise", "roll_counterclockwise")
+
+    def __init__(self, bindings=None, mouse_sensitivity=0.4, recorder=None):
+        self.bindings = {}
+        for action, key in dict(self.DEFAULT_BINDINGS, **(bindings or {})).items():
+            self.bind(action, key)
+        self.mouse_sensitivity = mouse_sensitivity
+        self.recorder = recorder
+        self.held = dict.fromkeys(self.HELD_ACTIONS, False)
+        self.events = []
+
+    def bind(self, action, key):
+        # Eine Taste löst genau eine Aktion aus; alte Belegung der Aktion wird entfernt
+        for bound_key, bound_action in list(self.bindings.items()):
+            if bound_action == action:
+                del self.bindings[bound_key]
+        self.bindings[key] = action
+
+    def poll(self):
+        # Einmal pro Frame im pygame-Thread: Ereignisse sammeln und in einen Befehl für die Simulation übersetzen
+        command = ShipCommand()
+        triggered = set()
+        now = pygame.time.get_ticks()
+        self.events = []
+
+        for event in pygame.event.get():
+            self.events.append((now, event.type, getattr(event, "key", None)))
+
+            if event.type == QUIT:
+                triggered.add("quit")
+
+            elif event.type in (KEYDOWN, KEYUP):
+                action = self.bindings.get(event.key)
+                if action in self.held:
+                    self.held[action] = event.type == KEYDOWN
+                elif action == "fire" and event.type == KEYDOWN:
+                    command.fire += 1
+                elif action is not None and event.type == KEYDOWN:
+                    triggered.add(action)
+
+            elif event.type == MOUSEMOTION:
+                dx, dy = event.rel
+                command.yaw -= dx * self.mouse_sensitivity  # Invertierte Bewegung
+                command.pitch += dy * self.mouse_sensitivity  # Invertierte Bewegung
+
+        held = self.held
+        command.thrust = held["thrust_forward"] - held["thrust_backward"]
+        command.strafe = held["strafe_left"] - held["strafe_right"]
+        command.roll = held["roll_clockwise"] - held["roll_counterclockwise"]
+
+        if self.recorder is not None:
+            self.recorder.record(now, command)
+        return command, triggered
+
+class Quaternion:
+    # Orientierung als Einheitsquaternion (w, x, y, z). Schiffsachsen: vorwärts +z, seitwärts +x, oben +y.
+    # Gier/Nick/Roll gibt es nur noch für Sitzungsdateien und Netzwerk: Gier um y, dann Nick um x, dann Roll um z,
+    # also vorwärts = (sin(yaw)cos(pitch), -sin(pitch), cos(yaw)cos(pitch)) wie früher die Blickrichtung
+    @staticmethod
+    def compose(cy, sy, cp, sp, cr, sr):
+        # Gier, Nick, Roll aus Kosinus und Sinus der halben Winkel. Wie alle Komponentenformeln hier für Zahlen
+        # (ein Schiff, einmal pro Tick bzw. Frame) und für Arrays (alle Schiffe der Arena)
+        return (cy * cp * cr + sy * sp * sr, cy * sp * cr + sy * cp * sr,
+                sy * cp * cr - cy * sp * sr, cy * cp * sr - sy * sp * cr)
+
+    @staticmethod
+    def from_euler(yaw, pitch, roll):
+        # Winkel in Grad, einzeln oder als Arrays; Ergebnis (..., 4)
+        halves = np.radians(np.array(np.broadcast_arrays(yaw, pitch, roll), dtype=float)) / 2
+        c, s = np.cos(halves), np.sin(halves)
+        return np.stack(Quaternion.compose(c[0], s[0], c[1], s[1], c[2], s[2]), axis=-1)
+
+    @staticmethod
+    def to_euler(q):
+        # (..., 3) in Grad; Nick in [-90, 90], bei senkrechtem Blick teilen sich Gier und Roll die Drehung
+        w, x, y, z = np.moveaxis(np.asarray(q, dtype=float), -1, 0)
+        yaw = np.arctan2(2 * (x * z + w * y), 1 - 2 * (x * x + y * y))
+        pitch = np.arcsin(np.clip(-2 * (y * z - w * x), -1, 1))
+        roll = np.arctan2(2 * (x * y + w * z), 1 - 2 * (x * x + z * z))
+        return np.degrees(np.stack((yaw, pitch, roll), axis=-1))
+
+    @staticmethod
+    def product(a, b):
+        # a gefolgt von b in dessen eigenen Achsen; a, b und Ergebnis als Komponenten (w, x, y, z)
+        aw, ax, ay, az = a
+        bw, bx, by, bz = b
+        return (aw * bw - ax * bx - ay * by - az * bz, aw * bx + ax * bw + ay * bz - az * by,
+                aw * by - ax * bz + ay * bw + az * bx, aw * bz + ax * by - ay * bx + az * bw)
+
+    @staticmethod
+    def axes(w, x, y, z):
+        # Vorwärts-, Seiten- und Hochachse als Spalten der Drehmatrix. Komponenten als Zahlen (Kamera, einmal pro
+        # Frame, ohne NumPy) oder als Arrays (ShipFleet, alle Schiffe eines Ticks)
+        x2, y2, z2 = 2 * x, 2 * y, 2 * z
+        xx, yy, zz, xy, xz, yz, wx, wy, wz = x * x2, y * y2, z * z2, x * y2, x * z2, y * z2, w * x2, w * y2, w * z2
+        return ((xz + wy, yz - wx, 1 - xx - yy),
+                (1 - yy - zz, xy + wz, xz - wy),
+                (xy - wz, 1 - xx - zz, yz + wx))
 
+    @staticmethod
+    def nlerp(a, b, alpha):
+        # Zwischen zwei Ticks für die Darstellung, auf Listen von Zahlen; über das Vorzeichen der kürzere Weg
+        if a[0] * b[0] + a[1] * b[1] + a[2] * b[2] + a[3] * b[3] < 0:
+            b = [-c for c in b]
+        q = [p + (r - p) * alpha for p, r in zip(a, b)]
+        norm = math.sqrt(q[0] * q[0] + q[1] * q[1] + q[2] * q[2] + q[3] * q[3])
+        return [c / norm for c in q]
+
+class ShipFleet:
+    # Schiffszustand als Arrays, ein Eintrag je Schiff: World hat eines, der Mehrspieler-Server (Arena) viele
+    reference_rate = 60  # Geschwindigkeiten und Reibung sind pro Tick bei 60 Hz angegeben
+    IDENTITY = (1.0, 0.0, 0.0, 0.0)
+
+    def __init__(self, capacity=1, max_speed=0.5, acceleration=0.05, friction=0.9, roll_rate=2.0):
+        self.capacity = capacity
+        self.max_speed = max_speed
+        self.acceleration = acceleration
+        self.friction = friction
+        self.roll_rate = roll_rate  # Grad pro Tick
+
+        self.positions = np.zeros((capacity, 3))
+        self.velocities = np.zeros((capacity, 3))
+        self.orientations = np.tile(self.IDENTITY, (capacity, 1))  # Quaternion je Schiff
+        # Vorwärts-, Seiten- und Hochachse je Schiff, nach jeder Drehung einmal berechnet: Schub, Laser und Kamera
+        # lesen nur noch hier
+        self.axes = np.zeros((capacity, 3, 3))
+        self.axes[:] = np.identity(3)[[2, 0, 1]]
+        self.life_points = np.zeros(capacity, dtype=np.int64)
+        self.structure_points = np.zeros(capacity, dtype=np.int64)
+
+    def reset(self, ships, position=(100, 0, 0)):
+        self.positions[ships] = position
+        self.velocities[ships] = 0
+        self.orient(ships, self.IDENTITY)
+        self.life_points[ships] = 1000
+        self.structure_points[ships] = 500
+
+    def orient(self, ships, orientations):
+        self.orientations[ships] = orientations
+        self.axes[ships] = np.moveaxis(Quaternion.axes(*np.moveaxis(self.orientations[ships], -1, 0)), (0, 1), (-2, -1))
+
+    def euler(self, ships):
+        # Gier, Nick, Roll in Grad für Sitzungsdateien und Snapshots
+        return Quaternion.to_euler(self.orientations[ships])
+
+    def set_euler(self, ships, yaw, pitch, roll):
+        self.orient(ships, Quaternion.from_euler(yaw, pitch, roll))
+
+    def steer(self, ships, yaw, pitch, roll, dt):
+        # Drehung um die eigenen Achsen (Gier um die Hoch-, Nick um die Quer-, Roll um die Längsachse) ohne Grenze
+        # für den Nickwinkel: Quaternionen kennen keine Kardansperre. Liefert die Vorwärtsachse je Schiff (auch
+        # Startrichtung der Laser)
+        roll = roll * (self.roll_rate * dt * self.reference_rate)
+        if np.ndim(yaw) == 0:
+            # Ein Schiff (World, Vorhersage im Client): auf Zahlen statt kleinen Arrays, ohne Drehung gar nicht
+            if yaw or pitch or roll:
+                halves = (math.radians(yaw) / 2, math.radians(pitch) / 2, math.radians(roll) / 2)
+                q = Quaternion.product(self.orientations[ships].reshape(4).tolist(), Quaternion.compose(*(f(a) for a in halves for f in (math.cos, math.sin))))
+                norm = math.sqrt(q[0] * q[0] + q[1] * q[1] + q[2] * q[2] + q[3] * q[3])
+                q = [c / norm for c in q]
+                self.orientations[ships] = q
+                self.axes[ships] = Quaternion.axes(*q)
+            return self.axes[ships, 0]
+
+        ships = np.arange(self.capacity)[ships]
+        turning = (yaw != 0) | (pitch != 0) | (roll != 0)
+        if turning.any():
+            turned = ships[turning]
+            turn = Quaternion.from_euler(yaw[turning], pitch[turning], roll[turning])
+            orientations = np.stack(Quaternion.product(np.ascontiguousarray(self.orientations[turned].T), turn.T), axis=-1)
+            self.orient(turned, orientations / np.linalg.norm(orientations, axis=-1, keepdims=True))
+        return self.axes[ships, 0]
+
+    def accelerate(self, ships, thrust, strafe, dt, gravity=None):
+        thrust = np.asarray(thrust, dtype=float)[:, np.newaxis]
+        strafe = np.asarray(strafe, dtype=float)[:, np.newaxis]
+        axes = self.axes[ships]
+        velocity_change = axes[:, 0] * thrust + axes[:, 1] * strafe
+        norm = np.linalg.norm(velocity_change, axis=1, keepdims=True)
+        velocity_change = np.divide(velocity_change, norm, out=np.zeros_like(velocity_change), where=norm > 0)
+        self.integrate(ships, velocity_change * self.acceleration, dt, gravity)
+
+    def integrate(self, ships, velocity_change, dt, gravity=None):
+        # velocity_change in Einheiten/Tick² wie acceleration, gravity (GravityField) in Einheiten/s²
+        scale = dt * self.reference_rate
+        velocities = self.velocities[ships] + velocity_change * scale
+        if gravity is not None:
+            velocities += gravity * (dt / self.reference_rate)
+        speed = np.linalg.norm(velocities, axis=1, keepdims=True)
+        velocities = np.where(speed > self.max_speed, velocities / np.maximum(speed, 1e-12) * self.max_speed, velocities)
+        self.positions[ships] += velocities * scale
+        self.velocities[ships] = velocities * self.friction ** scale
+
+    def damage(self, ships, contacts):
+        # Je Kontakt 10 Lebenspunkte; sind sie aufgebraucht, kostet jeder Tick mit Kontakt 10 Strukturpunkte.
+        # Liefert die dabei zerstörten Schiffe
+        life = np.maximum(self.life_points[ships] - 10 * contacts, 0)
+        structure = self.structure_points[ships]
+        structure = np.where((life == 0) & (contacts > 0), np.maximum(structure - 10, 0), structure)
+        self.life_points[ships] = life
+        self.structure_points[ships] = structure
+        return (life == 0) & (structure <= 0)
+
+class World:
+    reference_rate = ShipFleet.reference_rate
+
+    def __init__(self, solar_system, collision_distance=1.0, gravity=GravityField.STRENGTH, friction=0.9):
+        self.solar_system = solar_system
+        self.grid = SpatialGrid(cell_size=4.0)
+        self.lasers = LaserPool(speed=1.0, lifetime=5.0, length=0.2)  # Zeit in Sekunden, die ein Laserstrahl aktiv bleibt
+        # Schwerkraft wirkt auf Schiffe und Laser
+        self.gravity = GravityField(solar_system, gravity) if gravity else None
+
+        self.ships = ShipFleet(1, friction=friction)
+        self.ships.reset(0)
+        self.collision_distance = collision_distance
+
+        self.collided_planets = []
+        self.collided_planets_text = ""
+        self.ship_contacts = np.zeros(0, dtype=np.intp)
+        self.hit_lasers = np.zeros(0, dtype=np.intp)
+        self.hit_bodies = np.zeros(0, dtype=np.intp)
+        self.remote_ships = np.zeros((0, 3))  # Positionen der anderen Schiffe im Mehrspielermodus
+        self.trajectory = None  # vorausgesagte Flugbahn (TrajectoryPredictor), nur zum Zeichnen
+
+        self.tick = 0
+        self.time = 0.0
+        self.game_over = False
+
+    # Das eigene Schiff ist Eintrag 0 der ShipFleet
+    @property
+    def movement(self):
+        return self.ships.positions[0]
+
+    @movement.setter
+    def movement(self, value):
+        self.ships.positions[0] = value
+
+    @property
+    def velocity(self):
+        return self.ships.velocities[0]
+
+    @velocity.setter
+    def velocity(self, value):
+        self.ships.velocities[0] = value
+
+    @property
+    def orientation(self):
+        return self.ships.orientations[0]
+
+    @orientation.setter
+    def orientation(self, value):
+        self.ships.orient(0, value)
+
+    @property
+    def axes(self):
+        # Vorwärts-, Seiten- und Hochachse des eigenen Schiffs
+        return self.ships.axes[0]
+
+    @property
+    def life_points(self):
+        return int(self.ships.life_points[0])
+
+    @life_points.setter
+    def life_points(self, value):
+        self.ships.life_points[0] = value
+
+    @property
+    def structure_points(self):
+        return int(self.ships.structure_points[0])
+
+    @structure_points.setter
+    def structure_points(self, value):
+        self.ships.structure_points[0] = value
+
+    def step(self, command, dt):
+        ships = self.ships
+        forward = ships.steer(slice(0, 1), command.yaw, command.pitch, command.roll, dt)
+
+        for _ in range(command.fire):
+            # Position des Raumschiffs als Startposition des Lasers verwenden
+            self.lasers.fire(self.movement.copy(), forward[0])
+
+        # Aktualisiere die Position der Planeten
+        system = self.solar_system
+        with profiler.scope("update_planets"):
+            system.update(dt)
+        with profiler.scope("broad_phase"):
+            self.grid.update(system.positions[:system.count], system.diameter[:system.count] / 2)
+        with profiler.scope("lasers"):
+            self.hit_lasers, self.hit_bodies = self.lasers.update(dt, self.grid, self.gravity)
+        for body in self.hit_bodies:
+            logging.debug(f"Laser hit {system.names[body]}")
+
+        gravity = None
+        if self.gravity is not None:
+            with profiler.scope("gravity"):
+                self.gravity.update(self.time + dt)
+                gravity = self.gravity.acceleration(ships.positions[0:1])
+        ships.accelerate(slice(0, 1), [command.thrust], [command.strafe], dt, gravity)
+
+        with profiler.scope("collisions"):
+            self.ship_contacts = self.grid.query_spheres(self.movement, self.collision_distance)[1]
+        for body in self.ship_contacts:
+            self.add_collided_planet(system.names[body])
+        if ships.damage(slice(0, 1), len(self.ship_contacts))[0]:
+            self.game_over = True
+
+        self.tick += 1
+        self.time += dt
+
+    def add_collided_planet(self, planet_name):
+        if planet_name not in self.collided_planets:
+            self.collided_planets.append(planet_name)
+            self.collided_planets_text = ", ".join(self.collided_planets)
+
+class Simulation:
+    def __init__(self, world, timestep=1 / 60, max_steps=5, recorder=None):
+        self.world = world
+        self.timestep = timestep
+        self.max_steps = max_steps
+        self.recorder = recorder
+        self.accumulator = 0.0
+        self.pending = ShipCommand()
+        self.previous_state = self.ship_state()
+
+    def ship_state(self):
+        return self.world.movement.copy(), self.world.orientation.tolist()
+
+    def step(self, command):
+        self.previous_state = self.ship_state()
+        with profiler.scope("simulation"):
+            self.world.step(command, self.timestep)
+        if self.recorder is not None:
+            with profiler.scope("record"):
+                self.recorder.record(self.world, command)
+
+    def advance(self, frame_dt, command):
+        # Physik läuft mit festem Zeitschritt; fällt das Rendern zurück, werden höchstens max_steps nachgeholt
+        self.pending.merge(command)
+        self.accumulator += min(frame_dt, self.timestep * self.max_steps)
+        while self.accumulator >= self.timestep and not self.world.game_over:
+            self.step(self.pending)
+            self.pending = self.pending.continuing()
+            self.accumulator -= self.timestep
+        return self.accumulator / self.timestep
+
+    def interpolated(self, alpha):
+        previous_movement, previous_orientation = self.previous_state
+        world = self.world
+        return (previous_movement + (world.movement - previous_movement) * alpha,
+                Quaternion.nlerp(previous_orientation, world.orientation.tolist(), alpha))
+
+    def run(self, ticks, commands=None):
+        # Ohne Anzeige so schnell wie möglich simulieren (z.B. für Bots und Tests)
+        for tick in range(ticks):
+            if self.world.game_over:
+                break
+            self.step(commands(self.world.tick) if commands else ShipCommand())
+        return self.world
+
+class TrajectoryPredictor:
+    # Sagt die Flugbahn des eigenen Schiffs ohne weitere Eingaben voraus, in einem eigenen Prozess: ein Thread hätte
+    # bei jedem GL-Aufruf des Render-Threads um das GIL konkurriert. Der Render-Thread reicht nur den Zustand weiter
+    # (submit) und übernimmt die zuletzt fertige Bahn (path); er wartet nie auf die Rechnung. Es ist höchstens eine
+    # Anfrage unterwegs, neuere Zustände ersetzen ältere.
+    def __init__(self, gravity, fleet, steps=240, step_ticks=2, timestep=1 / 60, interval=0.2):
+        self.gravity = gravity
+        self.interval = interval  # höchstens so oft neu rechnen (Sekunden)
+        self.path = None  # float32 (steps + 1, 3), wird nur als Ganzes ersetzt
+        self.busy = False
+        self.sent = -math.inf
+        self.sent_cells = None  # Zellen nur nach dem Neubilden schicken, der Worker behält die letzten
+
+        # spawn statt fork wie bei FrameCapture
+        context = multiprocessing.get_context("spawn")
+        self.connection, child = context.Pipe()
+        settings = (fleet.max_speed, fleet.acceleration, fleet.friction, fleet.roll_rate)
+        self.process = context.Process(target=trajectory_worker, args=(child, settings, steps, timestep * step_ticks),
+                                       daemon=True)
+        self.process.start()
+        child.close()
+
+    def submit(self, position, velocity):
+        self.collect()
+        now = time.perf_counter()
+        if self.busy or now - self.sent < self.interval:
+            return
+        snapshot = self.gravity.snapshot()
+        if snapshot["refreshed"] == self.sent_cells:
+            snapshot["cells"] = None
+        self.sent_cells = snapshot["refreshed"]
+        self.connection.send((np.array(position), np.array(velocity), snapshot))
+        self.busy = True
+        self.sent = now
+
+    def collect(self):
+        if self.busy and self.connection.poll():
+            self.path = self.connection.recv()
+            self.busy = False
+
+    @staticmethod
+    def predict(fleet, position, velocity, snapshot, steps, dt):
+        # Wie World.step ohne Eingaben: erst bewegen sich die Körper, dann wirkt ihre Anziehung auf das Schiff
+        bodies = GravityField.future_positions(snapshot, np.arange(1, steps + 1) * dt)
+        # Ein Quellenarray für alle Schritte: vorne die bewegten Körper des Schritts, hinten die festen Zellen
+        count = bodies.shape[1]
+        cell_positions, cell_mu, cell_softening = snapshot["cells"]
+        sources = np.concatenate([bodies[0], cell_positions]).astype(np.float32)
+        mu = np.concatenate([snapshot["mu"], cell_mu]).astype(np.float32)
+        softening = np.concatenate([snapshot["softening"], cell_softening]).astype(np.float32)
+        fleet.positions[0] = position
+        fleet.velocities[0] = velocity
+        no_thrust = np.zeros((1, 3))
+        path = np.empty((steps + 1, 3), dtype=np.float32)
+        path[0] = position
+        for step in range(steps):
+            sources[:count] = bodies[step]
+            gravity = GravityField.field(fleet.positions[0:1], sources, mu, softening)
+            fleet.integrate(slice(0, 1), no_thrust, dt, gravity)
+            path[step + 1] = fleet.positions[0]
+        return path
+
+    def close(self):
+        try:
+            self.connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+
+class SessionRecorder:
+    # Sitzungsdatei: MAGIC, uint32-Länge und JSON-Kopf, danach nur angehängte Chunks (CHUNK-Kopf, Nutzdaten auf 8 Byte
+    # aufgefüllt). Alle keyframe_interval Ticks ein Keyframe mit Körperwinkeln und Laser-Pool (KEYF); die Ticks und
+    # Ereignisse seit dem Keyframe folgen beim nächsten als TICK- und EVNT-Chunk
+    MAGIC = b"SSSESS01"
+    CHUNK = struct.Struct("<4sIII")  # Art, erster Tick, Anzahl der Einträge, Länge der Nutzdaten
+    KEYFRAME = struct.Struct("<IIII")  # Körper, aktive Laser, freie Laser-Slots, getroffene Körper
+    VERSION = 3
+    # Version 2 speichert die Orientierung als Quaternion, damit die Wiedergabe Laser exakt in dieselbe Richtung
+    # abfeuert; Version 1 (Gier/Nick/Roll) wird beim Lesen umgerechnet. Ab Version 3 lenkt die Schwerkraft die Laser
+    # ab, ältere Aufnahmen werden mit geraden Strahlen wiedergegeben
+    TICK_DTYPE = np.dtype([("tick", "<u4"), ("fired", "<u2"), ("lasers", "<u2"), ("time", "<f8"),
+                           ("movement", "<f8", 3), ("velocity", "<f8", 3), ("orientation", "<f8", 4),
+                           ("life_points", "<i4"), ("structure_points", "<i4")])
+    TICK_DTYPE_V1 = np.dtype([("tick", "<u4"), ("fired", "<u2"), ("lasers", "<u2"), ("time", "<f8"),
+                              ("movement", "<f8", 3), ("velocity", "<f8", 3), ("yaw", "<f8"), ("pitch", "<f8"),
+                              ("roll", "<f8"), ("life_points", "<i4"), ("structure_points", "<i4")])
+    EVENT_DTYPE = np.dtype([("tick", "<u4"), ("kind", "<u4"), ("body", "<i4"), ("slot", "<i4"),
+                            ("life_points", "<i4"), ("structure_points", "<i4")])
+    LASER_DTYPE = np.dtype([("slot", "<i8"), ("age", "<f8"), ("position", "<f8", 3), ("previous", "<f8", 3),
+                            ("direction", "<f8", 3)])
+    LASER_HIT, CONTACT = 1, 2
+
+    def __init__(self, path, world, timestep, keyframe_interval=300, setup=None):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.ticks = np.zeros(keyframe_interval, dtype=self.TICK_DTYPE)
+        self.count = 0
+        self.events = []
+
+        self.file = open(path, "wb")
+        header = json.dumps({"version": self.VERSION, "timestep": timestep, "keyframe_interval": keyframe_interval,
+                             "first_tick": world.tick, "bodies": world.solar_system.count,
+                             "lasers": world.lasers.capacity, "setup": setup or {}}).encode()
+        header += b" " * (-(len(self.MAGIC) + 4 + len(header)) % 8)
+        self.file.write(self.MAGIC + struct.pack("<I", len(header)) + header)
+
+        # Geschrieben wird in einem eigenen Thread; die Spielschleife kopiert nur in Puffer
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self.write_chunks, daemon=True)
+        self.writer.start()
+        self.keyframe(world)
+        self.record_state(world, 0)
+
+    def record(self, world, command):
+        # Einmal pro Tick nach World.step
+        if self.count == self.keyframe_interval:
+            self.flush()
+            self.keyframe(world)
+        self.record_state(world, command.fire)
+        for slot, body in zip(world.hit_lasers.tolist(), world.hit_bodies.tolist()):
+            self.events.append((world.tick, self.LASER_HIT, body, slot, world.life_points, world.structure_points))
+        for body in world.ship_contacts.tolist():
+            self.events.append((world.tick, self.CONTACT, body, -1, world.life_points, world.structure_points))
+
+    @classmethod
+    def upgrade_ticks(cls, ticks):
+        upgraded = np.zeros(len(ticks), dtype=cls.TICK_DTYPE)
+        for name in cls.TICK_DTYPE.names:
+            if name != "orientation":
+                upgraded[name] = ticks[name]
+        upgraded["orientation"] = Quaternion.from_euler(ticks["yaw"], ticks["pitch"], ticks["roll"])
+        return upgraded
+
+    def record_state(self, world, fired):
+        self.ticks[self.count] = (world.tick, fired, len(world.lasers), world.time, world.movement, world.velocity,
+                                  world.orientation, world.life_points, world.structure_points)
+        self.count += 1
+
+    def keyframe(self, world):
+        system, lasers = world.solar_system, world.lasers
+        slots = np.flatnonzero(lasers.alive)
+        active = np.zeros(len(slots), dtype=self.LASER_DTYPE)
+        active["slot"] = slots
+        active["age"] = lasers.age[slots]
+        active["position"] = lasers.positions[slots]
+        active["previous"] = lasers.previous_positions[slots]
+        active["direction"] = lasers.directions[slots]
+        free_slots = np.array(lasers.free_slots, dtype="<i4")
+        collided = np.array([system.names.index(name) for name in world.collided_planets], dtype="<i4")
+        n = system.count
+        # Nur eine Kopie je Feld; zusammengesetzt wird erst beim Schreiben
+        parts = (self.KEYFRAME.pack(n, len(active), len(free_slots), len(collided)), system.angle[:n].tobytes(),
+                 system.rotation_angle[:n].tobytes(), active.tobytes(), free_slots.tobytes(), collided.tobytes())
+        self.queue.put((b"KEYF", world.tick, n, parts))
+
+    def flush(self):
+        if self.count == 0:
+            return
+        first = int(self.ticks["tick"][0])
+        events = np.array(self.events, dtype=self.EVENT_DTYPE)
+        self.queue.put((b"TICK", first, self.count, (self.ticks[:self.count].tobytes(),)))
+        self.queue.put((b"EVNT", first, len(events), (events.tobytes(),)))
+        self.count = 0
+        self.events = []
+
+    def write_chunks(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                break
+            kind, first, count, parts = chunk
+            size = sum(len(part) for part in parts)
+            padding = bytes(-size % 8)
+            self.file.write(self.CHUNK.pack(kind, first, count, size + len(padding)))
+            for part in parts:
+                self.file.write(part)
+            self.file.write(padding)
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.queue.put(None)
+        self.writer.join()
+        self.file.close()
+
+class SessionPlayer:
+    # Spielt eine Sitzungsdatei (SessionRecorder) über memmap ab. Suchen lädt den Keyframe des Intervalls und rechnet
+    # höchstens keyframe_interval Ticks Laser nach; Schiff und Schäden stehen direkt im Tick-Eintrag.
+    def __init__(self, path):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic = SessionRecorder.MAGIC
+        if bytes(self.data[:len(magic)]) != magic:
+            raise ValueError(f"{path} is not a session recording")
+        (length,) = struct.unpack_from("<I", self.data, len(magic))
+        offset = len(magic) + 4
+        self.header = json.loads(bytes(self.data[offset:offset + length]))
+        self.timestep = self.header["timestep"]
+        self.keyframe_interval = self.header["keyframe_interval"]
+        self.first_tick = self.header["first_tick"]
+        version = self.header.get("version", 1)
+        if version > SessionRecorder.VERSION:
+            raise ValueError(f"{path} has unsupported session version {version}")
+        self.laser_gravity = version >= 3
+
+        # Chunk-Index je Intervall; ein beim Schreiben abgebrochener letzter Chunk wird ignoriert
+        self.keyframes, self.ticks, self.events = {}, {}, {}
+        offset += length
+        chunk = SessionRecorder.CHUNK
+        while offset + chunk.size <= len(self.data):
+            kind, first, count, size = chunk.unpack_from(self.data, offset)
+            offset += chunk.size
+            if offset + size > len(self.data):
+                break
+            interval = (first - self.first_tick) // self.keyframe_interval
+            if kind == b"KEYF":
+                self.keyframes[interval] = offset
+            elif kind == b"TICK":
+                if version == 1:
+                    ticks = np.frombuffer(self.data, SessionRecorder.TICK_DTYPE_V1, count, offset)
+                    self.ticks[interval] = SessionRecorder.upgrade_ticks(ticks)
+                else:
+                    self.ticks[interval] = np.frombuffer(self.data, SessionRecorder.TICK_DTYPE, count, offset)
+            elif kind == b"EVNT":
+                self.events[interval] = np.frombuffer(self.data, SessionRecorder.EVENT_DTYPE, count, offset)
+            offset += size
+
+        intervals = 0
+        while intervals in self.keyframes and intervals in self.ticks and intervals in self.events:
+            intervals += 1
+        if intervals == 0:
+            raise ValueError(f"{path} contains no complete recording interval")
+        self.intervals = intervals
+        self.last_tick = self.first_tick + (intervals - 1) * self.keyframe_interval + len(self.ticks[intervals - 1]) - 1
+
+        self.world = None
+        self.tick = None
+        self.keyframe_angles = None
+        self.position = float(self.first_tick)
+        self.speed = 1.0
+
+    def __len__(self):
+        return self.last_tick - self.first_tick + 1
+
+    @property
+    def finished(self):
+        return self.position >= self.last_tick
+
+    def locate(self, tick):
+        interval = (tick - self.first_tick) // self.keyframe_interval
+        return interval, self.first_tick + interval * self.keyframe_interval
+
+    def record(self, tick):
+        interval, base = self.locate(tick)
+        return self.ticks[interval][tick - base]
+
+    def tick_events(self, tick):
+        events = self.events[self.locate(tick)[0]]
+        first, last = np.searchsorted(events["tick"], (tick, tick + 1))
+        return events[first:last]
+
+    def restore(self, world, tick):
+        # Zustand nach Tick tick in world herstellen
+        tick = int(min(max(tick, self.first_tick), self.last_tick))
+        interval, base = self.locate(tick)
+        if self.world is world and self.tick == tick:
+            return
+        loaded = not (self.world is world and self.tick is not None and base <= self.tick <= tick)
+        if loaded:
+            start = self.load_keyframe(world, interval)
+        else:
+            start = self.tick  # Vorwärts im selben Intervall: vom aktuellen Stand weiterrechnen
+        records = self.ticks[interval]
+
+        # Laser exakt wie in World.step: abfeuern, bewegen, Treffer und zu alte Strahlen entfernen. Mit Schwerkraft
+        # laufen die Umlaufwinkel dafür Tick für Tick mit (dieselben Rundungen wie SolarSystem.update), die Positionen
+        # der anziehenden Körper werden nur berechnet, solange Strahlen fliegen
+        lasers, system = world.lasers, world.solar_system
+        n = system.count
+        gravity = world.gravity if self.laser_gravity else None
+        if gravity is not None and loaded:
+            system.angle[:n], system.rotation_angle[:n] = self.keyframe_angles
+        for current in range(start + 1, tick + 1):
+            record, previous = records[current - base], records[current - base - 1]
+            if record["fired"]:
+                forward, _, _ = Quaternion.axes(*record["orientation"].tolist())
+                direction = np.array(forward)
+                for _ in range(int(record["fired"])):
+                    lasers.fire(previous["movement"], direction)
+            if gravity is not None:
+                system.angle[:n] += system.orbital_speed[:n] * self.timestep
+                system.rotation_angle[:n] += system.rotation_speed[:n] * self.timestep
+                if lasers.alive.any():
+                    gravity.update_body_positions()
+            lasers.move(self.timestep, gravity)
+            events = self.tick_events(current)
+            lasers.expire(events["slot"][events["kind"] == SessionRecorder.LASER_HIT].astype(np.intp))
+            for body in events["body"][events["kind"] == SessionRecorder.CONTACT]:
+                world.add_collided_planet(world.solar_system.names[body])
+
+        record = records[tick - base]
+        world.tick = int(record["tick"])
+        world.time = float(record["time"])
+        world.movement[:] = record["movement"]
+        world.velocity[:] = record["velocity"]
+        world.orientation = record["orientation"]
+        world.life_points = int(record["life_points"])
+        world.structure_points = int(record["structure_points"])
+        world.game_over = world.life_points == 0 and world.structure_points <= 0
+
+        events = self.tick_events(tick)
+        hits = events[events["kind"] == SessionRecorder.LASER_HIT]
+        world.hit_lasers = hits["slot"].astype(np.intp)
+        world.hit_bodies = hits["body"].astype(np.intp)
+        world.ship_contacts = events["body"][events["kind"] == SessionRecorder.CONTACT].astype(np.intp)
+
+        # Umlaufwinkel wachsen linear, ohne Schwerkraft daher direkt aus dem Keyframe
+        if gravity is None:
+            angle, rotation_angle = self.keyframe_angles
+            elapsed = self.timestep * (tick - base)
+            system.angle[:n] = angle + system.orbital_speed[:n] * elapsed
+            system.rotation_angle[:n] = rotation_angle + system.rotation_speed[:n] * elapsed
+        system.update_positions(0, n)
+
+        self.world, self.tick = world, tick
+
+    def load_keyframe(self, world, interval):
+        offset = self.keyframes[interval]
+        bodies, active, free, collided = SessionRecorder.KEYFRAME.unpack_from(self.data, offset)
+        system, lasers = world.solar_system, world.lasers
+        if bodies != system.count:
+            raise ValueError(f"{self.path} was recorded with {bodies} bodies, the world has {system.count}")
+        if self.header["lasers"] != lasers.capacity:
+            raise ValueError(f"{self.path} was recorded with {self.header['lasers']} laser slots, the world has {lasers.capacity}")
+
+        offset += SessionRecorder.KEYFRAME.size
+        angle = np.frombuffer(self.data, "<f8", bodies, offset)
+        offset += angle.nbytes
+        rotation_angle = np.frombuffer(self.data, "<f8", bodies, offset)
+        offset += rotation_angle.nbytes
+        active = np.frombuffer(self.data, SessionRecorder.LASER_DTYPE, active, offset)
+        offset += active.nbytes
+        free_slots = np.frombuffer(self.data, "<i4", free, offset)
+        offset += free_slots.nbytes
+        collided = np.frombuffer(self.data, "<i4", collided, offset)
+
+        slots = active["slot"].astype(np.intp)
+        lasers.alive[:] = False
+        lasers.alive[slots] = True
+        lasers.age[slots] = active["age"]
+        lasers.positions[slots] = active["position"]
+        lasers.previous_positions[slots] = active["previous"]
+        lasers.directions[slots] = active["direction"]
+        lasers.free_slots = free_slots.tolist()
+
+        world.collided_planets = []
+        world.collided_planets_text = ""
+        for body in collided:
+            world.add_collided_planet(system.names[body])
+
+        self.keyframe_angles = angle, rotation_angle
+        return self.first_tick + interval * self.keyframe_interval
+
+    def seek(self, world, tick):
+        self.position = float(min(max(tick, self.first_tick), self.last_tick))
+        self.restore(world, int(self.position))
+
+    def advance(self, world, frame_dt):
+        # Wie Simulation.advance, aber mit beliebiger (auch negativer) Geschwindigkeit; liefert alpha fürs Interpolieren
+        self.seek(world, self.position + frame_dt / self.timestep * self.speed)
+        return self.position - self.tick
+
+    def interpolated(self, alpha):
+        current = self.record(self.tick)
+        following = self.record(min(self.tick + 1, self.last_tick))
+        return (current["movement"] + (following["movement"] - current["movement"]) * alpha,
+                Quaternion.nlerp(current["orientation"].tolist(), following["orientation"].tolist(), alpha))
+
+    def replay(self, world, start=None, stop=None, step=1):
+        # Ohne Anzeige abspielen; step > 1 überspringt Ticks (Zeitraffer)
+        start = self.first_tick if start is None else start
+        stop = self.last_tick + 1 if stop is None else stop
+        for tick in range(start, stop, step):
+            self.seek(world, tick)
+            yield world
+
+class Arena:
+    # Autoritative Simulation des Mehrspieler-Servers: ein Sonnensystem und ein Laser-Pool, viele Schiffe (ShipFleet).
+    # Zerstörte Schiffe starten neu am Rand des Systems
+    def __init__(self, solar_system, capacity=1024, laser_capacity=16384, collision_distance=1.0, spawn_distance=100.0,
+                 rng=np.random, gravity=GravityField.STRENGTH, friction=0.9):
+        self.solar_system = solar_system
+        self.grid = SpatialGrid(cell_size=4.0)
+        self.lasers = LaserPool(capacity=laser_capacity, speed=1.0, lifetime=5.0, length=0.2)
+        self.gravity = GravityField(solar_system, gravity) if gravity else None
+        self.ships = ShipFleet(capacity, friction=friction)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.free_ships = list(range(capacity - 1, -1, -1))
+        self.collision_distance = collision_distance
+        self.spawn_distance = spawn_distance
+        self.rng = rng
+
+        # Eingaben für den nächsten Tick, zusammengefasst wie ShipCommand.merge
+        self.thrust = np.zeros(capacity)
+        self.strafe = np.zeros(capacity)
+        self.roll = np.zeros(capacity)
+        self.yaw = np.zeros(capacity)
+        self.pitch = np.zeros(capacity)
+        self.fire = np.zeros(capacity, dtype=np.int64)
+
+        self.tick = 0
+        self.time = 0.0
+        self.destroyed = 0
+
+    def join(self):
+        if not self.free_ships:
+            return None
+        ship = self.free_ships.pop()
+        self.active[ship] = True
+        self.spawn(ship)
+        return ship
+
+    def leave(self, ship):
+        self.active[ship] = False
+        for inputs in (self.thrust, self.strafe, self.roll, self.yaw, self.pitch, self.fire):
+            inputs[ship] = 0
+        self.free_ships.append(ship)
+
+    def spawn(self, ship):
+        angle = self.rng.uniform(0, 2 * np.pi)
+        self.ships.reset(ship, (self.spawn_distance * np.cos(angle), 0, self.spawn_distance * np.sin(angle)))
+
+    def merge(self, ship, command):
+        self.thrust[ship] = command.thrust
+        self.strafe[ship] = command.strafe
+        self.roll[ship] = command.roll
+        self.yaw[ship] += command.yaw
+        self.pitch[ship] += command.pitch
+        self.fire[ship] += command.fire
+
+    def step(self, dt):
+        # Dieselbe Reihenfolge wie World.step, nur für alle Schiffe gemeinsam
+        ships = np.flatnonzero(self.active)
+        fleet = self.ships
+        forward = fleet.steer(ships, self.yaw[ships], self.pitch[ships], self.roll[ships], dt)
+        for row in np.flatnonzero(self.fire[ships]):
+            for _ in range(self.fire[ships[row]]):
+                self.lasers.fire(fleet.positions[ships[row]].copy(), forward[row])
+
+        system = self.solar_system
+        system.update(dt)
+        self.grid.update(system.positions[:system.count], system.diameter[:system.count] / 2)
+        self.lasers.update(dt, self.grid, self.gravity)
+
+        gravity = None
+        if self.gravity is not None:
+            self.gravity.update(self.time + dt)
+            gravity = self.gravity.acceleration(fleet.positions[ships])
+        fleet.accelerate(ships, self.thrust[ships], self.strafe[ships], dt, gravity)
+        contacts = self.grid.query_spheres(fleet.positions[ships], self.collision_distance)[0]
+        for ship in ships[fleet.damage(ships, np.bincount(contacts, minlength=len(ships)))]:
+            self.spawn(ship)
+            self.destroyed += 1
+
+        # Gehaltene Tasten gelten weiter, Drehung und Schüsse nur einmal (wie ShipCommand.continuing)
+        self.yaw[:] = 0
+        self.pitch[:] = 0
+        self.fire[:] = 0
+        self.tick += 1
+        self.time += dt
+
+class SnapshotCodec:
+    # Entitäten (Schiffe, Laser) als sortierte Schlüssel (Art << 24 | Index) und sieben Ganzzahlen: Position in
+    # 1/256 Einheiten, Gier/Nick/Roll in 1/65536 Umdrehung bzw. Laserrichtung in 1/32767, Start-Tick. Für Laser
+    # werden Ort, Richtung und Tick eines Basiszustands übertragen, von dem aus der Client die Bahn fortschreibt; der
+    # Server ersetzt ihn nur, wenn die Schwerkraft den Strahl zu weit davon abbringt (GameServer.rebase_lasers).
+    # Gesendet werden nur Änderungen gegenüber dem vorigen Snapshot an denselben Client (über TCP kommt der sicher an):
+    # entfernte Schlüssel, neue Entitäten vollständig, geänderte als Bitmaske der Felder plus int16-Differenzen
+    POSITION_SCALE = 256.0
+    DIRECTION_SCALE = 32767.0
+    FIELDS = 7
+    SHIP, LASER = 1, 2
+    HEADER = struct.Struct("<IIIIII")  # Tick, bestätigte Eingabe, entfernte, neue, geänderte Entitäten, Differenzen
+    OWN = struct.Struct("<3d3d3dii")  # eigenes Schiff ungerundet: Position, Geschwindigkeit, Gier/Nick/Roll, Leben, Struktur
+    ENTITY = np.dtype([("key", "<u4"), ("position", "<i4", 3), ("angles", "<i2", 3), ("tick", "<i4")])
+
+    @classmethod
+    def keys(cls, kind, ids):
+        return ((kind << 24) | np.asarray(ids, dtype=np.uint32)).astype(np.uint32)
+
+    @staticmethod
+    def wrap(values):
+        return (values + 32768) % 65536 - 32768
+
+    @classmethod
+    def quantize_ships(cls, positions, yaw, pitch, roll):
+        values = np.zeros((len(positions), cls.FIELDS), dtype=np.int32)
+        values[:, :3] = np.round(positions * cls.POSITION_SCALE)
+        values[:, 3:6] = cls.wrap(np.round(np.column_stack((yaw, pitch, roll)) * (65536 / 360)).astype(np.int64))
+        return values
+
+    @classmethod
+    def quantize_lasers(cls, origins, directions, ticks):
+        values = np.empty((len(origins), cls.FIELDS), dtype=np.int32)
+        values[:, :3] = np.round(origins * cls.POSITION_SCALE)
+        values[:, 3:6] = np.round(directions * cls.DIRECTION_SCALE)
+        values[:, 6] = ticks
+        return values
+
+    @classmethod
+    def positions(cls, values):
+        return values[:, :3] / cls.POSITION_SCALE
+
+    @staticmethod
+    def lookup(keys, sorted_keys):
+        # Index jedes Schlüssels in sorted_keys und ob er dort vorkommt
+        rows = np.minimum(np.searchsorted(sorted_keys, keys), max(len(sorted_keys) - 1, 0))
+        found = sorted_keys[rows] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+        return rows, found
+
+    @classmethod
+    def encode(cls, tick, ack, own, keys, values, base_keys, base_values):
+        rows, found = cls.lookup(keys, base_keys)
+        diff = values - base_values[rows] if len(base_keys) else values
+        # Abschneiden auf int16 bildet die Winkeldifferenzen in den Bereich ±180° ab; Sprünge darüber hinaus
+        # (Neustart, neuer Laser im selben Slot) werden als neue Entität vollständig gesendet
+        deltas = diff.astype("<i2")
+        overflow = deltas != diff
+        overflow[:, 3:6] = False
+        added = ~found | overflow.any(axis=1)
+        mask = (deltas != 0) & ~added[:, np.newaxis]
+        changed = mask.any(axis=1)
+        removed = ~cls.lookup(base_keys, keys)[1]
+
+        entities = np.empty(np.count_nonzero(added), dtype=cls.ENTITY)
+        if len(entities):
+            entities["key"] = keys[added]
+            entities["position"] = values[added, :3]
+            entities["angles"] = values[added, 3:6]
+            entities["tick"] = values[added, 6]
+        masks = np.packbits(mask[changed], axis=1, bitorder="little").reshape(-1)
+        deltas = deltas[mask]
+        return b"".join((cls.HEADER.pack(tick, ack, np.count_nonzero(removed), len(entities), len(masks), len(deltas)),
+                         cls.OWN.pack(*own), base_keys[removed].astype("<u4").tobytes(), entities.tobytes(),
+                         keys[changed].astype("<u4").tobytes(), masks.tobytes(), deltas.tobytes()))
+
+    @classmethod
+    def decode(cls, data, base_keys, base_values):
+        tick, ack, removed, added, changed, deltas = cls.HEADER.unpack_from(data)
+        offset = cls.HEADER.size
+        own = cls.OWN.unpack_from(data, offset)
+        offset += cls.OWN.size
+        removed = np.frombuffer(data, "<u4", removed, offset)
+        offset += removed.nbytes
+        entities = np.frombuffer(data, cls.ENTITY, added, offset)
+        offset += entities.nbytes
+        changed_keys = np.frombuffer(data, "<u4", changed, offset)
+        offset += changed_keys.nbytes
+        masks = np.frombuffer(data, np.uint8, changed, offset)
+        offset += masks.nbytes
+        deltas = np.frombuffer(data, "<i2", deltas, offset)
+
+        keep = ~np.isin(base_keys, removed) & ~np.isin(base_keys, entities["key"])
+        keys, values = base_keys[keep], base_values[keep].copy()
+        rows = np.searchsorted(keys, changed_keys)
+        diff = np.zeros((changed, cls.FIELDS), dtype=np.int32)
+        diff[np.unpackbits(masks[:, np.newaxis], axis=1, count=cls.FIELDS, bitorder="little").astype(bool)] = deltas
+        values[rows] += diff
+        values[rows, 3:6] = cls.wrap(values[rows, 3:6])
+
+        keys = np.concatenate((keys, entities["key"].astype(np.uint32)))
+        values = np.concatenate((values, np.column_stack((entities["position"], entities["angles"], entities["tick"])).astype(np.int32)))
+        order = np.argsort(keys, kind="stable")
+        return tick, ack, own, keys[order], values[order]
+
+class NetProtocol:
+    # Nachrichten über TCP: Länge der Nutzdaten, Typ, Nutzdaten
+    MESSAGE = struct.Struct("<IB")
+    INPUT = struct.Struct("<IbbbBff")  # Eingabenummer, Schub, seitlich, Rollen, Schüsse, Gier, Nick
+    INPUT_MESSAGE, STATUS_REQUEST, WELCOME, SNAPSHOT, STATUS = 1, 2, 16, 17, 18
+
+    @classmethod
+    def pack(cls, kind, payload=b""):
+        return cls.MESSAGE.pack(len(payload), kind) + payload
+
+    @classmethod
+    async def read(cls, reader):
+        length, kind = cls.MESSAGE.unpack(await reader.readexactly(cls.MESSAGE.size))
+        return kind, await reader.readexactly(length)
+
+class ServerClient:
+    def __init__(self, ship, writer):
+        self.ship = ship
+        self.writer = writer
+        self.inputs = deque()
+        self.ack = 0
+        self.keys = np.zeros(0, dtype=np.uint32)  # zuletzt gesendeter Snapshot, Basis für die nächste Differenz
+        self.values = np.zeros((0, SnapshotCodec.FIELDS), dtype=np.int32)
+
+class GameServer:
+    # Autoritativer Mehrspieler-Server (asyncio, TCP). Simuliert mit fester Tickrate und schickt jedem Client alle
+    # snapshot_every Ticks die Schiffe und Laser im Umkreis interest_radius um sein Schiff. Die Himmelskörper sind
+    # durch Seed und Tick festgelegt und werden nicht übertragen
+    def __init__(self, arena, setup, timestep=1 / 60, snapshot_every=3, interest_radius=30.0, max_input_queue=4,
+                 max_write_buffer=256 * 1024, laser_tolerance=0.05):
+        self.arena = arena
+        self.setup = setup
+        self.timestep = timestep
+        self.snapshot_every = snapshot_every
+        self.interest_radius = interest_radius
+        self.max_input_queue = max_input_queue
+        self.max_write_buffer = max_write_buffer
+        self.laser_tolerance = laser_tolerance
+        self.clients = {}
+
+        # Basiszustand je Laser-Slot, von dem aus die Clients fortschreiben (siehe rebase_lasers)
+        capacity = arena.lasers.capacity
+        self.laser_origins = np.zeros((capacity, 3))
+        self.laser_directions = np.zeros((capacity, 3))
+        self.laser_accelerations = np.zeros((capacity, 3))
+        self.laser_ticks = np.full(capacity, -1, dtype=np.int64)
+
+        self.tick_times = deque(maxlen=600)
+        self.snapshot_times = deque(maxlen=200)
+        self.snapshot_bytes = deque(maxlen=200)  # gesendete Bytes je Client und Snapshot
+        self.skipped = 0
+
+    async def serve(self, host="127.0.0.1", port=7777):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        logging.info(f"Server listening on {host}:{port}")
+        async with server:
+            await self.run()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            start = time.perf_counter()
+            self.step()
+            self.tick_times.append(time.perf_counter() - start)
+            if self.arena.tick % self.snapshot_every == 0:
+                start = time.perf_counter()
+                self.broadcast()
+                self.snapshot_times.append(time.perf_counter() - start)
+
+            next_tick += self.timestep
+            delay = next_tick - loop.time()
+            if delay < -self.timestep * 5:
+                # Zu weit zurück: nicht nachholen, sondern im Takt weiter
+                next_tick = loop.time()
+            await asyncio.sleep(max(delay, 0))
+
+    async def handle_client(self, reader, writer):
+        ship = self.arena.join()
+        if ship is None:
+            logging.warning("Server full, rejecting client")
+            writer.close()
+            return
+        client = ServerClient(ship, writer)
+        self.clients[ship] = client
+        welcome = {"ship": int(ship), "tick": self.arena.tick, "timestep": self.timestep,
+                   "snapshot_every": self.snapshot_every, "interest_radius": self.interest_radius,
+                   "lasers": self.arena.lasers.capacity, "laser_speed": self.arena.lasers.speed, "setup": self.setup}
+        writer.write(NetProtocol.pack(NetProtocol.WELCOME, json.dumps(welcome).encode()))
+
+        try:
+            while True:
+                kind, payload = await NetProtocol.read(reader)
+                if kind == NetProtocol.INPUT_MESSAGE:
+                    sequence, thrust, strafe, roll, fire, yaw, pitch = NetProtocol.INPUT.unpack(payload)
+                    client.inputs.append((sequence, ShipCommand(thrust, strafe, yaw, pitch, fire, roll)))
+                elif kind == NetProtocol.STATUS_REQUEST:
+                    writer.write(NetProtocol.pack(NetProtocol.STATUS, json.dumps(self.status()).encode()))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self.clients[ship]
+            self.arena.leave(ship)
+            writer.close()
+
+    def step(self):
+        # Je Client eine Eingabe pro Tick wie bei der Vorhersage im Client; staut sich mehr, wird zusammengefasst
+        for client in self.clients.values():
+            if not client.inputs:
+                continue
+            sequence, command = client.inputs.popleft()
+            while len(client.inputs) >= self.max_input_queue:
+                sequence, later = client.inputs.popleft()
+                command.merge(later)
+            self.arena.merge(client.ship, command)
+            client.ack = sequence
+        self.arena.step(self.timestep)
+
+    def broadcast(self):
+        if not self.clients:
+            return
+        arena = self.arena
+        ships = np.flatnonzero(arena.active)
+        fleet, pool = arena.ships, arena.lasers
+        lasers = np.flatnonzero(pool.alive)
+        self.rebase_lasers(lasers)
+
+        # Schiffsschlüssel liegen vor den Laserschlüsseln, beide aufsteigend: die Arrays sind nach Schlüssel sortiert
+        keys = np.concatenate((SnapshotCodec.keys(SnapshotCodec.SHIP, ships), SnapshotCodec.keys(SnapshotCodec.LASER, lasers)))
+        values = np.concatenate((
+            SnapshotCodec.quantize_ships(fleet.positions[ships], *fleet.euler(ships).T),
+            SnapshotCodec.quantize_lasers(self.laser_origins[lasers], self.laser_directions[lasers], self.laser_ticks[lasers])))
+        positions = np.concatenate((fleet.positions[ships], pool.positions[lasers]))
+
+        clients = list(self.clients.values())
+        own = np.array([client.ship for client in clients])
+        own_angles = fleet.euler(own).tolist()
+        queries, objects = self.visible(fleet.positions[own], positions)
+        bounds = np.searchsorted(queries, np.arange(len(clients) + 1))
+        own_keys = SnapshotCodec.keys(SnapshotCodec.SHIP, own)
+        sent = 0
+        for i, client in enumerate(clients):
+            if client.writer.transport.get_write_buffer_size() > self.max_write_buffer:
+                # Langsamer Client: Snapshot auslassen, die Basis bleibt der letzte gesendete
+                self.skipped += 1
+                continue
+            visible = objects[bounds[i]:bounds[i + 1]]
+            visible = visible[keys[visible] != own_keys[i]]
+            ship = client.ship
+            state = (*fleet.positions[ship], *fleet.velocities[ship], *own_angles[i],
+                     int(fleet.life_points[ship]), int(fleet.structure_points[ship]))
+            payload = SnapshotCodec.encode(arena.tick, client.ack, state, keys[visible], values[visible], client.keys, client.values)
+            client.keys, client.values = keys[visible], values[visible]
+            message = NetProtocol.pack(NetProtocol.SNAPSHOT, payload)
+            client.writer.write(message)
+            sent += len(message)
+        self.snapshot_bytes.append(sent / len(clients))
+
+    def rebase_lasers(self, lasers):
+        # Die Schwerkraft krümmt die Laserbahnen. Clients schreiben sie mit LaserPool.extrapolate ab dem zuletzt
+        # gesendeten Basiszustand fort; neu gesetzt wird er für neue Strahlen im Slot und wenn die Vorhersage um mehr
+        # als laser_tolerance abweicht. Ohne Schwerkraft bleibt er wie bisher der Startpunkt
+        arena, pool = self.arena, self.arena.lasers
+        launched = arena.tick - np.round(pool.age[lasers] / self.timestep)
+        elapsed = (arena.tick - self.laser_ticks[lasers]) * self.timestep
+        predicted, _ = LaserPool.extrapolate(self.laser_origins[lasers], self.laser_directions[lasers],
+                                             self.laser_accelerations[lasers], pool.speed, elapsed)
+        error = np.linalg.norm(predicted - pool.positions[lasers], axis=1)
+        rebase = lasers[(self.laser_ticks[lasers] <= launched) | (error > self.laser_tolerance)]
+        if len(rebase) == 0:
+            return
+        # Gerundet wie im Snapshot: der Server sagt so genau das voraus, was die Clients rechnen
+        values = SnapshotCodec.quantize_lasers(pool.positions[rebase], pool.directions[rebase], arena.tick)
+        self.laser_origins[rebase] = SnapshotCodec.positions(values)
+        self.laser_directions[rebase] = values[:, 3:6] / SnapshotCodec.DIRECTION_SCALE
+        self.laser_ticks[rebase] = arena.tick
+        if arena.gravity is not None:
+            self.laser_accelerations[rebase] = arena.gravity.body_acceleration(self.laser_origins[rebase])
+
+    def visible(self, centers, positions, chunk=256):
+        # Entitäten im Umkreis jedes Clients als nach Client und Entität sortierte Paare. Punkte statt Kugeln und
+        # einige hundert Clients: eine Distanzmatrix je Block ist hier schneller als SpatialGrid
+        queries, objects = [], []
+        squared = np.einsum("ij,ij->i", positions, positions)
+        for start in range(0, len(centers), chunk):
+            block = centers[start:start + chunk]
+            distances = squared + np.einsum("ij,ij->i", block, block)[:, np.newaxis] - 2 * block @ positions.T
+            rows, columns = np.nonzero(distances < self.interest_radius ** 2)
+            queries.append(rows + start)
+            objects.append(columns)
+        return np.concatenate(queries), np.concatenate(objects)
+
+    def status(self):
+        tick_ms = np.array(self.tick_times or [0]) * 1000
+        snapshot_ms = np.array(self.snapshot_times or [0]) * 1000
+        snapshot_rate = 1 / (self.timestep * self.snapshot_every)
+        return {
+            "tick": self.arena.tick,
+            "clients": len(self.clients),
+            "lasers": len(self.arena.lasers),
+            "destroyed": self.arena.destroyed,
+            "tick_ms_p50": float(np.percentile(tick_ms, 50)),
+            "tick_ms_p99": float(np.percentile(tick_ms, 99)),
+            "snapshot_ms_p50": float(np.percentile(snapshot_ms, 50)),
+            "snapshot_ms_p99": float(np.percentile(snapshot_ms, 99)),
+            "bytes_per_client_s": float(np.mean(self.snapshot_bytes or [0]) * snapshot_rate),
+            "skipped_snapshots": self.skipped,
+        }
+
+class NetworkClient:
+    # Verbindung zum GameServer in einer asyncio-Schleife (die Bots im Lasttest teilen sich eine, das Spiel startet
+    # dafür einen Thread). Snapshots werden beim Empfang dekodiert und in snapshots abgelegt
+    def __init__(self, max_snapshots=64):
+        self.loop = None
+        self.reader = self.writer = None
+        self.welcome = None
+        self.keys = np.zeros(0, dtype=np.uint32)
+        self.values = np.zeros((0, SnapshotCodec.FIELDS), dtype=np.int32)
+        self.snapshots = deque(maxlen=max_snapshots)  # (Tick, bestätigte Eingabe, eigenes Schiff, Schlüssel, Werte)
+        self.status = None
+        self.status_received = None
+        self.bytes_received = 0
+        self.snapshots_received = 0
+
+    async def connect(self, host, port):
+        self.loop = asyncio.get_running_loop()
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        kind, payload = await NetProtocol.read(self.reader)
+        if kind != NetProtocol.WELCOME:
+            raise ConnectionError(f"unexpected message {kind} from server")
+        self.welcome = json.loads(payload)
+        self.status_received = asyncio.Event()
+        return self.welcome
+
+    async def receive(self):
+        try:
+            while True:
+                kind, payload = await NetProtocol.read(self.reader)
+                self.bytes_received += NetProtocol.MESSAGE.size + len(payload)
+                if kind == NetProtocol.SNAPSHOT:
+                    tick, ack, own, self.keys, self.values = SnapshotCodec.decode(payload, self.keys, self.values)
+                    self.snapshots.append((tick, ack, own, self.keys, self.values))
+                    self.snapshots_received += 1
+                elif kind == NetProtocol.STATUS:
+                    self.status = json.loads(payload)
+                    self.status_received.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logging.info("Disconnected from server")
+
+    def send_input(self, sequence, command):
+        self.writer.write(NetProtocol.pack(NetProtocol.INPUT_MESSAGE, NetProtocol.INPUT.pack(
+            sequence, int(command.thrust), int(command.strafe), int(command.roll), min(int(command.fire), 255),
+            command.yaw, command.pitch)))
+
+    async def request_status(self):
+        self.status_received.clear()
+        self.writer.write(NetProtocol.pack(NetProtocol.STATUS_REQUEST))
+        await self.status_received.wait()
+        return self.status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+class NetworkSimulation:
+    # Gegenstück zu Simulation im Mehrspielermodus. Das eigene Schiff wird sofort mit den eigenen Eingaben
+    # vorhergesagt; mit jedem Snapshot wird es auf den Serverzustand gesetzt und die noch nicht bestätigten Eingaben
+    # werden erneut angewendet. Andere Schiffe und Laser werden interpolation_delay hinter dem neuesten Snapshot
+    # zwischen zwei Snapshots interpoliert. Die Himmelskörper rechnet der Client selbst (gleicher Seed).
+    def __init__(self, world, client, timestep=1 / 60, max_steps=5, interpolation_delay=0.1):
+        self.world = world
+        self.client = client
+        self.timestep = timestep
+        self.max_steps = max_steps
+        self.interpolation_delay = interpolation_delay
+        self.accumulator = 0.0
+        self.pending = ShipCommand()
+        self.sequence = 0
+        self.unacknowledged = deque()
+        self.history = deque(maxlen=32)  # (Serverzeit, Schlüssel, Werte)
+        self.latest_received = None
+
+        tick = client.snapshots[-1][0] if client.snapshots else client.welcome["tick"]
+        self.synchronize(tick)
+        if client.snapshots:
+            self.reconcile(0, client.snapshots[-1][2])
+        self.previous_state = self.ship_state()
+
+    def synchronize(self, tick):
+        # Umlaufwinkel wachsen linear: direkt auf den Stand des Servers setzen
+        world = self.world
+        system = world.solar_system
+        n = system.count
+        elapsed = self.timestep * (tick - world.tick)
+        system.angle[:n] += system.orbital_speed[:n] * elapsed
+        system.rotation_angle[:n] += system.rotation_speed[:n] * elapsed
+        system.update_positions(0, n)
+        world.tick = tick
+        world.time = tick * self.timestep
+        if world.gravity is not None:
+            world.gravity.update(world.time)
+
+    def ship_state(self):
+        return self.world.movement.copy(), self.world.orientation.tolist()
+
+    def predict(self, command):
+        ships = self.world.ships
+        ships.steer(slice(0, 1), command.yaw, command.pitch, command.roll, self.timestep)
+        # Quellen vom letzten Tick auch beim Nachspielen unbestätigter Eingaben: der Server korrigiert die Abweichung
+        gravity = self.world.gravity.acceleration(ships.positions[0:1]) if self.world.gravity is not None else None
+        ships.accelerate(slice(0, 1), [command.thrust], [command.strafe], self.timestep, gravity)
+
+    def step(self, command):
+        self.previous_state = self.ship_state()
+        self.sequence += 1
+        self.client.loop.call_soon_threadsafe(self.client.send_input, self.sequence, command)
+        self.unacknowledged.append((self.sequence, command))
+        with profiler.scope("simulation"):
+            self.predict(command)
+            self.world.solar_system.update(self.timestep)
+            if self.world.gravity is not None:
+                self.world.gravity.update(self.world.time + self.timestep)
+        self.world.tick += 1
+        self.world.time += self.timestep
+
+    def advance(self, frame_dt, command):
+        with profiler.scope("network"):
+            self.receive()
+        self.pending.merge(command)
+        self.accumulator += min(frame_dt, self.timestep * self.max_steps)
+        while self.accumulator >= self.timestep:
+            self.step(self.pending)
+            self.pending = self.pending.continuing()
+            self.accumulator -= self.timestep
+        with profiler.scope("network"):
+            self.interpolate_remote()
+        return self.accumulator / self.timestep
+
+    def receive(self):
+        while self.client.snapshots:
+            tick, ack, own, keys, values = self.client.snapshots.popleft()
+            self.history.append((tick * self.timestep, keys, values))
+            self.latest_received = time.perf_counter()
+            self.reconcile(ack, own)
+
+    def reconcile(self, ack, own):
+        while self.unacknowledged and self.unacknowledged[0][0] <= ack:
+            self.unacknowledged.popleft()
+        ships = self.world.ships
+        ships.positions[0] = own[0:3]
+        ships.velocities[0] = own[3:6]
+        ships.set_euler(0, *own[6:9])
+        ships.life_points[0], ships.structure_points[0] = own[9:11]
+        for _, command in self.unacknowledged:
+            self.predict(command)
+
+    def interpolated(self, alpha):
+        previous_movement, previous_orientation = self.previous_state
+        world = self.world
+        return (previous_movement + (world.movement - previous_movement) * alpha,
+                Quaternion.nlerp(previous_orientation, world.orientation.tolist(), alpha))
+
+    def interpolate_remote(self):
+        if not self.history:
+            return
+        render_time = self.history[-1][0] + (time.perf_counter() - self.latest_received) - self.interpolation_delay
+        before = after = self.history[-1]
+        for snapshot in reversed(self.history):
+            if snapshot[0] <= render_time:
+                before = snapshot
+                break
+            after = snapshot
+        else:
+            before = after
+
+        # Schiffe, die in beiden Snapshots vorkommen, werden linear interpoliert
+        ships = (before[1] >> 24) == SnapshotCodec.SHIP
+        keys, first, second = np.intersect1d(before[1][ships], after[1], assume_unique=True, return_indices=True)
+        t = 0.0 if after[0] <= before[0] else min(max((render_time - before[0]) / (after[0] - before[0]), 0.0), 1.0)
+        start, end = before[2][ships][first], after[2][second]
+        world = self.world
+        world.remote_ships = SnapshotCodec.positions(start + (end - start) * t)
+
+        # Laser ab ihrem Basiszustand bis zur Renderzeit fortschreiben, mit der Schwerkraft am Basisort
+        values = before[2][~ships]
+        slots = (before[1][~ships] & 0xFFFFFF).astype(np.intp)
+        lasers = world.lasers
+        origins = SnapshotCodec.positions(values)
+        directions = values[:, 3:6] / SnapshotCodec.DIRECTION_SCALE
+        accelerations = np.zeros_like(origins)
+        if world.gravity is not None and len(origins):
+            accelerations = world.gravity.body_acceleration(origins)
+        positions, directions = LaserPool.extrapolate(origins, directions, accelerations, lasers.speed,
+                                                      render_time - values[:, 6] * self.timestep)
+        lasers.alive[:] = False
+        lasers.alive[slots] = True
+        lasers.positions[slots] = positions
+        lasers.directions[slots] = directions
+
+class Frustum:
+    def __init__(self, field_of_view, aspect, near, far):
+        f = 1 / math.tan(math.radians(field_of_view) / 2)
+        self.projection = np.array([
+            [f / aspect, 0, 0, 0],
+            [0, f, 0, 0],
+            [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+            [0, 0, -1, 0]
+        ])
+        self.planes = np.zeros((6, 4))
+        self.view_projection = np.identity(4)
+
+    def update(self, eye, target, up=(0, 1, 0)):
+        # Gleiche Kamera wie gluLookAt; Ebenen nach Gribb/Hartmann aus Projektion * Ansicht
+        forward = np.subtract(target, eye)
+        forward /= np.linalg.norm(forward)
+        side = np.cross(forward, up)
+        side /= np.linalg.norm(side)
+        true_up = np.cross(side, forward)
+
+        view = np.identity(4)
+        view[0, :3], view[1, :3], view[2, :3] = side, true_up, -forward
+        view[:3, 3] = -view[:3, :3] @ eye
+        clip = self.projection @ view
+        self.view_projection = clip
+
+        self.planes[0] = clip[3] + clip[0]
+        self.planes[1] = clip[3] - clip[0]
+        self.planes[2] = clip[3] + clip[1]
+        self.planes[3] = clip[3] - clip[1]
+        self.planes[4] = clip[3] + clip[2]
+        self.planes[5] = clip[3] - clip[2]
+        self.planes /= np.linalg.norm(self.planes[:, :3], axis=1)[:, np.newaxis]
+
+    def visible(self, centers, radii):
+        distances = centers @ self.planes[:, :3].T + self.planes[:, 3]
+        return (distances >= -radii[:, np.newaxis]).all(axis=1)
+
+class ImpostorBatch:
+    def __init__(self, max_size=8):
+        # Runde, weich auslaufende Scheibe als Punkt-Sprite
+        size = 32
+        y, x = np.mgrid[0:size, 0:size]
+        distance = np.hypot(x - (size - 1) / 2, y - (size - 1) / 2) / (size / 2)
+        alpha = np.clip((1.0 - distance) * 4, 0, 1)
+        pixels = np.zeros((size, size, 4), dtype=np.uint8)
+        pixels[..., :3] = 255
+        pixels[..., 3] = (alpha * 255).astype(np.uint8)
+
+        self.max_size = max_size
+        self.texture = gpu_resources.track("texture", glGenTextures(1), "ImpostorBatch", pixels.nbytes)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, size, size, 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        profiler.count("texture_uploads")
+
+    def draw(self, positions, colors, pixel_radii):
+        if len(positions) == 0:
+            return
+
+        # Punktgröße in ganzen Pixeln; pro Größe ein Aufruf
+        sizes = np.clip(np.ceil(pixel_radii * 2), 1, self.max_size)
+        order = np.argsort(sizes, kind="stable")
+        positions = np.ascontiguousarray(positions[order], dtype=np.float32)
+        colors = np.ascontiguousarray(colors[order], dtype=np.float32)
+        sizes = sizes[order]
+        bucket_sizes, starts, counts = np.unique(sizes, return_index=True, return_counts=True)
+
+        glPushAttrib(GL_ENABLE_BIT | GL_POINT_BIT)
+        glDisable(GL_LIGHTING)
+        glEnable(GL_BLEND)
+        glEnable(GL_TEXTURE_2D)
+        glEnable(GL_POINT_SPRITE)
+        glTexEnvi(GL_POINT_SPRITE, GL_COORD_REPLACE, GL_TRUE)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, positions)
+        glColorPointer(3, GL_FLOAT, 0, colors)
+        for size, start, count in zip(bucket_sizes.tolist(), starts.tolist(), counts.tolist()):
+            glPointSize(size)
+            glDrawArrays(GL_POINTS, start, count)
+        profiler.count("draw_calls", len(bucket_sizes))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+        glTexEnvi(GL_POINT_SPRITE, GL_COORD_REPLACE, GL_FALSE)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glPopAttrib()
+
+    def release(self):
+        gpu_resources.release("texture", self.texture)
+
+SUN_LIGHTING = """
+uniform vec3 sun_position;
+uniform vec3 camera_position;
+
+const vec3 light_color = vec3(1.0, 1.0, 0.8);
+const float ambient = 0.2;
+
+// Diffus (rgb) und Glanzlicht (a) von der Sonne, wie GL_LIGHT0 im Fixed-Function-Pfad
+vec4 sun_light(vec3 position, vec3 normal, out float lambert) {
+    vec3 to_sun = sun_position - position;
+    float distance = length(to_sun);
+    vec3 light = to_sun / max(distance, 1e-6);
+    float attenuation = 1.0 / (1.0 + 0.0001 * distance * distance);
+    lambert = dot(normal, light);
+    vec3 view = normalize(camera_position - position);
+    float specular = lambert > 0.0 ? 0.5 * pow(max(dot(reflect(-light, normal), view), 0.0), 50.0) : 0.0;
+    return vec4(ambient + max(lambert, 0.0) * attenuation * light_color, specular * attenuation);
+}
+"""
+
+PLANET_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec3 position;
+layout(location = 1) in vec3 normal;
+layout(location = 2) in vec2 uv;
+layout(location = 3) in vec4 model_x;  // Zeilen der Modellmatrix pro Instanz
+layout(location = 4) in vec4 model_y;
+layout(location = 5) in vec4 model_z;
+layout(location = 6) in vec4 layers;   // Tag-Layer, Nacht-Layer (-1: keiner), selbstleuchtend
+
+uniform mat4 view_projection;
+
+out vec3 world_position;
+out vec3 world_normal;
+out vec2 texture_coordinate;
+flat out vec3 texture_layers;
+
+void main() {
+    vec4 p = vec4(position, 1.0);
+    vec4 n = vec4(normal, 0.0);
+    world_position = vec3(dot(model_x, p), dot(model_y, p), dot(model_z, p));
+    world_normal = vec3(dot(model_x, n), dot(model_y, n), dot(model_z, n));
+    texture_coordinate = uv;
+    texture_layers = layers.xyz;
+    gl_Position = view_projection * vec4(world_position, 1.0);
+}
+"""
+
+PLANET_FRAGMENT_SHADER = """
+#version 330 core
+uniform sampler2DArray planet_textures;
+
+in vec3 world_position;
+in vec3 world_normal;
+in vec2 texture_coordinate;
+flat in vec3 texture_layers;
+
+out vec4 fragment_color;
+""" + SUN_LIGHTING + """
+void main() {
+    vec4 day = texture(planet_textures, vec3(texture_coordinate, texture_layers.x));
+    if (texture_layers.z > 0.5) {
+        fragment_color = day;
+        return;
+    }
+
+    float lambert;
+    vec4 light = sun_light(world_position, normalize(world_normal), lambert);
+    vec3 color = day.rgb * light.rgb + light.a;
+    if (texture_layers.y >= 0.0) {
+        // Nachtseite: Stadtlichter weich über den Terminator einblenden
+        vec3 night = texture(planet_textures, vec3(texture_coordinate, texture_layers.y)).rgb;
+        color += night * (1.0 - smoothstep(-0.2, 0.2, lambert));
+    }
+    fragment_color = vec4(color, day.a);
+}
+"""
+
+SHIP_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec3 position;
+layout(location = 1) in vec3 normal;
+
+uniform mat4 view_projection;
+uniform vec3 offset;
+uniform float scale;
+
+out vec3 world_position;
+out vec3 world_normal;
+
+void main() {
+    world_position = position * scale + offset;
+    world_normal = normal;
+    gl_Position = view_projection * vec4(world_position, 1.0);
+}
+"""
+
+SHIP_FRAGMENT_SHADER = """
+#version 330 core
+uniform vec3 color;
+
+in vec3 world_position;
+in vec3 world_normal;
+
+out vec4 fragment_color;
+""" + SUN_LIGHTING + """
+void main() {
+    float lambert;
+    vec4 light = sun_light(world_position, normalize(world_normal), lambert);
+    fragment_color = vec4(color * light.rgb + light.a, 1.0);
+}
+"""
+
+POINT_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec3 position;
+layout(location = 1) in vec4 color;
+layout(location = 2) in float size;
+
+uniform mat4 view_projection;
+
+out vec4 point_color;
+
+void main() {
+    point_color = color;
+    gl_PointSize = size;
+    gl_Position = view_projection * vec4(position, 1.0);
+}
+"""
+
+POINT_FRAGMENT_SHADER = """
+#version 330 core
+in vec4 point_color;
+out vec4 fragment_color;
+
+void main() {
+    fragment_color = point_color;
+}
+"""
+
+class ShaderProgram:
+    def __init__(self, vertex_source, fragment_source):
+        # Fehler beim Übersetzen/Linken kommen als RuntimeError mit dem Log des Treibers
+        self.program = shaders.compileProgram(
+            shaders.compileShader(vertex_source, GL_VERTEX_SHADER),
+            shaders.compileShader(fragment_source, GL_FRAGMENT_SHADER),
+            validate=False
+        )
+        gpu_resources.track("program", self.program, "ShaderProgram")
+        self.locations = {}
+
+    def uniform(self, name):
+        location = self.locations.get(name)
+        if location is None:
+            location = self.locations[name] = glGetUniformLocation(self.program, name)
+        return location
+
+    def use(self, view_projection, camera_position, sun_position):
+        glUseProgram(self.program)
+        glUniformMatrix4fv(self.uniform("view_projection"), 1, GL_TRUE, view_projection.astype(np.float32))
+        if self.uniform("camera_position") >= 0:
+            glUniform3f(self.uniform("camera_position"), *camera_position)
+            glUniform3f(self.uniform("sun_position"), *sun_position)
+
+    def release(self):
+        gpu_resources.release("program", self.program)
+
+class ShaderPipeline:
+    # Planeten, Schiff und Sterne über GLSL statt Fixed-Function (OpenGL 3.3, läuft auch auf llvmpipe)
+    INSTANCE_STRIDE = 16 * 4
+
+    def __init__(self, sun_position=(0, 0, 0), ship_color=(0.8, 0.8, 0.8)):
+        self.sun_position = sun_position
+        self.ship_color = ship_color
+        self.planet_program = ShaderProgram(PLANET_VERTEX_SHADER, PLANET_FRAGMENT_SHADER)
+        self.ship_program = ShaderProgram(SHIP_VERTEX_SHADER, SHIP_FRAGMENT_SHADER)
+        self.point_program = ShaderProgram(POINT_VERTEX_SHADER, POINT_FRAGMENT_SHADER)
+
+        self.view_projection = np.identity(4)
+        self.camera_position = (0, 0, 0)
+        self.texture_arrays = {}  # Tupel der Texturpfade -> Textur-Array (Layer in Reihenfolge der Pfade)
+        self.placeholder_texture = None  # graues 1x1-Textur-Array, bis die Texturen dekodiert sind
+        self.instance_arrays = {}  # id(ModelMesh) -> (VAO, Instanzpuffer)
+        self.mesh_arrays = {}  # id(ModelMesh/ParticleField) -> VAO
+
+    def begin_frame(self, view_projection, camera_position):
+        self.view_projection = view_projection
+        self.camera_position = camera_position
+
+    def texture_array(self, paths, texture_cache):
+        # Alle Texturen einer Gruppe (z.B. Planeten samt Nachttexturen) als Layer eines GL_TEXTURE_2D_ARRAY, damit
+        # die ganze Gruppe mit einer gebundenen Textur gezeichnet werden kann. Solange noch nicht alle dekodiert
+        # sind, gibt es einen grauen Platzhalter ohne Layer-Zuordnung (alle Körper Layer 0, keine Nachtseite).
+        paths = tuple(dict.fromkeys(path for path in paths if path is not None))
+        if paths not in self.texture_arrays:
+            if texture_cache.progressive and not all(texture_cache.ready(path) for path in paths):
+                return self.placeholder_array(), {}
+            self.texture_arrays[paths] = self.create_texture_array(paths, texture_cache)
+        return self.texture_arrays[paths], {path: layer for layer, path in enumerate(paths)}
+
+    def placeholder_array(self):
+        if self.placeholder_texture is None:
+            self.placeholder_texture = gpu_resources.track("texture", glGenTextures(1), "ShaderPipeline placeholder", 4)
+            glBindTexture(GL_TEXTURE_2D_ARRAY, self.placeholder_texture)
+            glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            glTexImage3D(GL_TEXTURE_2D_ARRAY, 0, GL_RGBA8, 1, 1, 1, 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                         np.array([178, 178, 178, 255], dtype=np.uint8))
+            glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+        return self.placeholder_texture
+
+    def create_texture_array(self, paths, texture_cache):
+        decoded = [texture_cache.decoded(path)[1] for path in paths]
+        size = next((levels[0].shape[:2] for levels in decoded if levels is not None), (1, 1))
+
+        chains = []
+        for levels in decoded:
+            if levels is None:
+                # Nicht lesbar: grau wie der Platzhalter, damit die Layer-Zuordnung stimmt
+                chain = texture_cache.build_mipmaps(np.full(size + (4,), 178, dtype=np.uint8))
+            else:
+                chain = [level for level in levels if level.shape[0] <= size[0] and level.shape[1] <= size[1]]
+            if chain[0].shape[:2] != size:
+                # Anderes Seitenverhältnis: auf die Layergröße skalieren und neue Mip-Kette bauen
+                surface = pygame.image.frombuffer(np.ascontiguousarray(levels[0]).tobytes(), (levels[0].shape[1], levels[0].shape[0]), "RGBA")
+                surface = pygame.transform.smoothscale(surface, (size[1], size[0]))
+                pixels = np.frombuffer(pygame.image.tostring(surface, "RGBA"), dtype=np.uint8).reshape(size[0], size[1], 4)
+                chain = texture_cache.build_mipmaps(pixels)
+            chains.append(chain)
+
+        texture = gpu_resources.track("texture", glGenTextures(1), "ShaderPipeline texture array",
+                                      sum(level.nbytes for chain in chains for level in chain))
+        glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAX_LEVEL, len(chains[0]) - 1)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+        texture_cache.register(GL_TEXTURE_2D_ARRAY, texture, max(size))
+        # Große Stufen kommen über texture_cache.pump() nach
+        texture_cache.schedule(TextureUpload(GL_TEXTURE_2D_ARRAY, texture, chains))
+        logging.info(f"Texture array: {len(chains)} layers, {size[1]}x{size[0]}")
+        return texture
+
+    def instance_array(self, mesh):
+        # VAO pro Mesh: Mesh-VBO für Position/Normale/UV, eigener Instanzpuffer für Matrizen und Layer
+        if id(mesh) not in self.instance_arrays:
+            vao = gpu_resources.track("vertex_array", glGenVertexArrays(1), "ShaderPipeline instances")
+            instance_buffer = gpu_resources.track("buffer", glGenBuffers(1), "ShaderPipeline instances")
+            glBindVertexArray(vao)
+            glBindBuffer(GL_ARRAY_BUFFER, mesh.vertex_buffer)
+            for location, size, offset in ((0, 3, 0), (1, 3, 12), (2, 2, 24)):
+                glEnableVertexAttribArray(location)
+                glVertexAttribPointer(location, size, GL_FLOAT, GL_FALSE, 32, ctypes.c_void_p(offset))
+            glBindBuffer(GL_ARRAY_BUFFER, instance_buffer)
+            for row in range(4):
+                glEnableVertexAttribArray(3 + row)
+                glVertexAttribPointer(3 + row, 4, GL_FLOAT, GL_FALSE, self.INSTANCE_STRIDE, ctypes.c_void_p(16 * row))
+                glVertexAttribDivisor(3 + row, 1)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, mesh.index_buffer)
+            glBindVertexArray(0)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            self.instance_arrays[id(mesh)] = (vao, instance_buffer)
+        return self.instance_arrays[id(mesh)]
+
+    @staticmethod
+    def planet_matrices(system, indices):
+        # Gleiche Transformation wie Planet.draw (drehen um y, z 180°, y, x 90°, skalieren) für alle Planeten auf
+        # einmal; die Drehungen fassen sich zu einer Drehung um d = angle - rotation_angle zusammen
+        d = system.angle[indices] - system.rotation_angle[indices]
+        radius = system.diameter[indices] / 2
+        cos_d, sin_d = np.cos(d) * radius, np.sin(d) * radius
+
+        rows = np.zeros((len(indices), 3, 4), dtype=np.float32)
+        rows[:, 0, 0], rows[:, 0, 1] = -cos_d, sin_d
+        rows[:, 1, 2] = radius
+        rows[:, 2, 0], rows[:, 2, 1] = sin_d, cos_d
+        rows[:, :, 3] = system.positions[indices]
+        return rows
+
+    def begin_instances(self, texture):
+        self.planet_program.use(self.view_projection, self.camera_position, self.sun_position)
+        glUniform1i(self.planet_program.uniform("planet_textures"), 0)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+
+    def draw_instances(self, mesh, instances):
+        # Ein instanzierter Aufruf für alle Kopien eines Meshes; instances enthält pro Zeile die drei oberen
+        # Zeilen der Modellmatrix und (Tag-Layer, Nacht-Layer, selbstleuchtend, -)
+        instances = np.ascontiguousarray(instances, dtype=np.float32)
+        vao, instance_buffer = self.instance_array(mesh)
+        glBindBuffer(GL_ARRAY_BUFFER, instance_buffer)
+        glBufferData(GL_ARRAY_BUFFER, instances.nbytes, instances, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        gpu_resources.resize("buffer", instance_buffer, instances.nbytes)
+        glBindVertexArray(vao)
+        glDrawElementsInstanced(GL_TRIANGLES, mesh.index_count, GL_UNSIGNED_INT, ctypes.c_void_p(0), len(instances))
+        profiler.count("draw_calls")
+        glBindVertexArray(0)
+
+    def end_instances(self):
+        glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+        glUseProgram(0)
+
+    def draw_planets(self, system, planets, pixel_radii, texture_cache):
+        # Textur-Array schon im ersten Frame aufbauen, nicht erst wenn ein Planet groß genug wird
+        paths = [path for planet in system.planets for path in (planet.texture_path, planet.night_texture_path)]
+        texture, layers = self.texture_array(paths, texture_cache)
+        if not planets:
+            return
+        if Planet.sphere_meshes is None:
+            Planet.sphere_meshes = SphereMeshCache()
+
+        indices = np.fromiter((planet.index for planet in planets), dtype=np.intp, count=len(planets))
+        instances = np.zeros((len(planets), 16), dtype=np.float32)
+        instances[:, :12] = self.planet_matrices(system, indices).reshape(-1, 12)
+        instances[:, 12] = [layers.get(planet.texture_path, 0) for planet in planets]
+        instances[:, 13] = [layers.get(planet.night_texture_path, -1) for planet in planets]
+        instances[:, 14] = [planet.name == "Sun" for planet in planets]
+
+        # Ein instanzierter Aufruf pro LOD-Stufe statt einem Aufruf pro Planet
+        self.begin_instances(texture)
+        levels = Planet.sphere_meshes.select_indices(pixel_radii)
+        for level in np.unique(levels).tolist():
+            self.draw_instances(Planet.sphere_meshes.levels[level], instances[levels == level])
+        self.end_instances()
+
+    def draw_field(self, field, models, indices, pixel_radii, texture_cache):
+        # indices sind Körper des Feldes (relativ zu field.start), die als Mesh gezeichnet werden
+        texture, layers = self.texture_array(field.texture_paths, texture_cache)
+        if len(indices) == 0:
+            return
+        variants = field.variants[indices]
+        instances = np.zeros((len(indices), 16), dtype=np.float32)
+        instances[:, :12] = field.matrices(indices).reshape(-1, 12)
+        instances[:, 12] = np.array([layers.get(path, 0) for path in field.texture_paths])[variants]
+        instances[:, 13] = -1
+
+        # Ein instanzierter Aufruf je Variante und LOD-Stufe
+        self.begin_instances(texture)
+        for variant in np.unique(variants).tolist():
+            selected = variants == variant
+            levels = models[variant].select_indices(pixel_radii[selected])
+            for level in np.unique(levels).tolist():
+                self.draw_instances(models[variant].meshes[level], instances[selected][levels == level])
+        self.end_instances()
+
+    def draw_ship(self, ship_mesh, position, scale=1.0):
+        vao = self.mesh_arrays.get(id(ship_mesh))
+        if vao is None:
+            vao = self.mesh_arrays[id(ship_mesh)] = gpu_resources.track("vertex_array", glGenVertexArrays(1), "ShaderPipeline ship")
+            glBindVertexArray(vao)
+            glBindBuffer(GL_ARRAY_BUFFER, ship_mesh.vertex_buffer)
+            for location, offset in ((0, 0), (1, 12)):
+                glEnableVertexAttribArray(location)
+                glVertexAttribPointer(location, 3, GL_FLOAT, GL_FALSE, 32, ctypes.c_void_p(offset))
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ship_mesh.index_buffer)
+            glBindVertexArray(0)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        self.ship_program.use(self.view_projection, self.camera_position, self.sun_position)
+        glUniform3f(self.ship_program.uniform("offset"), *position)
+        glUniform1f(self.ship_program.uniform("scale"), scale)
+        glUniform3f(self.ship_program.uniform("color"), *self.ship_color)
+        glBindVertexArray(vao)
+        glDrawElements(GL_TRIANGLES, ship_mesh.index_count, GL_UNSIGNED_INT, ctypes.c_void_p(0))
+        profiler.count("draw_calls")
+        glBindVertexArray(0)
+        glUseProgram(0)
+
+    def draw_points(self, field, fraction=1.0):
+        # Punktgröße kommt pro Vertex aus dem Puffer, daher ein Aufruf für das ganze Feld (bei fraction < 1 einer
+        # je Größenbereich)
+        vao = self.mesh_arrays.get(id(field))
+        if vao is None:
+            vao = self.mesh_arrays[id(field)] = gpu_resources.track("vertex_array", glGenVertexArrays(1), "ShaderPipeline points")
+            glBindVertexArray(vao)
+            glBindBuffer(GL_ARRAY_BUFFER, field.vertex_buffer)
+            glEnableVertexAttribArray(0)
+            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, field.stride, ctypes.c_void_p(0))
+            glEnableVertexAttribArray(1)
+            glVertexAttribPointer(1, 4, GL_UNSIGNED_BYTE, GL_TRUE, field.stride, ctypes.c_void_p(12))
+            glEnableVertexAttribArray(2)
+            glVertexAttribPointer(2, 1, GL_FLOAT, GL_FALSE, field.stride, ctypes.c_void_p(16))
+            glBindVertexArray(0)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        glPushAttrib(GL_ENABLE_BIT)
+        glEnable(GL_PROGRAM_POINT_SIZE)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        self.point_program.use(self.view_projection, self.camera_position, self.sun_position)
+        glBindVertexArray(vao)
+        if fraction >= 1.0:
+            glDrawArrays(GL_POINTS, 0, field.count)
+            profiler.count("draw_calls")
+        else:
+            for _, start, count in field.ranges(fraction):
+                glDrawArrays(GL_POINTS, start, count)
+            profiler.count("draw_calls", len(field.buckets))
+        glBindVertexArray(0)
+        glUseProgram(0)
+        glPopAttrib()
+
+    def release(self):
+        for vao, instance_buffer in self.instance_arrays.values():
+            gpu_resources.release("vertex_array", vao)
+            gpu_resources.release("buffer", instance_buffer)
+        for vao in self.mesh_arrays.values():
+            gpu_resources.release("vertex_array", vao)
+        for texture in self.texture_arrays.values():
+            gpu_resources.release("texture", texture)
+        if self.placeholder_texture is not None:
+            gpu_resources.release("texture", self.placeholder_texture)
+        for program in (self.planet_program, self.ship_program, self.point_program):
+            program.release()
+        self.instance_arrays = {}
+        self.mesh_arrays = {}
+        self.texture_arrays = {}
+        self.placeholder_texture = None
+
+class ScaledFramebuffer:
+    # Zeichnet mit geringerer Auflösung in einen Framebuffer, der am Ende des Frames ins Fenster hochskaliert wird
+    def __init__(self, display):
+        self.display = display
+        self.scale = 1.0
+        self.size = display
+        self.framebuffer = None
+        self.renderbuffers = []
+
+    def resize(self, scale):
+        # scale 1.0 zeichnet direkt ins Fenster; ohne Framebuffer-Objekte (OpenGL < 3.0) bleibt es dabei
+        self.release()
+        if scale >= 1.0:
+            return True
+        size = (max(int(self.display[0] * scale), 1), max(int(self.display[1] * scale), 1))
+        try:
+            self.framebuffer = gpu_resources.track("framebuffer", glGenFramebuffers(1), "ScaledFramebuffer")
+            glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+            self.renderbuffers = [gpu_resources.track("renderbuffer", int(renderbuffer), "ScaledFramebuffer", size[0] * size[1] * 4)
+                                  for renderbuffer in glGenRenderbuffers(2)]
+            attachments = ((GL_RGBA8, GL_COLOR_ATTACHMENT0), (GL_DEPTH24_STENCIL8, GL_DEPTH_STENCIL_ATTACHMENT))
+            for renderbuffer, (internal_format, attachment) in zip(self.renderbuffers, attachments):
+                glBindRenderbuffer(GL_RENDERBUFFER, renderbuffer)
+                glRenderbufferStorage(GL_RENDERBUFFER, internal_format, *size)
+                glFramebufferRenderbuffer(GL_FRAMEBUFFER, attachment, GL_RENDERBUFFER, renderbuffer)
+            complete = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+        except (GLError, NullFunctionError) as e:
+            logging.error(f"Render scale not available: {e}")
+            complete = False
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if not complete:
+            self.release()
+            return False
+        self.scale = scale
+        self.size = size
+        return True
+
+    def begin(self):
+        if self.framebuffer is not None:
+            glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+            glViewport(0, 0, *self.size)
+
+    def end(self):
+        if self.framebuffer is not None:
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.framebuffer)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+            glBlitFramebuffer(0, 0, *self.size, 0, 0, *self.display, GL_COLOR_BUFFER_BIT, GL_LINEAR)
+            profiler.count("draw_calls")
+            glBindFramebuffer(GL_FRAMEBUFFER, 0)
+            glViewport(0, 0, *self.display)
+
+    def release(self):
+        if self.framebuffer is not None:
+            gpu_resources.release("framebuffer", self.framebuffer)
+        for renderbuffer in self.renderbuffers:
+            gpu_resources.release("renderbuffer", renderbuffer)
+        self.framebuffer = None
+        self.renderbuffers = []
+        self.scale = 1.0
+        self.size = self.display
+
+class Renderer:
+    def __init__(self, display, num_stars=1000, field_of_view=45, camera_distance=1.05, impostor_radius=3.0, use_shaders=False,
+                 field_mesh_radius=4.0, field_min_radius=0.25, progressive=True, upload_budget_ms=2.0, texture_budget_mb=None):
+        self.display = display
+        self.field_of_view = field_of_view
+        self.pixel_scale = display[1] / 2 / math.tan(math.radians(field_of_view) / 2)  # in Pixeln des Framebuffers
+        self.frustum = Frustum(field_of_view, display[0] / display[1], 0.1, 1000.0)
+        self.impostor_radius = impostor_radius  # unterhalb dieses Bildschirmradius (Pixel) nur noch ein Punkt-Sprite
+        self.field_mesh_radius = field_mesh_radius  # Körperfelder: Gesteinsbrocken erst ab hier als Mesh
+        self.field_min_radius = field_min_radius  # Körperfelder: noch kleinere Körper werden gar nicht gezeichnet
+        self.impostors = ImpostorBatch()
+        self.visible_bodies = 0
+        self.camera_distance = camera_distance  # näher heranzoomen und Abstand zwischen Kamera und Raumschiff
+
+        # Texturen und Modelle laden im Hintergrund; progressive=False wartet darauf (z.B. für Benchmarks)
+        self.progressive = progressive
+        self.texture_cache = TextureCache(progressive=progressive)
+        if texture_budget_mb is not None:
+            self.texture_cache.budget = texture_budget_mb * 2 ** 20
+        self.upload_budget = upload_budget_ms / 1000  # GL-Uploadzeit pro Frame für große Mip-Stufen
+        self.model_registry = ModelRegistry()
+        self.model_registry.prefetch(self.model_registry.sources)
+        self.stars = create_star_field(num_stars)
+        self.anomaly = Anomaly()  # Hintergrund wird einmalig geladen und danach nur noch gezeichnet
+        self.overlay = ProfilerOverlay(profiler)
+
+        # Qualitätsregler (siehe QualityGovernor.TIERS), gesetzt über set_quality
+        self.framebuffer = ScaledFramebuffer(display)
+        self.lod_bias = 1.0
+        self.star_fraction = 1.0
+        self.laser_width = 2.0
+        self.laser_limit = None
+
+        self.models = {}  # prozedurale Modelle der Körperfelder ("rock:N") -> Model, beim ersten Zeichnen erzeugt
+        self.shaders = None  # ShaderPipeline, wird beim ersten Umschalten erzeugt
+        self.use_shaders = False
+        if use_shaders:
+            self.set_shaders(True)
+
+    @property
+    def spaceship(self):
+        return self.model_registry.get("ship")
+
+    def set_shaders(self, enabled):
+        # Zwischen Fixed-Function und GLSL umschalten; ohne OpenGL 3.3 bleibt es beim alten Pfad
+        if enabled and self.shaders is None:
+            try:
+                self.shaders = ShaderPipeline()
+            except (RuntimeError, GLError) as e:
+                logging.error(f"Shader path not available, using fixed function: {e}")
+                return False
+        self.use_shaders = enabled
+        logging.info(f"Render path: {'shader' if enabled else 'fixed function'}")
+        return True
+
+    def set_quality(self, settings):
+        self.lod_bias = settings["lod_bias"]
+        self.star_fraction = settings["star_fraction"]
+        self.laser_width = settings["laser_width"]
+        self.laser_limit = settings["laser_limit"]
+        self.texture_cache.set_resolution_cap(settings["texture_size"])
+        if settings["render_scale"] != self.framebuffer.scale:
+            self.framebuffer.resize(settings["render_scale"])
+        # Bildschirmradien (LOD, Impostors) in Pixeln des kleineren Framebuffers
+        self.pixel_scale = self.framebuffer.size[1] / 2 / math.tan(math.radians(self.field_of_view) / 2)
+
+    def draw(self, world, movement, orientation):
+        with profiler.scope("uploads"):
+            self.texture_cache.pump(self.upload_budget)
+        self.framebuffer.begin()
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        # Kamera aus den Schiffsachsen, einmal pro Frame auf Zahlen statt kleinen Arrays
+        forward, _, up = Quaternion.axes(*orientation)
+        x, y, z = movement.tolist()
+        camera_position = (x - forward[0] * self.camera_distance, y - forward[1] * self.camera_distance,
+                           z - forward[2] * self.camera_distance)
+        camera_target = (x - forward[0], y - forward[1], z - forward[2])
+
+        glLoadIdentity()
+        gluLookAt(
+            *camera_position,  # Kameraposition (Augen)
+            *camera_target,  # Zielpunkt (Mittelpunkt)
+            *up  # Hochachse des Schiffs, dreht beim Rollen mit
+        )
+        self.frustum.update(camera_position, camera_target, up)
+        if self.use_shaders:
+            self.shaders.begin_frame(self.frustum.view_projection, camera_position)
+
+        with profiler.scope("draw_ship"):
+            ship = self.spaceship
+            self.draw_ship(ship, movement, self.camera_distance)
+            # Andere Schiffe im Mehrspielermodus
+            for position in world.remote_ships:
+                self.draw_ship(ship, position, max(np.linalg.norm(position - camera_position), 1e-6))
+
+        # Hinzufügen des Hintergrunds
+        with profiler.scope("draw_background"):
+            self.anomaly.add_background(self.texture_cache, self.star_fraction)
+        with profiler.scope("draw_stars"):
+            if self.use_shaders:
+                self.shaders.draw_points(self.stars, self.star_fraction)
+            else:
+                self.anomaly.draw_stars(self.stars, self.star_fraction)
+
+        with profiler.scope("draw_planets"):
+            self.draw_planets(world.solar_system, camera_position)
+        with profiler.scope("draw_fields"):
+            for field in world.solar_system.fields:
+                self.draw_field(field, camera_position)
+
+        # Zeichne die Laserstrahlen
+        with profiler.scope("draw_lasers"):
+            world.lasers.draw(self.laser_width, self.laser_limit)
+        if world.trajectory is not None:
+            self.draw_trajectory(world.trajectory)
+
+        with profiler.scope("upscale"):
+            self.framebuffer.end()
+        self.overlay.draw(self.display)
+
+    def draw_trajectory(self, path):
+        # Vorausgesagte Flugbahn als Linienzug, zum Ende hin ausgeblendet
+        fade = np.linspace(0.8, 0.0, len(path), dtype=np.float32)
+        colors = np.column_stack([np.full_like(fade, 0.3), np.full_like(fade, 0.9), np.full_like(fade, 0.5), fade])
+        glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT)
+        glDisable(GL_LIGHTING)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, np.ascontiguousarray(path, dtype=np.float32))
+        glColorPointer(4, GL_FLOAT, 0, colors)
+        glDrawArrays(GL_LINE_STRIP, 0, len(path))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glPopAttrib()
+
+    def draw_ship(self, ship, position, distance):
+        # Das Modell ist auf Radius 1 normiert: zurück an Ort und Größe der STL-Datei
+        ship_mesh = ship.select(ship.radius * self.pixel_scale / distance * self.lod_bias)
+        offset = position + ship.center
+        if self.use_shaders:
+            self.shaders.draw_ship(ship_mesh, offset, ship.radius)
+        else:
+            glPushMatrix()
+            glTranslatef(*offset)
+            glScalef(ship.radius, ship.radius, ship.radius)
+            ship_mesh.draw()
+            glPopMatrix()
+
+    def draw_planets(self, system, camera_position):
+        planets = system.planets
+        if not planets:
+            return
+        for planet in planets:
+            if planet.texture_id is None:
+                planet.load_texture(self.texture_cache)
+
+        # Sichtbarkeit und Bildschirmgröße aller Körper in einem Durchgang
+        indices = np.fromiter((planet.index for planet in planets), dtype=np.intp, count=len(planets))
+        centers = system.positions[indices]
+        radii = system.diameter[indices] / 2
+        distances = np.linalg.norm(centers - camera_position, axis=1)
+        pixel_radii = radii * self.pixel_scale / np.maximum(distances, 1e-6)
+        visible = self.frustum.visible(centers, radii)
+        self.visible_bodies = int(visible.sum())
+
+        full = np.flatnonzero(visible & (pixel_radii >= self.impostor_radius))
+        if self.use_shaders:
+            self.shaders.draw_planets(system, [planets[i] for i in full.tolist()], pixel_radii[full] * self.lod_bias,
+                                      self.texture_cache)
+        else:
+            for i in full.tolist():
+                # Jedes Mal neu anfragen: die Textur kann inzwischen verdrängt worden sein
+                planets[i].load_texture(self.texture_cache)
+                planets[i].draw(pixel_radii[i] * self.lod_bias)
+
+        small = np.flatnonzero(visible & (pixel_radii < self.impostor_radius))
+        if len(small):
+            colors = np.array([planets[i].color for i in small.tolist()])
+            self.impostors.draw(centers[small], colors, pixel_radii[small])
+
+    def field_model(self, key):
+        # None, solange das Modell noch im Hintergrund lädt
+        kind, _, argument = key.partition(":")
+        if kind == "model":
+            return self.model_registry.get(argument, wait=not self.progressive)
+        if kind != "rock":
+            raise ValueError(f"Unknown model: {key}")
+        if key not in self.models:
+            # Zwei Stufen: einmal und gar nicht unterteiltes Ikosaeder. Das grobe weicht um bis zu 1 - 0.79 (Inkugel) ab;
+            # bei unregelmäßigem Gestein fällt ein Pixel Abweichung nicht auf
+            seed = int(argument)
+            self.models[key] = Model(key, [ModelMesh.rock(seed, 1), ModelMesh.rock(seed, 0)], [0.0, 0.2], max_error_pixels=1.0)
+        return self.models[key]
+
+    def draw_field(self, field, camera_position):
+        centers = field.positions
+        radii = field.radii
+        visible = np.flatnonzero(self.frustum.visible(centers, radii))
+        distances = np.linalg.norm(centers[visible] - camera_position, axis=1)
+        pixel_radii = radii[visible] * self.pixel_scale / np.maximum(distances, 1e-6)
+        shown = pixel_radii >= self.field_min_radius
+        visible, pixel_radii = visible[shown], pixel_radii[shown]
+        self.visible_bodies += len(visible)
+
+        # Nahe Körper als Mesh, alle anderen (und alle, solange die Modelle laden) als Punkt-Sprite in der mittleren
+        # Farbe des Feldes
+        # Mit lod_bias < 1 werden auch erst größere Körper zum Mesh
+        models = [self.field_model(key) for key in field.models]
+        mesh_threshold = self.field_mesh_radius / self.lod_bias
+        mesh_radius = mesh_threshold if all(models) else np.inf
+        full = visible[pixel_radii >= mesh_radius]
+        full_radii = pixel_radii[pixel_radii >= mesh_radius] * self.lod_bias
+        if self.use_shaders:
+            self.shaders.draw_field(field, models, full, full_radii, self.texture_cache)
+        elif len(full):
+            rows = field.matrices(full)
+            variants = field.variants[full]
+            glEnable(GL_TEXTURE_2D)
+            glMaterialfv(GL_FRONT, GL_AMBIENT_AND_DIFFUSE, (1.0, 1.0, 1.0, 1.0))
+            matrix = np.identity(4, dtype=np.float32)
+            for i in range(len(full)):
+                glBindTexture(GL_TEXTURE_2D, self.texture_cache.request(field.texture_paths[variants[i]]) or 0)
+                matrix[:3] = rows[i]
+                glPushMatrix()
+                glMultMatrixf(matrix.T)
+                models[variants[i]].select(full_radii[i]).draw()
+                glPopMatrix()
+            glBindTexture(GL_TEXTURE_2D, 0)
+            glDisable(GL_TEXTURE_2D)
+
+        small = pixel_radii < mesh_radius
+        if small.any():
+            # Höchstens so groß wie ein Mesh an der Schwelle, auch wenn das Modell noch lädt
+            colors = np.broadcast_to(np.asarray(field.color, dtype=np.float32), (int(small.sum()), 3))
+            self.impostors.draw(centers[visible[small]], colors, np.minimum(pixel_radii[small], mesh_threshold))
+
+    def release(self):
+        if self.shaders is not None:
+            self.shaders.release()
+            self.shaders = None
+        for model in self.models.values():
+            model.release()
+        self.models = {}
+        self.impostors.release()
+        self.framebuffer.release()
+        self.overlay.release()
+        self.anomaly.release()
+        self.stars.release()
+        self.model_registry.release()
+        Planet.release_meshes()
+        self.texture_cache.release()
+        gpu_resources.check_leaks()
+
+
+
+class FrameCapture:
+    # Liest Frames asynchron über einen Ring von Pixel-Pack-Puffern zurück: glReadPixels kehrt sofort zurück, gemappt
+    # wird ein Puffer erst, wenn sein Fence signalisiert ist (spätestens ring_size Frames später). Von dort geht der
+    # Frame mit einem memmove in einen Slot im gemeinsamen Speicher, die Worker-Prozesse kodieren ihn von dort ohne
+    # Pickling. Sind alle Slots belegt, wird der Frame verworfen (Echtzeit) oder mit throttle auf einen Slot
+    # gewartet (Stapel-Rendern, dort zählt jeder Frame).
+    def __init__(self, display, directory, image_format="png", ring_size=3, slots=8, workers=None, throttle=False, fps=60):
+        if image_format not in ("png", "raw"):
+            raise ValueError(f"Unknown capture format: {image_format}")
+        self.display = display
+        self.directory = directory
+        self.image_format = image_format
+        self.throttle = throttle
+        self.frame_bytes = display[0] * display[1] * 4
+        self.frame = 0
+        self.captured = 0
+        self.dropped = 0
+
+        os.makedirs(directory, exist_ok=True)
+        if image_format == "raw":
+            # Reihenfolge im Videostrom: nur ein Worker; Metadaten für z.B.
+            # ffmpeg -f rawvideo -pix_fmt rgba -s 1200x900 -r 60 -i video.rgba video.mp4
+            workers = 1
+            with open(os.path.join(directory, "video.json"), "w") as f:
+                json.dump({"width": display[0], "height": display[1], "fps": fps, "pixel_format": "rgba"}, f)
+
+        self.buffers = [int(buffer) for buffer in glGenBuffers(ring_size)] if ring_size > 1 else [glGenBuffers(1)]
+        for buffer in self.buffers:
+            gpu_resources.track("buffer", buffer, "FrameCapture", self.frame_bytes)
+        for buffer in self.buffers:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.frame_bytes, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.in_flight = deque()  # (Puffer, Fence, Dateiname oder None für den Videostrom)
+
+        # spawn statt fork: der Spielprozess hat GL-Kontext und mehrere Threads
+        context = multiprocessing.get_context("spawn")
+        self.memory = context.RawArray(ctypes.c_uint8, self.frame_bytes * slots)
+        self.slots = np.frombuffer(self.memory, dtype=np.uint8).reshape(slots, self.frame_bytes)
+        self.free_slots = list(range(slots))
+        self.tasks = context.Queue()
+        self.done = context.Queue()
+        self.workers = [context.Process(target=capture_worker, daemon=True,
+                                        args=(self.memory, display, directory, self.tasks, self.done))
+                        for _ in range(workers or min(os.cpu_count() or 1, 4))]
+        for worker in self.workers:
+            worker.start()
+        logging.info(f"Capturing {display[0]}x{display[1]} {image_format} to {directory} ({len(self.workers)} workers)")
+
+    def capture(self, name=None):
+        # Nach dem Zeichnen, vor dem Flip. name: einzelnes PNG (Bildschirmfoto); sonst nächster Frame der Aufnahme
+        if name is None:
+            if self.image_format == "png":
+                name = f"frame_{self.frame:06d}.png"
+            self.frame += 1
+        if len(self.in_flight) == len(self.buffers):
+            self.collect(wait=True)
+
+        in_use = {buffer for buffer, _, _ in self.in_flight}
+        buffer = next(buffer for buffer in self.buffers if buffer not in in_use)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+        glPixelStorei(GL_PACK_ALIGNMENT, 4)
+        glReadPixels(0, 0, self.display[0], self.display[1], GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.in_flight.append((buffer, glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0), name))
+        self.collect()
+
+    def collect(self, wait=False):
+        # Fertige Rückläufe in freie Slots kopieren; wait: den ältesten auf jeden Fall abholen (Ring voll, Ende)
+        self.release_slots()
+        while self.in_flight:
+            buffer, fence, name = self.in_flight[0]
+            timeout = 1_000_000_000 if wait else 0
+            if glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, timeout) not in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+                return
+            wait = False
+            self.in_flight.popleft()
+            glDeleteSync(fence)
+
+            if not self.free_slots and self.throttle:
+                self.free_slots.append(self.done.get())
+            if not self.free_slots:
+                self.dropped += 1
+                profiler.count("dropped_frames")
+                continue
+
+            slot = self.free_slots.pop()
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+            pointer = glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, self.frame_bytes, GL_MAP_READ_BIT)
+            ctypes.memmove(self.slots[slot].ctypes.data, pointer, self.frame_bytes)
+            glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+            self.tasks.put((slot, name))
+            self.captured += 1
+            profiler.count("captured_frames")
+
+    def release_slots(self):
+        while True:
+            try:
+                self.free_slots.append(self.done.get_nowait())
+            except queue.Empty:
+                break
+
+    def close(self):
+        # Ausstehende Frames noch abholen und kodieren lassen
+        while self.in_flight:
+            self.collect(wait=True)
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            # Rückmeldungen weiter abholen, sonst kann ein Worker beim Beenden auf seine Queue warten
+            while worker.is_alive():
+                worker.join(0.1)
+                self.release_slots()
+        for buffer in self.buffers:
+            gpu_resources.release("buffer", buffer)
+        self.buffers = []
+        logging.info(f"Captured {self.captured} frames to {self.directory}, dropped {self.dropped}")
 
 # Part 2: Helper Functions
 
+def write_png(path, pixels, level=1):
+    # Minimaler PNG-Schreiber (RGBA, Filter 0): mit zlib-Stufe 1 viel schneller als pygame.image.save
+    height, width = pixels.shape[:2]
+    rows = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    rows[:, 0] = 0
+    rows[:, 1:] = pixels.reshape(height, -1)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), level)))
+        f.write(chunk(b"IEND", b""))
+
+def capture_worker(memory, display, directory, tasks, done):
+    # Läuft in einem eigenen Prozess (FrameCapture); Frames kommen von unten nach oben aus glReadPixels
+    slots = np.frombuffer(memory, dtype=np.uint8).reshape(-1, display[1], display[0], 4)
+    video = None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot, name = task
+            pixels = slots[slot][::-1]
+            if name is not None:
+                write_png(os.path.join(directory, name), pixels)
+            else:
+                if video is None:
+                    video = open(os.path.join(directory, "video.rgba"), "ab")
+                video.write(pixels.tobytes())
+            done.put(slot)
+    finally:
+        if video is not None:
+            video.close()
+
+def trajectory_worker(connection, settings, steps, dt):
+    # Läuft in einem eigenen Prozess (TrajectoryPredictor), mit niedrigerer Priorität: auf wenigen Kernen soll
+    # der Scheduler den Render-Thread vorziehen
+    if hasattr(os, "nice"):
+        os.nice(10)
+    fleet = ShipFleet(1, *settings)
+    cells = None
+    try:
+        while True:
+            request = connection.recv()
+            if request is None:
+                break
+            position, velocity, snapshot = request
+            if snapshot["cells"] is None:
+                snapshot["cells"] = cells
+            cells = snapshot["cells"]
+            connection.send(TrajectoryPredictor.predict(fleet, position, velocity, snapshot, steps, dt))
+    except (EOFError, OSError):
+        pass
+
+
 def init_opengl(display, sun_position):
     pygame.init()
     pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
     pygame.display.set_caption('Spaceship Game')
 
+    setup_opengl(display, sun_position)
+
+def init_offscreen_opengl(display, sun_position):
+    # Benötigt PYOPENGL_PLATFORM=egl vor dem ersten Import von OpenGL (z.B. im Benchmark)
+    from OpenGL import EGL
+
+    os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+    egl_display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(egl_display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("EGL display could not be initialized")
+
+    config_attributes = (EGL.EGLint * 9)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_STENCIL_SIZE, 8,
+        EGL.EGL_NONE
+    )
+    config = EGL.EGLConfig()
+    config_count = EGL.EGLint()
+    EGL.eglChooseConfig(egl_display, config_attributes, ctypes.pointer(config), 1, ctypes.pointer(config_count))
+    if config_count.value == 0:
+        raise RuntimeError("No EGL config for offscreen OpenGL rendering")
+
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(egl_display, config, EGL.EGL_NO_CONTEXT, None)
+    surface_attributes = (EGL.EGLint * 5)(EGL.EGL_WIDTH, display[0], EGL.EGL_HEIGHT, display[1], EGL.EGL_NONE)
+    surface = EGL.eglCreatePbufferSurface(egl_display, config, surface_attributes)
+    if not EGL.eglMakeCurrent(egl_display, surface, surface, context):
+        raise RuntimeError("EGL context could not be made current")
+
+    setup_opengl(display, sun_position)
+    return egl_display, surface, context
+
+def setup_opengl(display, sun_position):
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_TEXTURE_2D)
+    glEnable(GL_RESCALE_NORMAL)
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
     glEnable(GL_COLOR_MATERIAL)
@@ -262,8 +4656,7 @@ def init_opengl(display, sun_position):
 
     glEnable(GL_STENCIL_TEST)
 
-def create_planets():
-    planets = []
+def create_solar_system(texture_cache=None, asteroids=0, satellites=0, rng=np.random):
     planets_data = [
         ("Sun", 2.0, 0, "textures/planeten/sonne/sun.png", 0, 0),
         ("Mercury", 0.4, 10, "textures/planeten/merkur/mercury.png", 0.2, 0.1),
@@ -277,408 +4670,336 @@ def create_planets():
         ("Pluto", 0.2, 90, "textures/planeten/pluto/pluto.png", 0.02, 0.001)
     ]
 
+    # Im Shader-Pfad auf der Nachtseite eingeblendet
+    night_textures = {"Earth": "textures/planeten/erde/earth night_lights_modified.png"}
+    # Spielmaßstab: die Sonne ist nicht größer als Jupiter gezeichnet, soll aber die Bahnen bestimmen
+    masses = {"Sun": 100.0}
+
+    system = SolarSystem(len(planets_data))
+
+    if texture_cache is not None:
+        # Alle Texturen parallel im Hintergrund dekodieren; hochgeladen werden sie beim Zeichnen (Renderer)
+        texture_cache.prefetch([data[3] for data in planets_data if os.path.exists(data[3])])
+
     for name, diameter, distance, texture_path, orbital_speed, rotation_speed in planets_data:
-        start_angle = np.random.uniform(0, 2 * np.pi)
+        start_angle = rng.uniform(0, 360)
         if os.path.exists(texture_path):
-            planets.append(Planet(name, diameter, distance, texture_path, orbital_speed, start_angle, rotation_speed))
+            index = system.add_body(name, diameter, distance, orbital_speed, start_angle, rotation_speed, mass=masses.get(name))
+            planet = Planet(system, index, texture_path)
+            if os.path.exists(night_textures.get(name, "")):
+                planet.night_texture_path = night_textures[name]
+            system.planets.append(planet)
         else:
             logging.warning(f"Texture file {texture_path} not found.")
 
-    return planets
-
-def update_planets(planets, dt):
-    for planet in planets:
-        planet.update_position(dt)
-
-def create_stars(num_stars=1000):
-    return np.random.rand(num_stars, 3) * 200 - 100
-
-def handle_mouse_events(event, movement, yaw, pitch):
-    mouse_sensitivity = 0.4
-    if event.type == MOUSEMOTION:
-        dx, dy = event.rel
-        if dy != 0:  # Vertikale Bewegung
-            pitch += dy * mouse_sensitivity  # Invertiere die vertikale Bewegung
-            pitch += np.clip(pitch, -89, 89)
-
-        if dx != 0:  # Horizontale Bewegung
-            yaw += dx * mouse_sensitivity  # Invertiere die horizontale Bewegung
-
-
-
-def handle_keyboard_events(spaceship, keys):
-    if keys[K_q]:
-        print("Q")
-        spaceship.rotate(0, 0, clockwise=True)
-    elif keys[K_e]:
-        print("E")
-        spaceship.rotate(90, 0, counterclockwise=True)
-    elif keys[K_w]:
-        spaceship.move_forward()
-    elif keys[K_s]:
-        spaceship.move_backward()
-
-    return keys
-
+    if asteroids:
+        create_asteroid_belt(system, asteroids, rng=rng)
+    earth = next((planet for planet in system.planets if planet.name == "Earth"), None)
+    if satellites and earth is not None:
+        create_satellites(system, earth, satellites, rng=rng)
+
+    return system
+
+def add_body_field(system, name, count, inner, outer, parent=None, models=("rock:0", "rock:1", "rock:2"),
+                   texture_paths=("textures/planeten/merkur/mercury.png",) * 3, diameter=(0.03, 0.25), thickness=0.04,
+                   max_eccentricity=0.08, speed_constant=33.0, color=(0.5, 0.48, 0.45), density=0.01, rng=np.random):
+    # Bahnen gleichverteilt im Ring zwischen inner und outer (um die Sonne oder um parent), Winkelgeschwindigkeit
+    # nach Kepler ~ distance^-1.5; speed_constant passt sie an die Planeten an (Gürtel bei 45 etwa 0.11)
+    distance = np.sqrt(rng.uniform(inner ** 2, outer ** 2, count))
+    diameters = np.exp(rng.uniform(np.log(diameter[0]), np.log(diameter[1]), count))
+    bodies = system.add_bodies(
+        [name] * count,
+        diameter=diameters,
+        distance=distance,
+        orbital_speed=speed_constant * distance ** -1.5,
+        start_angle=rng.uniform(0, 360, count),
+        rotation_speed=rng.uniform(-60, 60, count),
+        inclination=rng.normal(0, thickness, count),
+        eccentricity=rng.uniform(0, max_eccentricity, count),
+        parent=-1 if parent is None else parent.index,
+        mass=density * diameters ** 3,  # ganze Felder wiegen zusammen weniger als ein Planet
+    )
+    axes = rng.normal(size=(count, 3))
+    axes /= np.linalg.norm(axes, axis=1, keepdims=True)
+    variants = rng.randint(0, len(models), count).astype(np.intp)
+
+    field = BodyField(name, system, bodies, list(models), list(texture_paths), variants, axes, color)
+    system.fields.append(field)
+    return field
+
+def create_asteroid_belt(system, count=100000, rng=np.random):
+    # Zwischen Mars (40) und Jupiter (50)
+    return add_body_field(system, "Asteroid belt", count, 42.0, 48.0, rng=rng)
+
+def create_satellites(system, planet, count=200, rng=np.random):
+    radius = planet.diameter / 2
+    return add_body_field(system, f"{planet.name} satellites", count, radius * 1.5, radius * 3.0, parent=planet,
+                          models=("model:satellite",),
+                          texture_paths=("textures/satellites/satellite1.png",), diameter=(0.02, 0.06), thickness=0.6,
+                          max_eccentricity=0.02, speed_constant=20.0, color=(0.8, 0.8, 0.85), rng=rng)
+
+def create_star_field(num_stars=1000, extent=100, rng=np.random):
+    positions = rng.uniform(-extent, extent, (num_stars, 3)).astype(np.float32)
+
+    # Wenige helle, große Sterne und viele schwache; leichte Farbtönung von rötlich bis bläulich
+    brightness = rng.uniform(0.0, 1.0, num_stars) ** 3
+    tint = rng.uniform(-1.0, 1.0, num_stars)
+    colors = np.empty((num_stars, 4), dtype=np.float32)
+    colors[:, 0] = 0.85 + 0.15 * np.clip(-tint, 0, 1)
+    colors[:, 1] = 0.9
+    colors[:, 2] = 0.85 + 0.15 * np.clip(tint, 0, 1)
+    colors[:, :3] *= (0.4 + 0.6 * brightness)[:, np.newaxis]
+    colors[:, 3] = 1.0
+    sizes = np.select([brightness > 0.9, brightness > 0.5], [3.0, 2.0], 1.0)
+
+    return ParticleField(positions, (colors * 255).astype(np.uint8), sizes)
+
+def create_nebula(num_particles=100, extent=100, particle_size=0.57, rng=np.random):
+    positions = rng.uniform(-extent, extent, (num_particles, 3)).astype(np.float32)
+    colors = np.full((num_particles, 4), (255, 255, 255, 128), dtype=np.uint8)
+    return ParticleField(positions, colors, np.full(num_particles, particle_size))
+
+def load_solar_system(renderer, loading_screen, clock, asteroids=0, satellites=0, rng=np.random):
+    # Sonnensystem und Schiffsmodell entstehen im Hintergrund, bis dahin läuft der Ladebildschirm weiter; Texturen und
+    # übrige Modelle laden nach, während schon gespielt wird. None, wenn das Fenster vorher geschlossen wurde.
+    future = renderer.texture_cache.executor.submit(create_solar_system, renderer.texture_cache, asteroids, satellites, rng)
+    while not (future.done() and renderer.model_registry.ready("ship")):
+        for event in pygame.event.get():
+            if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+                return None
+        tasks = [future] + list(renderer.model_registry.pending.values()) + list(renderer.texture_cache.pending.values())
+        done = sum(task.done() for task in tasks)
+        loading_screen.draw(done / len(tasks), f"Loading ({done}/{len(tasks)})")
+        pygame.display.flip()
+        clock.tick(60)
+    return future.result()
 
-def pygame_thread(root, distance_var, speed_var, life_points_var, structure_var, collided_planets_var, spaceship):
+def pygame_thread(stats_channel, num_stars=1000, trace_path=None, record_path=None, use_shaders=False, asteroids=0, satellites=0,
+                  session_path=None, player=None, client=None, quality=None, target_ms=16.6, capture_dir="captures",
+                  capture_format="png", gravity=GravityField.STRENGTH, friction=0.9, texture_budget_mb=None):
     display = (1200, 900)
     sun_position = (0, 0, 0)
 
+    # Aufzeichnung, Wiedergabe und Server brauchen dasselbe Sonnensystem: es entsteht aus einem gemeinsamen Seed
+    if client is not None:
+        setup = client.welcome["setup"]
+    elif player is not None:
+        setup = player.header["setup"]
+    else:
+        setup = {"seed": int(np.random.randint(2 ** 31)), "asteroids": asteroids, "satellites": satellites, "gravity": gravity,
+                 "friction": friction}
+
     clock = pygame.time.Clock()
+    started = time.perf_counter()
 
     init_opengl(display, sun_position)
-
-    planets = create_planets()
-
-    spaceship_mesh = mesh.Mesh.from_file('models/superman.stl')
-    vertices = spaceship_mesh.vectors.reshape(-1, 3)
-    normals = spaceship_mesh.normals
-
-    stars = np.random.rand(1000, 3) * 200 - 100
-
-    movement = np.array([100, 0, 0], dtype=float)
-    velocity = np.array([0, 0, 0], dtype=float)
-
-    max_speed = 0.5
-    acceleration = 0.05
-    friction = 0.9
-    collision_distance = 1.0
-
-    lasers = []
-    laser_speed = 1.0
-    laser_length = 0.2  # Set your desired length for the laser
-    laser_radius = 0.001  # Set your desired radius for the laser
-
-    mouse_sensitivity = 0.4
-    yaw, pitch = 0, 0
-
-    life_points = 1000
-    structure_points = 500
-
-    collided_planets = []
-
-
-
-    def handle_shield_depletion():
-        nonlocal life_points, structure_points
-        if life_points <= 0:
-            life_points = 0
-            if structure_points > 0 and any(
-                    np.linalg.norm(planet.position - movement) < planet.diameter / 2 + collision_distance for planet in
-                    planets):
-                structure_points -= 10  # Reduzieren der Strukturpunkte
-                if structure_points <= 0:
-                    structure_points = 0
-
-
-
-    def add_collided_planet(planet_name):
-        if planet_name not in collided_planets:
-            collided_planets.append(planet_name)
-
-    def draw_laser(start_pos, direction, length, radius):
-        # Normalize direction vector
-        length_dir = math.sqrt(direction[0] ** 2 + direction[1] ** 2 + direction[2] ** 2)
-        direction = (
-            direction[0] / length_dir,
-            direction[1] / length_dir,
-            direction[2] / length_dir
-        )
-
-        # Compute the angles to align the cylinder with the direction
-        angle_x = math.atan2(direction[1], direction[2])
-        angle_y = math.atan2(direction[0], direction[2])
-
-        glPushMatrix()
-        glColor3f(1.0, 0.0, 0.0)  # Red color for laser
-        glTranslatef(start_pos[0], start_pos[1], start_pos[2])
-
-        # Rotate around Y-axis to align with direction in the XZ plane
-        glRotatef(math.degrees(angle_y), 0, 1, 0)
-        # Rotate around X-axis to align with direction in the XY plane
-        glRotatef(math.degrees(angle_x), 1, 0, 0)
-
-        # Draw the laser beam as a cylinder
-        glPushMatrix()
-        glTranslatef(0, 0, -length / 2.0)
-        gluCylinder(gluNewQuadric(), radius, radius, length, 16, 16)
-        glPopMatrix()
-
-        glPopMatrix()
-
-    def debug_draw_laser(laser):
-        start_pos, direction = laser
-        print(f"Laser Start: {start_pos}, Direction: {direction}")
-
-        # Optional: Draw a reference line to visualize laser direction
-        glColor3f(0.0, 1.0, 0.0)  # Green color for debug line
-        glBegin(GL_LINES)
-        glVertex3f(start_pos[0], start_pos[1], start_pos[2])
-        end_pos = (
-            start_pos[0] + direction[0] * 100,  # Extend the line 100 units in direction
-            start_pos[1] + direction[1] * 100,
-            start_pos[2] + direction[2] * 100
-        )
-        glVertex3f(end_pos[0], end_pos[1], end_pos[2])
-        glEnd()
-
-    def get_laser_start_position(spaceship_position, laser_offset):
-        return (
-            spaceship_position[0] + laser_offset[0],
-            spaceship_position[1] + laser_offset[1],
-            spaceship_position[2] + laser_offset[2]
-        )
-
-    def calculate_laser_direction(spaceship_direction, offset_angle):
-        # Adjust the direction based on the spaceship's current direction and offset angle
-        return (
-            spaceship_direction[0] * math.cos(offset_angle) - spaceship_direction[1] * math.sin(offset_angle),
-            spaceship_direction[0] * math.sin(offset_angle) + spaceship_direction[1] * math.cos(offset_angle),
-            spaceship_direction[2]  # Assuming the laser direction is in the same plane
-        )
-
-    def render_scene():
-        # Zeichne den Hintergrund, Planeten und das Raumschiff
-        # draw_background()
-        # draw_planets()
-        # draw_spaceship()
-        pass
-
-        # Zeichne die Laserstrahlen
-        glDisable(GL_LIGHTING)  # Lichter deaktivieren, um Laserstrahlen klarer zu sehen
-        for laser in lasers:
-            start_pos, direction = laser
-            draw_laser(start_pos, direction, laser_length, laser_radius)
-        glEnable(GL_LIGHTING)  # Lichter wieder aktivieren
-
-    def check_laser_collisions():
-        for laser in lasers:
-            start_pos, direction = laser
-            for planet in planets:
-                # Berechne den Abstand zwischen dem Laserstrahl und dem Planeten
-                # (Implementiere hier die Kollisionserkennung)
-                # Wenn Kollision erkannt:
-                print(f"Laser hit {planet.name}")
-                lasers.remove(laser)  # Entferne den Laserstrahl, wenn er einen Treffer erzielt hat
-                break
-
-    def handle_laser_movement(dt):
-        global lasers
-        new_lasers = []
-        for laser in lasers:
-            start_pos, direction = laser
-            start_pos += direction * laser_speed * dt
-            new_lasers.append([start_pos, direction])
-        lasers = new_lasers
-
-    laser_lifetime = 5.0  # Zeit in Sekunden, die ein Laserstrahl aktiv bleibt
-
-    def update_lasers(dt):
-        global lasers
-        new_lasers = []
-        for laser in lasers:
-            start_pos, direction = laser
-            start_pos += direction * laser_speed * dt
-            # Überprüfe, ob der Laserstrahl noch aktiv ist
-            if np.linalg.norm(start_pos) < laser_lifetime:
-                new_lasers.append([start_pos, direction])
-        lasers = new_lasers
+    loading_screen = LoadingScreen(display)
+    loading_screen.draw(0.0, "Loading")
+    pygame.display.flip()
+
+    renderer = Renderer(display, num_stars, use_shaders=use_shaders, texture_budget_mb=texture_budget_mb)
+    # quality None: Stufe nach Frame-Zeit regeln, sonst fest auf diese Stufe
+    governor = QualityGovernor(target_ms, tier=quality or 0)
+    renderer.set_quality(governor.settings)
+    solar_system = load_solar_system(renderer, loading_screen, clock, setup["asteroids"], setup["satellites"],
+                                     np.random.RandomState(setup["seed"]))
+    loading_screen.release()
+    if solar_system is None:
+        renderer.release()
+        pygame.quit()
+        stats_channel.close()
+        return
+    logging.info(f"Interactive after {time.perf_counter() - started:.2f}s")
+
+    # Ältere Sitzungen und Server ohne diese Angaben: ohne Schwerkraft, mit der damaligen Reibung
+    world = World(solar_system, gravity=setup.get("gravity", 0.0), friction=setup.get("friction", 0.9))
+    if client is not None:
+        world.lasers = LaserPool(capacity=client.welcome["lasers"], speed=client.welcome["laser_speed"], lifetime=5.0, length=0.2)
+        simulation = NetworkSimulation(world, client, timestep=client.welcome["timestep"])
+    else:
+        simulation = Simulation(world)
+    session = None
+    if session_path and player is None and client is None:
+        session = simulation.recorder = SessionRecorder(session_path, world, simulation.timestep, setup=setup)
+    if player is not None:
+        player.seek(world, player.first_tick)
+
+    recorder = CommandRecorder(record_path) if record_path else None
+    input_handler = InputHandler(recorder=recorder)
+    capture = None  # F9: laufende Aufnahme
+    predictor = None  # F5: Flugbahn-Vorhersage, nur mit Schwerkraft
+    screenshots = None  # F12, entsteht beim ersten Bildschirmfoto
 
     running = True
     while running:
-        dt = clock.tick(60) / 1000.0
-
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                running = False
-
-            if event.type == KEYDOWN:
-                if event.key == K_ESCAPE:
-                    running = False
-
-                if event.type == KEYDOWN:
-                    if event.key == K_SPACE:
-                        # Position des Raumschiffs als Startposition des Lasers verwenden
-                        laser_position = movement.copy()
-                        # Berechnung der Blickrichtung und Umkehren
-                        laser_direction = np.array([
-                            np.sin(np.radians(yaw)) * np.cos(np.radians(pitch)),  # x-Komponente
-                            -np.sin(np.radians(pitch)),  # y-Komponente
-                            np.cos(np.radians(yaw)) * np.cos(np.radians(pitch))  # z-Komponente
-                        ])
-                        # Normalisiere den Richtungsvektor
-                        laser_direction = laser_direction / np.linalg.norm(laser_direction)
-                        lasers.append([laser_position, laser_direction])
-
-            if event.type == MOUSEMOTION:
-                handle_mouse_events(event, movement, yaw, pitch)
-                dx, dy = event.rel
-                yaw -= dx * mouse_sensitivity  # Invertierte Bewegung
-                pitch += dy * mouse_sensitivity  # Invertierte Bewegung
-                pitch = np.clip(pitch, -89, 89)
-
-        keys = pygame.key.get_pressed()
-
-        # Übergeben Sie das spaceship-Objekt an die handle_keyboard_events-Funktion
-        handle_keyboard_events(spaceship, keys)
-        # Aktualisiere die Position der Planeten
-        update_planets(planets, dt)
-
-        velocity_change = np.array([0, 0, 0], dtype=float)
-
-        if keys[K_s]:
-            velocity_change += np.array([
-                -np.sin(np.radians(yaw)) * np.cos(np.radians(pitch)),
-                np.sin(np.radians(pitch)),
-                -np.cos(np.radians(yaw)) * np.cos(np.radians(pitch))
-            ])
-
-        if keys[K_w]:
-            velocity_change -= np.array([
-                -np.sin(np.radians(yaw)) * np.cos(np.radians(pitch)),
-                np.sin(np.radians(pitch)),
-                -np.cos(np.radians(yaw)) * np.cos(np.radians(pitch))
-            ])
-
-        if keys[K_a]:
-            velocity_change += np.array([
-                np.sin(np.radians(yaw + 90)),
-                0,
-                np.cos(np.radians(yaw + 90))
-            ])
-
-        if keys[K_d]:
-            velocity_change += np.array([
-                np.sin(np.radians(yaw - 90)),
-                0,
-                np.cos(np.radians(yaw - 90))
-            ])
-
-        if np.linalg.norm(velocity_change) > 0:
-            velocity_change = velocity_change / np.linalg.norm(velocity_change) * acceleration
-
-        velocity += velocity_change
-        if np.linalg.norm(velocity) > max_speed:
-            velocity = velocity / np.linalg.norm(velocity) * max_speed
-
-        movement += velocity
-        velocity *= friction
-
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        camera_distance = 1.05  # näher heranzoomen und Abstand zwischen Kamera und Raumschiff
-
-        glLoadIdentity()
-        gluLookAt(
-            movement[0] - np.sin(np.radians(yaw)) * np.cos(np.radians(pitch)) * camera_distance,
-            # Kameraposition (Augen)
-            movement[1] + np.sin(np.radians(pitch)) * camera_distance,  # Kameraposition (Augen)
-            movement[2] - np.cos(np.radians(yaw)) * np.cos(np.radians(pitch)) * camera_distance,
-            # Kameraposition (Augen)
-            movement[0] - np.sin(np.radians(yaw)) * np.cos(np.radians(pitch)),  # Zielpunkt (Mittelpunkt)
-            movement[1] + np.sin(np.radians(pitch)),  # Zielpunkt (Mittelpunkt)
-            movement[2] - np.cos(np.radians(yaw)) * np.cos(np.radians(pitch)),  # Zielpunkt (Mittelpunkt)
-            0, 1, 0  # Up-Vektor (normalerweise die y-Achse)
-        )
-
-
-        glBegin(GL_POINTS)
-        for star in stars:
-            glVertex3fv(star)
-        glEnd()
-
-        glPushMatrix()
-        glTranslatef(movement[0], movement[1], movement[2])
-        glBegin(GL_TRIANGLES)
-        for i in range(len(vertices)):
-            glNormal3fv(normals[i // 3])
-            glVertex3fv(vertices[i])
-        glEnd()
-        glPopMatrix()
-
-        anom = Anomaly()  # Instanziierung der Anomalie-Klasse
-        # Hinzufügen des Hintergrunds
-        anom.add_background()
-        anom.draw_stars(stars)
+        with profiler.scope("wait"):
+            dt = clock.tick(60) / 1000.0
 
-        update_planets(planets, dt)
-        for planet in planets:
-            planet.draw()
-
-        render_scene()
+        with profiler.scope("events"):
+            command, triggered = input_handler.poll()
 
-        for planet in planets:
-            distance_to_planet = np.linalg.norm(planet.position - movement)
-            if distance_to_planet < planet.diameter / 2 + collision_distance:
-                life_points -= 10
-                add_collided_planet(planet.name)
-                if life_points <= 0:
-                    life_points = 0
-                elif life_points == 0:
-                    structure_points -= 10
-
-        if life_points == 0 and structure_points <= 0:
+        if "quit" in triggered:
+            running = False
+        if "toggle_shaders" in triggered:
+            renderer.set_shaders(not renderer.use_shaders)
+        if "toggle_overlay" in triggered:
+            renderer.overlay.visible = not renderer.overlay.visible
+        if "export_trace" in triggered:
+            profiler.export_chrome_trace(time.strftime("trace_%Y%m%d_%H%M%S.json"))
+        if "toggle_capture" in triggered:
+            if capture is None:
+                capture = FrameCapture(display, os.path.join(capture_dir, time.strftime("capture_%Y%m%d_%H%M%S")), capture_format)
+            else:
+                capture.close()
+                capture = None
+        if "toggle_trajectory" in triggered and world.gravity is not None:
+            if predictor is None:
+                predictor = TrajectoryPredictor(world.gravity, world.ships, timestep=simulation.timestep)
+            else:
+                predictor.close()
+                predictor = None
+                world.trajectory = None
+
+        if player is not None:
+            # Wiedergabe: Pfeiltasten springen um 5 s bzw. halbieren/verdoppeln die Geschwindigkeit
+            if "seek_backward" in triggered or "seek_forward" in triggered:
+                jump = 5 / player.timestep * (1 if "seek_forward" in triggered else -1)
+                player.seek(world, player.position + jump)
+            if "replay_slower" in triggered:
+                player.speed /= 2
+            if "replay_faster" in triggered:
+                player.speed *= 2
+            alpha = player.advance(world, dt)
+            with profiler.scope("render"):
+                renderer.draw(world, *player.interpolated(alpha))
+        else:
+            alpha = simulation.advance(dt, command)
+            if predictor is not None:
+                predictor.submit(world.movement, world.velocity)
+                world.trajectory = predictor.path
+            with profiler.scope("render"):
+                renderer.draw(world, *simulation.interpolated(alpha))
+
+        if world.game_over and player is None:
             print("Game Over")
             running = False
 
-        distance_var.set(f"{np.linalg.norm(movement):.2f} km")
-        speed_var.set(f"{np.linalg.norm(velocity):.2f} km/s")
-        life_points_var.set(str(life_points))
-        structure_var.set(str(structure_points))
-        collided_planets_var.set(", ".join(collided_planets))
-        root.update_idletasks()
-
-        handle_shield_depletion()
-
-        pygame.display.flip()
-
+        # Rücklesen nach dem Zeichnen, vor dem Flip; gemappt wird erst in einem späteren Frame
+        with profiler.scope("capture"):
+            if "screenshot" in triggered:
+                if screenshots is None:
+                    screenshots = FrameCapture(display, capture_dir, ring_size=2, slots=2, workers=1)
+                screenshots.capture(time.strftime("screenshot_%Y%m%d_%H%M%S") + f"_{pygame.time.get_ticks() % 1000:03d}.png")
+            elif screenshots is not None:
+                screenshots.collect()
+            if capture is not None:
+                capture.capture()
+
+        # Arbeitszeit des letzten Frames ohne das Warten in clock.tick
+        if quality is None and governor.update(clock.get_rawtime()):
+            renderer.set_quality(governor.settings)
+
+        with profiler.scope("stats"):
+            stats_channel.publish({
+                "distance": math.sqrt(world.movement.dot(world.movement)),
+                "speed": math.sqrt(world.velocity.dot(world.velocity)),
+                "life_points": world.life_points,
+                "structure_points": world.structure_points,
+                "collided_planets": world.collided_planets_text,
+                "fps": clock.get_fps(),
+                "frame_ms": dt * 1000,
+                "bodies": world.solar_system.count,
+                "quality": governor.describe() + ("" if quality is None else " (fest)"),
+            })
+
+        with profiler.scope("flip"):
+            pygame.display.flip()
+        profiler.end_frame()
+
+    if trace_path:
+        profiler.export_chrome_trace(trace_path)
+    if recorder is not None:
+        recorder.close()
+    if session is not None:
+        session.close()
+    for frame_capture in (capture, screenshots):
+        if frame_capture is not None:
+            frame_capture.close()
+    if predictor is not None:
+        predictor.close()
+    if client is not None:
+        client.loop.call_soon_threadsafe(client.close)
+    renderer.release()
     pygame.quit()
+    stats_channel.close()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Spaceship Game")
+    parser.add_argument("--stars", type=int, default=1000, help="Anzahl der Sterne (z.B. 1000000 für das volle Sternenfeld)")
+    parser.add_argument("--no-profile", action="store_true", help="Zeitmessung der Spielschleife abschalten")
+    parser.add_argument("--stats-rate", type=float, default=10, help="Aktualisierungen des Statistikfensters pro Sekunde")
+    parser.add_argument("--record", help="Eingabebefehle in diese Datei aufzeichnen (für Wiedergabe im Benchmark)")
+    parser.add_argument("--record-session", help="Simulationszustand je Tick in diese Sitzungsdatei aufzeichnen")
+    parser.add_argument("--replay", help="Aufgezeichnete Sitzung abspielen (Pfeiltasten: springen, Geschwindigkeit)")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="Wiedergabegeschwindigkeit, z.B. 4 oder -1")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="Mit einem Mehrspieler-Server (server.py) verbinden")
+    parser.add_argument("--trace", help="Beim Beenden einen Chrome-/Perfetto-Trace in diese Datei schreiben")
+    parser.add_argument("--renderer", choices=("fixed", "shader"), default="fixed", help="Render-Pfad beim Start (F2 schaltet um)")
+    parser.add_argument("--quality", type=int, choices=range(len(QualityGovernor.TIERS)),
+                        help="Feste Qualitätsstufe (0 = hoch); ohne Angabe wird sie an die Frame-Zeit angepasst")
+    parser.add_argument("--target-ms", type=float, default=16.6, help="Frame-Zeit, auf die die Qualität geregelt wird")
+    parser.add_argument("--capture-dir", default="captures", help="Ziel für Aufnahmen (F9) und Bildschirmfotos (F12)")
+    parser.add_argument("--capture-format", choices=("png", "raw"), default="png", help="Aufnahmen als PNG-Folge oder Rohvideo")
+    parser.add_argument("--asteroids", type=int, default=0, help="Anzahl der Körper im Asteroidengürtel (z.B. 100000)")
+    parser.add_argument("--satellites", type=int, default=0, help="Anzahl der Satelliten um die Erde")
+    parser.add_argument("--gravity", type=float, default=GravityField.STRENGTH, help="Stärke der Anziehung (0: aus)")
+    parser.add_argument("--friction", type=float, default=0.9, help="Erhaltene Geschwindigkeit je Tick (1.0: ohne Reibung, Bahnen möglich)")
+    parser.add_argument("--texture-budget", type=float, help="Texturspeicher in MB; darüber werden lange unbenutzte Texturen verdrängt")
+    args = parser.parse_args()
+
+    profiler.enabled = not args.no_profile
+
+    player = None
+    if args.replay:
+        try:
+            player = SessionPlayer(args.replay)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot replay {args.replay}: {e}")
+        player.speed = args.replay_speed
+
+    client = None
+    if args.connect:
+        # Netzwerk läuft in einer eigenen asyncio-Schleife neben Spiel- und Tk-Thread
+        host, _, port = args.connect.rpartition(":")
+        network_loop = asyncio.new_event_loop()
+        threading.Thread(target=network_loop.run_forever, daemon=True).start()
+        client = NetworkClient()
+        try:
+            asyncio.run_coroutine_threadsafe(client.connect(host or "127.0.0.1", int(port)), network_loop).result(timeout=10)
+        except (OSError, ValueError, TimeoutError) as e:
+            parser.error(f"cannot connect to {args.connect}: {e}")
+        asyncio.run_coroutine_threadsafe(client.receive(), network_loop)
+
     root = tk.Tk()
     root.title("Spaceship Game Stats")
 
-    distance_var = tk.StringVar()
-    speed_var = tk.StringVar()
-    life_points_var = tk.StringVar()
-    structure_var = tk.StringVar()
-    collided_planets_var = tk.StringVar()
-
-    tk.Label(root, text="Entfernung zur Sonne:").grid(row=0, column=0, sticky="w")
-    tk.Label(root, textvariable=distance_var).grid(row=0, column=1, sticky="w")
-
-    tk.Label(root, text="Geschwindigkeit:").grid(row=1, column=0, sticky="w")
-    tk.Label(root, textvariable=speed_var).grid(row=1, column=1, sticky="w")
-
-    tk.Label(root, text="Schutzschild:").grid(row=2, column=0, sticky="w")
-    tk.Label(root, textvariable=life_points_var).grid(row=2, column=1, sticky="w")
-
-    tk.Label(root, text="Raumschiff-Struktur:").grid(row=3, column=0, sticky="w")
-    tk.Label(root, textvariable=structure_var).grid(row=3, column=1, sticky="w")
-
-    tk.Label(root, text="Kollidierte Planeten:").grid(row=4, column=0, sticky="w")
-    tk.Label(root, textvariable=collided_planets_var).grid(row=4, column=1, sticky="w")
-
-    # Raumschiff erstellen
-    spaceship = Spaceship()
-
-    # Übergeben Sie das spaceship-Objekt an die pygame_thread-Funktion
-    pygame_thread_args = (root, distance_var, speed_var, life_points_var, structure_var, collided_planets_var, spaceship)
-    pygame_thread_instance = threading.Thread(target=pygame_thread, args=pygame_thread_args)
+    stats_channel = StatsChannel()
+    stats_window = StatsWindow(root, stats_channel, rate=args.stats_rate)
+    stats_window.start()
+
+    pygame_thread_kwargs = {"num_stars": args.stars, "trace_path": args.trace, "record_path": args.record,
+                            "use_shaders": args.renderer == "shader", "asteroids": args.asteroids,
+                            "satellites": args.satellites, "session_path": args.record_session,
+                            "player": player, "client": client, "quality": args.quality,
+                            "target_ms": args.target_ms, "capture_dir": args.capture_dir,
+                            "capture_format": args.capture_format, "gravity": args.gravity, "friction": args.friction,
+                            "texture_budget_mb": args.texture_budget}
+    pygame_thread_instance = threading.Thread(target=pygame_thread, args=(stats_channel,), kwargs=pygame_thread_kwargs)
     pygame_thread_instance.start()
 
-    def key_event_loop():
-        while True:
-            keys = pygame.key.get_pressed()
-            handle_keyboard_events(keys)
-            pygame.time.delay(10)  # kleine Verzögerung, um die CPU-Auslastung zu reduzieren
-
-    key_thread = threading.Thread(target=key_event_loop)
-    key_thread.start()
-
     root.mainloop()
+    pygame_thread_instance.join()
 
 
 if __name__ == "__main__":